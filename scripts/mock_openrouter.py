@@ -0,0 +1,122 @@
+"""
+Локальная замена OpenRouter /chat/completions для офлайн-замеров.
+
+Использование:
+    python scripts/mock_openrouter.py --port 8089 --latency-ms 1500 --sigma 0.5 --error-rate 0.02
+
+и OPENROUTER_BASE_URL=http://localhost:8089 в окружении бота.
+
+Ответы берутся из --answers (JSON: {"текст сообщения": [офферы]}) или
+генерируются правилами локального парсера; нераспознанные сообщения считаются спамом.
+Поддерживаются обычный, пакетный и потоковый (stream=true) режимы клиента.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+from aiohttp import web
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from api.openrouter.fast_parser import FastOfferParser
+
+
+class MockOpenRouter:
+    def __init__(self, latency_ms: float, sigma: float, error_rate: float, answers: dict):
+        self.latency_ms = latency_ms
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.answers = answers
+        self.parser = FastOfferParser()
+        self.stats = Counter()
+
+    def _latency(self) -> float:
+        # Логнормальное распределение с медианой latency_ms
+        return self.latency_ms / 1000 * random.lognormvariate(0, self.sigma)
+
+    def _offers_for(self, text: str) -> list:
+        if text in self.answers:
+            return self.answers[text]
+        return self.parser.parse(text) or []
+
+    def _content_for(self, user_content: str) -> str:
+        # Пакетный режим клиента: {"messages": [{"id": ..., "text": ...}]}
+        try:
+            batch = json.loads(user_content)
+        except json.JSONDecodeError:
+            batch = None
+        if isinstance(batch, dict) and isinstance(batch.get("messages"), list):
+            results = {m["id"]: {"offers": self._offers_for(m["text"])} for m in batch["messages"]}
+            self.stats["batched_messages"] += len(batch["messages"])
+            return json.dumps({"results": results}, ensure_ascii=False)
+        return json.dumps({"offers": self._offers_for(user_content)}, ensure_ascii=False)
+
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        payload = await request.json()
+        self.stats["requests"] += 1
+        self.stats[f"model:{payload.get('model')}"] += 1
+
+        await asyncio.sleep(self._latency())
+
+        if random.random() < self.error_rate:
+            self.stats["errors"] += 1
+            return web.json_response({"error": {"message": "mock upstream error"}}, status=random.choice([429, 500, 502]))
+
+        user_content = payload["messages"][-1]["content"]
+        content = self._content_for(user_content)
+
+        if not payload.get("stream"):
+            return web.json_response({
+                "id": f"mock-{self.stats['requests']}",
+                "created": int(time.time()),
+                "model": payload.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            })
+
+        self.stats["streams"] += 1
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for i in range(0, len(content), 16):
+            chunk = {"choices": [{"index": 0, "delta": {"content": content[i:i + 16]}}]}
+            await response.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            await asyncio.sleep(0.005)
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(dict(self.stats))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenRouter chat/completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=1500, help="Median response latency")
+    parser.add_argument("--sigma", type=float, default=0.5, help="Lognormal latency spread")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with an error")
+    parser.add_argument("--answers", help="JSON file with canned answers {text: offers}")
+    args = parser.parse_args()
+
+    answers = {}
+    if args.answers:
+        with open(args.answers, encoding="utf-8") as f:
+            answers = json.load(f)
+
+    mock = MockOpenRouter(args.latency_ms, args.sigma, args.error_rate, answers)
+    app = web.Application()
+    app.router.add_post("/chat/completions", mock.chat_completions)
+    app.router.add_post("/api/v1/chat/completions", mock.chat_completions)
+    app.router.add_get("/stats", mock.get_stats)
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Прогон записанного корпуса сообщений групп через обработчики userbot.
+
+Использование:
+    OPENROUTER_BASE_URL=http://localhost:8089 python scripts/replay_benchmark.py corpus.jsonl [--speed 0] [--mode structured|custom] [--chats -1001,-1002]
+
+Строка корпуса: {"chat_id": -100..., "text": "...", "sender_id": 123, "offset": 1.25,
+                 "reply_to_msg_id": null, "chat_title": "...", "sender_name": "..."}
+offset — секунды от начала записи; --speed 0 отправляет все сообщения сразу,
+--speed 1 воспроизводит исходный темп.
+
+Требует того же окружения (.env), что и бот: обработчики импортируют конфиг и клиент БД.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import Counter, deque
+from types import SimpleNamespace
+
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from api.openrouter.client import ai_client
+from utils.broadcast_state import broadcast_manager
+from userbot.handlers import register_userbot_handlers
+from userbot.ingest import ingest_queue
+from userbot.subscription import MonitoredNewMessage
+
+
+class ReplayClient:
+    """Минимальная замена TelegramClient: запоминает зарегистрированные обработчики."""
+
+    def __init__(self):
+        self.handlers = []
+
+    def on(self, event_builder):
+        def decorator(func):
+            self.handlers.append((event_builder, func))
+            return func
+        return decorator
+
+    def add_event_handler(self, func, event_builder=None):
+        self.handlers.append((event_builder, func))
+
+    def remove_event_handler(self, func, event_builder=None):
+        self.handlers = [(b, f) for b, f in self.handlers if f is not func]
+
+
+class ReplayEvent:
+    """Событие NewMessage, собранное из записи корпуса."""
+
+    def __init__(self, record: dict, msg_id: int):
+        self.is_group = True
+        self.chat_id = record["chat_id"]
+        self.sender_id = record.get("sender_id")
+        self.text = record["text"]
+        self.raw_text = record["text"]
+        self.id = msg_id
+        self.message = SimpleNamespace(
+            id=msg_id,
+            reply_to_msg_id=record.get("reply_to_msg_id"),
+            text=record["text"],
+        )
+        self.chat = SimpleNamespace(id=self.chat_id, title=record.get("chat_title", f"chat {self.chat_id}"))
+        self.sender = SimpleNamespace(
+            id=self.sender_id,
+            first_name=record.get("sender_name", "Trader"),
+            username=record.get("username"),
+        )
+
+    async def get_chat(self):
+        return self.chat
+
+    async def get_sender(self):
+        return self.sender
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def replay(records, speed: float, mode: str, monitored=None):
+    client = ReplayClient()
+    subscription = register_userbot_handlers(client)
+
+    chat_ids = monitored or sorted({r["chat_id"] for r in records})
+    broadcast_manager.start(
+        admin_id=0,
+        duration_minutes=24 * 60,
+        target_chat_ids=chat_ids,
+        direction="buy",
+        currency_from="RUB",
+        currency_to="USDT",
+        is_custom=(mode == "custom"),
+    )
+    # Обработчик подписывается на чаты при старте сессии
+    message_handlers = [
+        (builder, func) for builder, func in client.handlers
+        if isinstance(builder, MonitoredNewMessage)
+    ]
+
+    await ai_client.start()
+    llm_calls = Counter()
+
+    async def count_request(request):
+        llm_calls["http_requests"] += 1
+
+    ai_client._http.event_hooks["request"].append(count_request)
+
+    ingest_queue.latencies = deque()  # все замеры прогона, без ограничения окна
+    ingest_queue.start()
+
+    dispatch = []
+    started = time.perf_counter()
+    for msg_id, record in enumerate(records, 1):
+        if speed > 0:
+            delay = record.get("offset", 0) / speed - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        # Обработчики только ставят сообщение в очередь приема — замеряем, сколько держат диспетчер
+        dispatch_started = time.perf_counter()
+        event = ReplayEvent(record, msg_id)
+        for builder, handler in message_handlers:
+            if builder.filter(event):
+                await handler(event)
+        dispatch.append(time.perf_counter() - dispatch_started)
+    await ingest_queue.join()
+    elapsed = time.perf_counter() - started
+    latencies = list(ingest_queue.latencies)
+
+    await ingest_queue.stop()
+    await ai_client.close()
+
+    print(f"Messages:        {len(records)}")
+    print(f"Elapsed:         {elapsed:.2f} s")
+    print(f"Throughput:      {len(records) / elapsed:.1f} msg/s")
+    print(f"Latency p50:     {percentile(latencies, 0.5) * 1000:.1f} ms")
+    print(f"Latency p99:     {percentile(latencies, 0.99) * 1000:.1f} ms")
+    print(f"Dispatch p99:    {percentile(dispatch, 0.99) * 1000:.3f} ms")
+    print(f"Ingest queue:    {ingest_queue.snapshot()}")
+    print(f"Subscription:    {dict(subscription.stats)}")
+    print(f"LLM HTTP calls:  {llm_calls['http_requests']}")
+    print(f"Offers on board: {len(broadcast_manager.responses)}")
+    print(f"Scheduler:       {dict(ai_client.scheduler.stats)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded group messages through userbot handlers")
+    parser.add_argument("corpus", help="JSONL file with recorded messages")
+    parser.add_argument("--speed", type=float, default=0, help="0 = as fast as possible, 1 = real time")
+    parser.add_argument("--mode", choices=["structured", "custom"], default="structured")
+    parser.add_argument("--chats", help="Comma-separated chat ids to monitor (default: all chats in the corpus)")
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    records.sort(key=lambda r: r.get("offset", 0))
+
+    monitored = [int(c) for c in args.chats.split(",")] if args.chats else None
+    asyncio.run(replay(records, args.speed, args.mode, monitored))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Обучение локального фильтра релевантности на сохраненной истории сообщений.
+
+Использование:
+    python scripts/train_prefilter.py captured.jsonl prefilter_model.json
+
+Каждая строка входного файла: {"text": "...", "relevant": true|false}
+(формат, который пишет PREFILTER_CAPTURE_PATH).
+"""
+import json
+import os
+import random
+import sys
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from api.openrouter.prefilter import RelevanceFilter
+
+
+def load_samples(path):
+    samples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            samples.append((record["text"], bool(record["relevant"])))
+    return samples
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: python scripts/train_prefilter.py <captured.jsonl> <model.json> [epochs]")
+        sys.exit(1)
+
+    samples = load_samples(sys.argv[1])
+    epochs = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    if not samples:
+        print("No samples found.")
+        sys.exit(1)
+
+    random.seed(42)
+    random.shuffle(samples)
+    split = max(1, int(len(samples) * 0.8))
+    train, test = samples[:split], samples[split:]
+
+    model = RelevanceFilter()
+    model.train(train, epochs=epochs)
+
+    if test:
+        for threshold in (0.3, 0.5, 0.7):
+            kept_relevant = sum(1 for t, y in test if y and model.score(t) >= threshold)
+            dropped_noise = sum(1 for t, y in test if not y and model.score(t) < threshold)
+            total_relevant = sum(1 for _, y in test if y) or 1
+            total_noise = sum(1 for _, y in test if not y) or 1
+            print(
+                f"threshold={threshold}: relevant kept {kept_relevant / total_relevant:.1%}, "
+                f"noise dropped {dropped_noise / total_noise:.1%}"
+            )
+
+    model.save(sys.argv[2])
+    print(f"Model saved to {sys.argv[2]} ({len(model.weights)} weights, {len(train)} samples)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import asyncio
+from typing import Optional, Dict, Any, List, Tuple
+
+from config import logger
+from api.openrouter.scheduler import Priority
+
+
+class MessageBatcher:
+    """
+    Собирает сообщения за короткое окно (или до max_size штук) и отправляет
+    их одним запросом к LLM. Результаты раздаются ожидающим обработчикам.
+
+    Сообщения с разным context_prompt попадают в разные пакеты,
+    так как системный промпт у них отличается.
+    """
+
+    def __init__(self, client: Any, window: float = 0.2, max_size: int = 10):
+        self.client = client
+        self.window = window
+        self.max_size = max_size
+        self._pending: Dict[str, List[Tuple[str, str, asyncio.Future, Priority, Optional[float]]]] = {}
+        self._timers: Dict[str, asyncio.Task] = {}
+        self._counter = 0
+
+    async def submit(
+        self,
+        message_text: str,
+        context_prompt: str = "",
+        priority: Priority = Priority.NORMAL,
+        deadline: Optional[float] = None,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Добавляет сообщение в текущий пакет и ждет его результат."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        self._counter += 1
+        batch = self._pending.setdefault(context_prompt, [])
+        batch.append((str(self._counter), message_text, future, priority, deadline))
+
+        if len(batch) >= self.max_size:
+            self._flush_now(context_prompt)
+        elif context_prompt not in self._timers:
+            self._timers[context_prompt] = asyncio.create_task(self._flush_later(context_prompt))
+
+        return await future
+
+    def _flush_now(self, context_prompt: str):
+        timer = self._timers.pop(context_prompt, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(context_prompt, [])
+        if batch:
+            asyncio.create_task(self._process(batch, context_prompt))
+
+    async def _flush_later(self, context_prompt: str):
+        await asyncio.sleep(self.window)
+        self._timers.pop(context_prompt, None)
+        batch = self._pending.pop(context_prompt, [])
+        if batch:
+            await self._process(batch, context_prompt)
+
+    async def _process(self, batch: List[Tuple[str, str, asyncio.Future, Priority, Optional[float]]], context_prompt: str):
+        # Пакет получает наивысший приоритет и самый поздний дедлайн среди своих сообщений
+        priority = min(item[3] for item in batch)
+        deadlines = [item[4] for item in batch]
+        deadline = None if None in deadlines else max(deadlines)
+
+        # Одиночное сообщение отправляем обычным запросом — без накладных расходов пакетного формата
+        if len(batch) == 1:
+            _, text, future, _, _ = batch[0]
+            await self._resolve_single(text, future, context_prompt, priority, deadline)
+            return
+
+        results: Dict[str, List[Dict[str, Any]]] = {}
+        try:
+            results = await self.client.extract_offers_batch(
+                {msg_id: text for msg_id, text, _, _, _ in batch},
+                context_prompt,
+                priority=priority,
+                deadline=deadline
+            )
+        except Exception as e:
+            logger.error(f"Batch AI Analysis failed ({len(batch)} messages): {e}")
+
+        if not results:
+            # Весь пакет не удался (сбой провайдера, отказ очереди): поодиночные повторы
+            # превратили бы один запрос в N — сообщения получают ошибку
+            logger.warning(f"Batch of {len(batch)} messages failed, not retrying individually")
+            for _, _, future, _, _ in batch:
+                if not future.done():
+                    future.set_result(None)
+            return
+
+        missing = []
+        for msg_id, text, future, _, _ in batch:
+            if msg_id in results:
+                if not future.done():
+                    future.set_result(results[msg_id])
+            else:
+                missing.append((text, future))
+
+        # Сообщения, для которых модель не вернула результат, обрабатываем по одному
+        if missing:
+            logger.warning(f"Batch returned no result for {len(missing)}/{len(batch)} messages, retrying individually")
+            await asyncio.gather(*(
+                self._resolve_single(text, future, context_prompt, priority, deadline)
+                for text, future in missing
+            ))
+
+    async def _resolve_single(
+        self,
+        text: str,
+        future: asyncio.Future,
+        context_prompt: str,
+        priority: Priority = Priority.NORMAL,
+        deadline: Optional[float] = None,
+    ):
+        try:
+            offers = await self.client.extract_offers(text, context_prompt, priority=priority, deadline=deadline)
+        except Exception as e:
+            logger.error(f"AI Analysis failed: {e}")
+            offers = None
+        if not future.done():
+            future.set_result(offers)
@@ -0,0 +1,119 @@
+import asyncio
+import hashlib
+import re
+import time
+from collections import OrderedDict, Counter
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Tuple
+
+from config import Config, logger
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Отличает "нет в кэше" от закэшированного результата None (спам)
+MISS = object()
+
+
+def normalize_text(text: str) -> str:
+    """Нормализация текста для ключа кэша: регистр, ё/е, пробелы."""
+    return _WHITESPACE_RE.sub(" ", (text or "").lower().replace("ё", "е")).strip()
+
+
+def make_key(message_text: str, context_prompt: str = "") -> str:
+    raw = f"{normalize_text(message_text)}\x00{context_prompt}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class OfferCache:
+    """
+    LRU-кэш результатов извлечения офферов с TTL.
+
+    Ключ — хэш нормализованного текста и контекстного промпта (направления поиска).
+    При LLM_CACHE_PERSIST записи дублируются в Postgres и подгружаются при старте.
+    """
+
+    def __init__(self, max_size: int = 5000, ttl: int = 300, persist: bool = False):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.persist = persist
+        self._entries: "OrderedDict[str, Tuple[float, Optional[List[Dict[str, Any]]]]]" = OrderedDict()
+        self.stats: Counter = Counter()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, message_text: str, context_prompt: str = "") -> Any:
+        """Возвращает офферы (или None для спама) либо MISS."""
+        key = make_key(message_text, context_prompt)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return MISS
+
+        stored_at, offers = entry
+        if time.time() - stored_at > self.ttl:
+            del self._entries[key]
+            self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            return MISS
+
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return offers
+
+    def put(self, message_text: str, context_prompt: str, offers: Optional[List[Dict[str, Any]]]):
+        key = make_key(message_text, context_prompt)
+        stored_at = time.time()
+        self._store(key, stored_at, offers)
+        if self.persist:
+            asyncio.create_task(self._persist(key, stored_at, offers))
+
+    def _store(self, key: str, stored_at: float, offers: Optional[List[Dict[str, Any]]]):
+        self._entries[key] = (stored_at, offers)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
+
+    async def _persist(self, key: str, stored_at: float, offers: Optional[List[Dict[str, Any]]]):
+        from database.client import get_db_session
+        from services import LlmCacheService
+        try:
+            async with get_db_session() as session:
+                await LlmCacheService(session).save_entry(key, offers, datetime.utcfromtimestamp(stored_at))
+        except Exception as e:
+            logger.warning(f"Failed to persist LLM cache entry: {e}")
+
+    async def load(self):
+        """Подгружает свежие записи из Postgres и удаляет устаревшие."""
+        if not self.persist:
+            return
+        from database.client import get_db_session
+        from services import LlmCacheService
+        try:
+            async with get_db_session() as session:
+                service = LlmCacheService(session)
+                purged = await service.purge_expired(self.ttl)
+                entries = await service.get_fresh_entries(self.ttl, self.max_size)
+        except Exception as e:
+            logger.error(f"Failed to load LLM cache: {e}")
+            return
+
+        # Самые свежие записи должны оказаться в конце LRU
+        for entry in reversed(entries):
+            stored_at = (entry.created_at - datetime(1970, 1, 1)).total_seconds()
+            self._store(entry.key, stored_at, entry.offers)
+        logger.info(f"🗄️ LLM cache loaded: {len(entries)} entries (purged {purged})")
+
+
+# Глобальный инстанс
+offer_cache = OfferCache(
+    max_size=Config.LLM_CACHE_MAX_SIZE,
+    ttl=Config.LLM_CACHE_TTL,
+    persist=Config.LLM_CACHE_PERSIST
+)
@@ -1,103 +1,446 @@
+import asyncio
 import json
+import time
 import httpx
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Callable, Awaitable
 from config import Config, logger
+from api.openrouter.fast_parser import fast_parser
+from api.openrouter.prefilter import relevance_filter, capture_sample
+from api.openrouter.batcher import MessageBatcher
+from api.openrouter.cache import offer_cache, MISS
+from api.openrouter.scheduler import LLMScheduler, Priority
+from api.openrouter.streaming import OffersStreamParser, parse_sse_line
+from api.openrouter.router import ModelRouter
+from api.openrouter.decoder import decode_offers, decode_batch, extract_json, validate_offers
+from api.openrouter.resilience import CircuitBreaker, DeferredQueue, TransientHTTPError, retry_with_jitter
+from api.openrouter.templates import template_store
+
+SYSTEM_PROMPT = (
+    "Ты профессиональный p2p трейдер. Анализируй сообщения из чатов и извлекай торговые предложения.\n\n"
+    "**ПРАВИЛА:**\n"
+    "1. Если сообщение НЕ содержит торговых предложений (спам, вопросы, новости) — верни: {\"offers\": []}\n"
+    "2. Если сообщение содержит предложения купить/продать валюту — извлеки ВСЕ предложения в массив:\n"
+    "   {\n"
+    "     \"offers\": [\n"
+    "       {\n"
+    "         \"side\": \"buy\" | \"sell\",  // buy = автор ПОКУПАЕТ, sell = автор ПРОДАЕТ\n"
+    "         \"price\": number | null,    // Цена (курс обмена). Если не указана — null. ВАЖНО: конвертируй запятые в точки (88,90 → 88.90)\n"
+    "         \"volume\": string | null,   // Объем ('10000', '50k', 'от 100'). Если не указан — null\n"
+    "         \"currency\": string          // Валюта (USDT, RUB, USD, CNY и т.д.)\n"
+    "       }\n"
+    "     ]\n"
+    "   }\n\n"
+    "**ВАЖНО:**\n"
+    "- Если в сообщении НЕСКОЛЬКО предложений (например, 'Покупаем по 88,50, продаем по 88,90') — извлеки ОБА в массив\n"
+    "- Цены с ЗАПЯТОЙ (88,90) конвертируй в число с ТОЧКОЙ (88.90)\n"
+    "- Если цена не указана явно — ставь null\n\n"
+    "**ПРИМЕРЫ:**\n"
+    "Сообщение: 'Покупаем по 78' → {\"offers\": [{\"side\": \"buy\", \"price\": 78, \"volume\": null, \"currency\": \"RUB\"}]}\n"
+    "Сообщение: 'Продаем USD по курсу 78,50' → {\"offers\": [{\"side\": \"sell\", \"price\": 78.5, \"volume\": null, \"currency\": \"USD\"}]}\n"
+    "Сообщение: 'Покупка 89,55, Продажа 89,95' → {\"offers\": [{\"side\": \"buy\", \"price\": 89.55, \"volume\": null, \"currency\": \"RUB\"}, {\"side\": \"sell\", \"price\": 89.95, \"volume\": null, \"currency\": \"RUB\"}]}\n"
+    "Сообщение: 'Всем привет!' → {\"offers\": []}\n\n"
+    "**ВАЖНО:** Отвечай ТОЛЬКО валидным JSON, без комментариев."
+)
+
+# Дополнение к системному промпту для пакетного режима
+BATCH_PROMPT = (
+    "\n\n**ПАКЕТНЫЙ РЕЖИМ:**\n"
+    "Тебе передается JSON со списком сообщений: {\"messages\": [{\"id\": \"1\", \"text\": \"...\"}, ...]}.\n"
+    "Проанализируй КАЖДОЕ сообщение независимо по правилам выше и верни результат для каждого id:\n"
+    "{\"results\": {\"1\": {\"offers\": [...]}, \"2\": {\"offers\": []}}}\n"
+    "Не пропускай ни одного id."
+)
 
 class OpenRouterClient:
     def __init__(self):
         self.api_key = Config.OPENROUTER_API_KEY
-        self.base_url = "https://openrouter.ai/api/v1"
+        self.base_url = Config.OPENROUTER_BASE_URL
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "HTTP-Referer": "https://github.com/Antigravity/bt6_parser_bot",
             "X-Title": "BT6 Parser Bot",
             "Content-Type": "application/json"
         }
-        self.model = "anthropic/claude-3.5-sonnet"
+        self.router = ModelRouter(
+            Config.openrouter_models,
+            hedge_enabled=Config.OPENROUTER_HEDGE_ENABLED,
+            min_hedge_delay=Config.OPENROUTER_HEDGE_MIN_DELAY,
+            default_hedge_delay=Config.OPENROUTER_HEDGE_DEFAULT_DELAY
+        )
+        self.breaker = CircuitBreaker(
+            failure_threshold=Config.LLM_BREAKER_FAILURES,
+            reset_timeout=Config.LLM_BREAKER_RESET_SECONDS
+        )
+        self.deferred = DeferredQueue(
+            self.breaker,
+            max_size=Config.LLM_DEFERRED_MAX,
+            concurrency=Config.LLM_MAX_CONCURRENCY
+        )
+        self._http: Optional[httpx.AsyncClient] = None
+        self.batcher = MessageBatcher(
+            self,
+            window=Config.LLM_BATCH_WINDOW_MS / 1000,
+            max_size=Config.LLM_BATCH_MAX_SIZE
+        )
+        self.scheduler = LLMScheduler(
+            max_concurrency=Config.LLM_MAX_CONCURRENCY,
+            max_queue=Config.LLM_MAX_QUEUE
+        )
+
+    async def start(self):
+        """Открывает долгоживущий пул соединений к OpenRouter."""
+        if self._http is not None:
+            return
+        self._http = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=self.headers,
+            http2=Config.OPENROUTER_HTTP2,
+            timeout=httpx.Timeout(Config.OPENROUTER_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=Config.OPENROUTER_MAX_CONNECTIONS,
+                max_keepalive_connections=Config.OPENROUTER_MAX_KEEPALIVE,
+                keepalive_expiry=Config.OPENROUTER_KEEPALIVE_EXPIRY,
+            ),
+        )
+        self.deferred.start()
+        logger.info(f"🌐 OpenRouter connection pool opened (http2={Config.OPENROUTER_HTTP2})")
 
-    async def analyze_message(self, message_text: str, context_prompt: str = "") -> Optional[List[Dict[str, Any]]]:
+    async def close(self):
+        """Закрывает пул соединений."""
+        if self._http is None:
+            return
+        await self.deferred.stop()
+        await self.scheduler.stop()
+        await self._http.aclose()
+        self._http = None
+        logger.info("🌐 OpenRouter connection pool closed")
+
+    async def _get_http(self) -> httpx.AsyncClient:
+        # Ленивое открытие пула, если start() не был вызван (скрипты, отладка)
+        if self._http is None:
+            await self.start()
+        return self._http
+
+    async def analyze_message(
+        self,
+        message_text: str,
+        context_prompt: str = "",
+        target_side: Optional[str] = None,
+        priority: Priority = Priority.NORMAL,
+        on_offer: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+        retry: Optional[Callable[[], Awaitable[None]]] = None,
+        chat_id: Optional[int] = None
+    ) -> Optional[List[Dict[str, Any]]]:
         """
         Отправляет сообщение на анализ в LLM.
         Возвращает список офферов или None если спам.
+        target_side — нужная сторона встречных предложений (для локального разбора).
+        priority — приоритет запроса в очереди к LLM.
+        on_offer — колбэк для офферов, полученных в потоковом режиме до завершения ответа.
+        retry — повторная обработка сообщения, если провайдер сейчас недоступен (цепь разомкнута).
+        chat_id — группа-источник; по ее выученным шаблонам сообщение разбирается без LLM.
         """
         if not self.api_key:
             return None
 
-        system_instruction = (
-            "Ты профессиональный p2p трейдер. Анализируй сообщения из чатов и извлекай торговые предложения.\n\n"
-            "**ПРАВИЛА:**\n"
-            "1. Если сообщение НЕ содержит торговых предложений (спам, вопросы, новости) — верни: {\"offers\": []}\n"
-            "2. Если сообщение содержит предложения купить/продать валюту — извлеки ВСЕ предложения в массив:\n"
-            "   {\n"
-            "     \"offers\": [\n"
-            "       {\n"
-            "         \"side\": \"buy\" | \"sell\",  // buy = автор ПОКУПАЕТ, sell = автор ПРОДАЕТ\n"
-            "         \"price\": number | null,    // Цена (курс обмена). Если не указана — null. ВАЖНО: конвертируй запятые в точки (88,90 → 88.90)\n"
-            "         \"volume\": string | null,   // Объем ('10000', '50k', 'от 100'). Если не указан — null\n"
-            "         \"currency\": string          // Валюта (USDT, RUB, USD, CNY и т.д.)\n"
-            "       }\n"
-            "     ]\n"
-            "   }\n\n"
-            "**ВАЖНО:**\n"
-            "- Если в сообщении НЕСКОЛЬКО предложений (например, 'Покупаем по 88,50, продаем по 88,90') — извлеки ОБА в массив\n"
-            "- Цены с ЗАПЯТОЙ (88,90) конвертируй в число с ТОЧКОЙ (88.90)\n"
-            "- Если цена не указана явно — ставь null\n\n"
-            "**ПРИМЕРЫ:**\n"
-            "Сообщение: 'Покупаем по 78' → {\"offers\": [{\"side\": \"buy\", \"price\": 78, \"volume\": null, \"currency\": \"RUB\"}]}\n"
-            "Сообщение: 'Продаем USD по курсу 78,50' → {\"offers\": [{\"side\": \"sell\", \"price\": 78.5, \"volume\": null, \"currency\": \"USD\"}]}\n"
-            "Сообщение: 'Покупка 89,55, Продажа 89,95' → {\"offers\": [{\"side\": \"buy\", \"price\": 89.55, \"volume\": null, \"currency\": \"RUB\"}, {\"side\": \"sell\", \"price\": 89.95, \"volume\": null, \"currency\": \"RUB\"}]}\n"
-            "Сообщение: 'Всем привет!' → {\"offers\": []}\n\n"
-            "**ВАЖНО:** Отвечай ТОЛЬКО валидным JSON, без комментариев."
-        )
-        
+        # Быстрый путь: шаблонные сообщения разбираем локально без запроса к LLM
+        if Config.FAST_PARSER_ENABLED:
+            offers = fast_parser.parse(message_text)
+            if offers is not None:
+                if target_side:
+                    offers = [o for o in offers if o["side"] == target_side]
+                return offers or None
+
+        # Повторяющиеся форматы постов группы разбираем по выученным шаблонам
+        if Config.TEMPLATES_ENABLED:
+            offers = template_store.match(chat_id, message_text)
+            if offers is not None:
+                if target_side:
+                    offers = [o for o in offers if o["side"] == target_side]
+                return offers or None
+
+        # Отсекаем приветствия, вопросы и рекламу без запроса к LLM
+        if Config.PREFILTER_ENABLED and not relevance_filter.is_relevant(message_text):
+            return None
+
+        # Повторы одного и того же текста (репосты по группам) отдаем из кэша
+        if Config.LLM_CACHE_ENABLED:
+            cached = offer_cache.get(message_text, context_prompt)
+            if cached is not MISS:
+                return cached or None
+
+        # Провайдер недоступен: не ждем таймаут, а откладываем сообщение до восстановления
+        if not self.breaker.allow_request():
+            if retry is not None:
+                self.deferred.park(retry)
+            return None
+
+        deadline = asyncio.get_running_loop().time() + Config.LLM_REQUEST_DEADLINE
+        if Config.LLM_STREAMING_ENABLED and on_offer is not None and self._should_stream(priority):
+            offers = await self.extract_offers_stream(
+                message_text, context_prompt, on_offer, priority=priority, deadline=deadline
+            )
+        elif Config.LLM_BATCH_ENABLED:
+            offers = await self.batcher.submit(message_text, context_prompt, priority=priority, deadline=deadline)
+        else:
+            offers = await self.extract_offers(message_text, context_prompt, priority=priority, deadline=deadline)
+
+        if Config.TEMPLATES_ENABLED and offers:
+            template_store.learn(chat_id, message_text, offers)
+
+        # Ошибки запроса (None) не кэшируем, пустой список (спам) — кэшируем
+        if Config.LLM_CACHE_ENABLED and offers is not None:
+            offer_cache.put(message_text, context_prompt, offers)
+
+        # Если пустой список — это спам
+        return offers or None
+
+    def _should_stream(self, priority: Priority) -> bool:
+        """
+        Ответы на нашу рассылку — всегда потоком. Остальные сообщения — только пока LLM почти
+        не загружена: под нагрузкой (порог ниже числа воркеров приема) выгоднее пакетные запросы.
+        """
+        return priority == Priority.REPLY or self.scheduler.load < Config.LLM_STREAM_MAX_LOAD
+
+    @staticmethod
+    def _build_system_instruction(context_prompt: str = "", batch: bool = False) -> str:
+        system_instruction = SYSTEM_PROMPT
+        if batch:
+            system_instruction += BATCH_PROMPT
         if context_prompt:
-             system_instruction += f"\n\n**КОНТЕКСТ ПОИСКА:** {context_prompt}"
+            system_instruction += f"\n\n**КОНТЕКСТ ПОИСКА:** {context_prompt}"
+        return system_instruction
 
+    async def _complete(
+        self,
+        system_instruction: str,
+        user_content: str,
+        priority: Priority = Priority.NORMAL,
+        deadline: Optional[float] = None
+    ) -> Optional[str]:
+        """
+        Один запрос chat/completions через очередь планировщика и роутер моделей.
+        Возвращает текст ответа модели или None (ошибка, отказ очереди, истекший дедлайн).
+        """
         payload = {
-            "model": self.model,
             "temperature": 0,
             "messages": [
                 {"role": "system", "content": system_instruction},
+                {"role": "user", "content": user_content}
+            ]
+        }
+
+        return await self.scheduler.run(
+            lambda: self.router.run(lambda model: self._post_completion({**payload, "model": model}), self._is_valid_json),
+            priority,
+            deadline
+        )
+
+    @staticmethod
+    def _is_valid_json(content: Optional[str]) -> bool:
+        return content is not None and extract_json(content) is not None
+
+    async def _post_completion(self, payload: Dict[str, Any]) -> Optional[str]:
+        return await retry_with_jitter(
+            lambda: self._post_once(payload),
+            attempts=Config.LLM_RETRY_ATTEMPTS,
+            base_delay=Config.LLM_RETRY_BASE_DELAY,
+            max_delay=Config.LLM_RETRY_MAX_DELAY,
+            breaker=self.breaker
+        )
+
+    async def _post_once(self, payload: Dict[str, Any]) -> Optional[str]:
+        client = await self._get_http()
+        try:
+            response = await client.post("/chat/completions", json=payload)
+        except httpx.HTTPError:
+            self.breaker.record_failure()
+            raise
+
+        if response.status_code != 200:
+            logger.error(f"OpenRouter Error ({payload['model']}): {response.text}")
+            if response.status_code == 429 or response.status_code >= 500:
+                self.breaker.record_failure()
+                raise TransientHTTPError(response.status_code, response.text)
+            # Прочие 4xx (неверный запрос, ключ, модель) повторять бессмысленно
+            return None
+
+        self.breaker.record_success()
+        data = response.json()
+        return data['choices'][0]['message']['content']
+
+    async def extract_offers(
+        self,
+        message_text: str,
+        context_prompt: str = "",
+        priority: Priority = Priority.NORMAL,
+        deadline: Optional[float] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Извлечение офферов из одного сообщения через LLM.
+        Возвращает список офферов (пустой для спама) или None при ошибке запроса.
+        """
+        try:
+            content = await self._complete(
+                self._build_system_instruction(context_prompt),
+                message_text,
+                priority=priority,
+                deadline=deadline
+            )
+            if content is None:
+                return None
+
+            decoded = decode_offers(content)
+            if decoded is None:
+                logger.error(f"AI response has no JSON: {content[:200]}")
+                return None
+
+            offers = [offer.model_dump() for offer in decoded]
+            capture_sample(message_text, bool(offers))
+            return offers
+
+        except Exception as e:
+            logger.error(f"AI Analysis failed: {e}")
+            return None
+
+    async def extract_offers_stream(
+        self,
+        message_text: str,
+        context_prompt: str,
+        on_offer: Callable[[Dict[str, Any]], Awaitable[None]],
+        priority: Priority = Priority.NORMAL,
+        deadline: Optional[float] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Извлечение офферов с потоковым (SSE) ответом модели.
+        Каждый оффер передается в on_offer, как только его JSON-объект получен полностью.
+        Транзиентные ошибки потока повторяются; если поток так и не дал ни одного оффера,
+        сообщение разбирается обычным запросом через роутер моделей (с хеджированием).
+        Возвращает полный список офферов или None при ошибке запроса.
+        """
+        # Поток не хеджируется: офферы уже уходят на табло по мере генерации
+        model = self.router.pick()
+        payload = {
+            "model": model,
+            "temperature": 0,
+            "stream": True,
+            "messages": [
+                {"role": "system", "content": self._build_system_instruction(context_prompt)},
                 {"role": "user", "content": message_text}
             ]
         }
+        emitted: List[Dict[str, Any]] = []
+
+        async def emit(offer: Dict[str, Any]):
+            emitted.append(offer)
+            try:
+                await on_offer(offer)
+            except Exception as e:
+                logger.error(f"Streamed offer handler failed: {e}")
+
+        async def consume() -> Optional[str]:
+            parser = OffersStreamParser()
+            streamed = 0  # офферы этой попытки: показанные до повтора повторно не отправляются
+            started = time.monotonic()
+            client = await self._get_http()
+            try:
+                async with client.stream("POST", "/chat/completions", json=payload) as response:
+                    if response.status_code != 200:
+                        body = (await response.aread()).decode(errors='replace')
+                        logger.error(f"OpenRouter Error ({model}): {body}")
+                        if response.status_code == 429 or response.status_code >= 500:
+                            raise TransientHTTPError(response.status_code, body)
+                        self.router.record(model, 0.0, ok=False)
+                        return None
+                    async for line in response.aiter_lines():
+                        chunk = parse_sse_line(line)
+                        if chunk is None:
+                            break
+                        for offer in validate_offers(parser.feed(chunk)):
+                            streamed += 1
+                            if streamed > len(emitted):
+                                await emit(offer.model_dump())
+            except Exception as e:
+                self.router.record(model, 0.0, ok=False)
+                if isinstance(e, (httpx.HTTPError, TransientHTTPError)):
+                    self.breaker.record_failure()
+                raise
+            self.router.record(model, time.monotonic() - started, ok=True)
+            self.breaker.record_success()
+            return parser.buffer
+
+        try:
+            content = await self.scheduler.run(
+                lambda: retry_with_jitter(
+                    consume,
+                    attempts=Config.LLM_RETRY_ATTEMPTS,
+                    base_delay=Config.LLM_RETRY_BASE_DELAY,
+                    max_delay=Config.LLM_RETRY_MAX_DELAY,
+                    breaker=self.breaker
+                ),
+                priority,
+                deadline
+            )
+        except Exception as e:
+            logger.error(f"AI streaming failed: {e}")
+            content = None
+
+        if content is None:
+            if emitted:
+                return None
+            return await self.extract_offers(message_text, context_prompt, priority=priority, deadline=deadline)
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/chat/completions",
-                    headers=self.headers,
-                    json=payload,
-                    timeout=10.0
-                )
-                
-                if response.status_code != 200:
-                    logger.error(f"OpenRouter Error ({self.model}): {response.text}")
-                    return None
-                    
-                data = response.json()
-                content = data['choices'][0]['message']['content']
-                
-                # Очистка от markdown
-                if "```" in content:
-                    content = content.split("```")[1].strip()
-                    if content.startswith("json"):
-                        content = content[4:].strip()
-                        
-                result = json.loads(content)
-                
-                # Новый формат: возвращаем список офферов
-                offers = result.get('offers', [])
-                
-                # Если пустой список — это спам
-                if not offers:
-                    return None
-                
-                return offers
+            decoded = decode_offers(content)
+            if decoded is None:
+                logger.error(f"AI response has no JSON: {content[:200]}")
+                return None
+
+            offers = [offer.model_dump() for offer in decoded]
+            capture_sample(message_text, bool(offers))
+
+            # Офферы, которые не удалось выделить по ходу потока, отдаем после завершения ответа
+            for offer in offers[len(emitted):]:
+                await emit(offer)
+            return offers
 
         except Exception as e:
             logger.error(f"AI Analysis failed: {e}")
             return None
 
+    async def extract_offers_batch(
+        self,
+        messages: Dict[str, str],
+        context_prompt: str = "",
+        priority: Priority = Priority.NORMAL,
+        deadline: Optional[float] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Извлечение офферов из нескольких сообщений одним запросом.
+        Возвращает {id: список офферов}; id, отсутствующие в ответе, не включаются.
+        """
+        user_content = json.dumps(
+            {"messages": [{"id": msg_id, "text": text} for msg_id, text in messages.items()]},
+            ensure_ascii=False
+        )
+        content = await self._complete(
+            self._build_system_instruction(context_prompt, batch=True),
+            user_content,
+            priority=priority,
+            deadline=deadline
+        )
+        if content is None:
+            return {}
+
+        results = decode_batch(content)
+        extracted = {}
+        for msg_id, text in messages.items():
+            if msg_id not in results:
+                continue
+            offers = [offer.model_dump() for offer in results[msg_id]]
+            capture_sample(text, bool(offers))
+            extracted[msg_id] = offers
+        return extracted
+
 # Глобальный инстанс
 ai_client = OpenRouterClient()
@@ -0,0 +1,138 @@
+import json
+from typing import Optional, Dict, Any, List, Literal
+
+from pydantic import BaseModel, ValidationError, field_validator
+
+from config import logger
+
+try:
+    import orjson
+
+    def loads(data: str) -> Any:
+        return orjson.loads(data)
+except ImportError:
+    loads = json.loads
+
+_SIDE_ALIASES = {
+    "buy": "buy",
+    "bid": "buy",
+    "покупка": "buy",
+    "sell": "sell",
+    "ask": "sell",
+    "продажа": "sell",
+}
+
+
+class Offer(BaseModel):
+    """Торговое предложение, извлеченное моделью."""
+
+    side: Optional[Literal["buy", "sell"]] = None
+    price: Optional[float] = None
+    volume: Optional[str] = None
+    currency: Optional[str] = None
+
+    @field_validator("side", mode="before")
+    @classmethod
+    def normalize_side(cls, v: Any) -> Optional[str]:
+        if v is None:
+            return None
+        return _SIDE_ALIASES.get(str(v).strip().lower())
+
+    @field_validator("price", mode="before")
+    @classmethod
+    def normalize_price(cls, v: Any) -> Optional[float]:
+        # Модель иногда возвращает цену строкой с запятой ("88,90")
+        if isinstance(v, str):
+            v = v.strip().replace(" ", "").replace(",", ".")
+            return float(v) if v else None
+        return v
+
+    @field_validator("volume", mode="before")
+    @classmethod
+    def normalize_volume(cls, v: Any) -> Optional[str]:
+        if v is None or v == "":
+            return None
+        return str(v)
+
+    @field_validator("currency", mode="before")
+    @classmethod
+    def normalize_currency(cls, v: Any) -> Optional[str]:
+        return str(v).strip().upper() if v else None
+
+
+def extract_json(content: str) -> Optional[Dict[str, Any]]:
+    """
+    Находит первый JSON-объект в ответе модели сканированием скобок.
+    Устойчив к markdown-блокам, пояснениям до и после JSON.
+    """
+    if not content:
+        return None
+
+    start = content.find("{")
+    while start != -1:
+        depth = 0
+        in_string = False
+        escape = False
+        for pos in range(start, len(content)):
+            char = content[pos]
+            if in_string:
+                if escape:
+                    escape = False
+                elif char == "\\":
+                    escape = True
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char == "{":
+                depth += 1
+            elif char == "}":
+                depth -= 1
+                if depth == 0:
+                    try:
+                        result = loads(content[start:pos + 1])
+                        if isinstance(result, dict):
+                            return result
+                    except ValueError:
+                        pass
+                    break
+        start = content.find("{", start + 1)
+    return None
+
+
+def validate_offers(items: Any) -> List[Offer]:
+    """Проверяет офферы по схеме; некорректные отбрасываются поштучно."""
+    if not isinstance(items, list):
+        return []
+    offers = []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        try:
+            offers.append(Offer.model_validate(item))
+        except ValidationError as e:
+            logger.debug(f"Dropping invalid offer {item}: {e}")
+    return offers
+
+
+def decode_offers(content: str) -> Optional[List[Offer]]:
+    """Офферы из ответа в формате {"offers": [...]} или None, если JSON не найден."""
+    result = extract_json(content)
+    if result is None:
+        return None
+    return validate_offers(result.get("offers", []))
+
+
+def decode_batch(content: str) -> Dict[str, List[Offer]]:
+    """Офферы пакетного ответа {"results": {id: {"offers": [...]}}}."""
+    result = extract_json(content)
+    if result is None:
+        return {}
+    results = result.get("results")
+    if not isinstance(results, dict):
+        return {}
+    return {
+        str(msg_id): validate_offers(item.get("offers", []))
+        for msg_id, item in results.items()
+        if isinstance(item, dict)
+    }
@@ -0,0 +1,177 @@
+import re
+from typing import Optional, Dict, Any, List
+
+# Ключевые слова направления (автор покупает / автор продает)
+_SIDE_RE = re.compile(
+    r"(?<!\w)(?:"
+    r"(?P<buy>покупк\w*|покупа\w*|куплю|купим|беру|берем|берём|buy\w*)"
+    r"|(?P<sell>продаж\w*|прода[юеё]\w*|продам|продадим|отдам|отдаем|отдаём|sell\w*)"
+    r")(?!\w)",
+    re.IGNORECASE,
+)
+
+# Валюта может стоять вплотную к числу ("500$", "100usdt"), но не внутри слова
+_CURRENCY = r"usdt|usd|eur|cny|rub|руб\w*|доллар\w*|юан\w*|евро|\$|€|¥"
+_CURRENCY_RE = re.compile(rf"(?<![^\W\d])(?P<cur>{_CURRENCY})(?![^\W\d])", re.IGNORECASE)
+# Валюта сразу за числом
+_TRAILING_CURRENCY_RE = re.compile(rf"\s*(?P<cur>{_CURRENCY})(?![^\W\d])", re.IGNORECASE)
+
+# Число: опциональный префикс диапазона объема ("от"/"до") или цены ("по"/"курс"),
+# знак, целая часть, дробная часть через точку/запятую, суффикс объема или процент
+_NUMBER_RE = re.compile(
+    r"(?<![\w.,])"
+    r"(?:(?P<prefix>от|до)\s*|(?P<price_kw>по|курс|@)\s*:?\s*)?"
+    r"(?P<sign>[+\-−])?"
+    r"(?P<int>\d+)(?:[.,](?P<frac>\d+))?"
+    r"(?:\s*(?P<percent>%)|\s*(?P<suffix>кк|kk|k|к|тыс\.?|млн|m)?)"
+    rf"(?:(?={_CURRENCY})|(?![\w%]))",
+    re.IGNORECASE,
+)
+
+# Котировка относительно курса ЦБ или в процентах ("ЦБ +2%") — это наценка, а не цена
+_RELATIVE_QUOTE_RE = re.compile(r"%|(?<!\w)(?:цб|cbr?)(?!\w)", re.IGNORECASE)
+
+# Отрицание ("не покупаю", "нет продажи") меняет смысл объявления — такие сообщения разбирает LLM
+_NEGATION_RE = re.compile(r"(?<!\w)(?:не|нет|not|no|don'?t)(?!\w)", re.IGNORECASE)
+
+_CURRENCY_ALIASES = {
+    "$": "USD",
+    "€": "EUR",
+    "¥": "CNY",
+    "евро": "EUR",
+}
+
+_CURRENCY_PREFIXES = {
+    "руб": "RUB",
+    "доллар": "USD",
+    "юан": "CNY",
+}
+
+# Цена в шаблонных постах — курс обмена, как правило двух-трехзначный
+MIN_PRICE = 1.0
+MAX_PRICE = 999.0
+# Длинные сообщения почти всегда требуют понимания контекста — отдаем их LLM
+MAX_TEXT_LENGTH = 300
+
+
+class FastOfferParser:
+    """
+    Детерминированный разбор шаблонных сообщений вида
+    "Покупка 89,55, Продажа 89,95" без обращения к LLM.
+
+    Возвращает офферы в том же формате, что и LLM, либо None,
+    если уверенности в разборе нет (тогда сообщение уходит в LLM).
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def parse(self, message_text: str) -> Optional[List[Dict[str, Any]]]:
+        offers = self._parse(message_text)
+        if offers is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return offers
+
+    def _parse(self, message_text: str) -> Optional[List[Dict[str, Any]]]:
+        if not message_text:
+            return None
+
+        text = message_text.strip()
+        if len(text) > MAX_TEXT_LENGTH or "?" in text:
+            return None
+
+        if _RELATIVE_QUOTE_RE.search(text) or _NEGATION_RE.search(text):
+            return None
+
+        sides = list(_SIDE_RE.finditer(text))
+        if not sides:
+            return None
+
+        # До первого ключевого слова не должно быть чисел — иначе непонятно, к чему они относятся
+        if _NUMBER_RE.search(text, 0, sides[0].start()):
+            return None
+
+        currency = self._detect_currency(text)
+        if currency is None:
+            return None
+
+        offers = []
+        for i, side_match in enumerate(sides):
+            end = sides[i + 1].start() if i + 1 < len(sides) else len(text)
+            offer = self._parse_segment(text, side_match, end)
+            if offer is None:
+                return None
+            offer["currency"] = currency
+            offers.append(offer)
+
+        return offers
+
+    def _parse_segment(self, text: str, side_match: "re.Match", end: int) -> Optional[Dict[str, Any]]:
+        side = "buy" if side_match.group("buy") else "sell"
+        prices = []
+        volumes = []
+
+        for num in _NUMBER_RE.finditer(text, side_match.end(), end):
+            if num.group("sign") or num.group("percent"):
+                # Знак или процент — наценка к базовому курсу, цену без LLM не определить
+                return None
+            # Число с префиксом диапазона, суффиксом или валютой, отличной от рублей ("300 usdt", "500$"), — объем
+            if num.group("prefix") or num.group("suffix") or self._followed_by_base_currency(text, num.end(), end):
+                volumes.append(num.group(0).strip())
+                continue
+
+            value = float(f"{num.group('int')}.{num.group('frac')}" if num.group("frac") else num.group("int"))
+            if num.group("frac") is None and not num.group("price_kw"):
+                if value < 1000:
+                    # Целое без "по"/"курс" может быть и ценой, и количеством — решает LLM
+                    return None
+                # Большие целые числа без суффикса — объем ("10000")
+                volumes.append(num.group(0).strip())
+            elif MIN_PRICE <= value <= MAX_PRICE:
+                prices.append(value)
+            else:
+                return None
+
+        # Ровно одна цена и не более одного объема на каждое ключевое слово
+        if len(prices) != 1 or len(volumes) > 1:
+            return None
+
+        return {
+            "side": side,
+            "price": prices[0],
+            "volume": volumes[0] if volumes else None,
+        }
+
+    @staticmethod
+    def _currency_code(token: str) -> str:
+        token = token.lower()
+        currency = _CURRENCY_ALIASES.get(token)
+        if currency is None:
+            currency = next(
+                (code for prefix, code in _CURRENCY_PREFIXES.items() if token.startswith(prefix)),
+                token.upper(),
+            )
+        return currency
+
+    def _followed_by_base_currency(self, text: str, pos: int, end: int) -> bool:
+        """Сразу за числом указана торгуемая валюта (не рубли котировки)."""
+        match = _TRAILING_CURRENCY_RE.match(text, pos, end)
+        return match is not None and self._currency_code(match.group("cur")) != "RUB"
+
+    def _detect_currency(self, text: str) -> Optional[str]:
+        found = {self._currency_code(match.group("cur")) for match in _CURRENCY_RE.finditer(text)}
+
+        # Курс USDT обычно указывается в рублях, поэтому как и LLM считаем валютой котировки RUB;
+        # без упоминания валюты котировку не угадываем
+        if found == {"USDT"} or found == {"USDT", "RUB"} or found == {"RUB"}:
+            return "RUB"
+        if len(found) == 1:
+            return found.pop()
+        return None
+
+
+# Глобальный инстанс
+fast_parser = FastOfferParser()
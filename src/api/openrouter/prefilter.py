@@ -0,0 +1,152 @@
+import json
+import math
+import re
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Optional, Iterable, Tuple, List, Dict
+
+from config import Config, logger
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_DIGIT_RE = re.compile(r"\d")
+_LINK_RE = re.compile(r"(https?://|www\.|t\.me/|@\w{4,})", re.IGNORECASE)
+_TRADE_RE = re.compile(
+    r"(покуп|куплю|купим|прода|продам|отдам|беру|курс|обмен|налич|безнал|usdt|usd|руб|rub|buy|sell|ставк)",
+    re.IGNORECASE,
+)
+_GREETING_RE = re.compile(
+    r"^\W*(всем\s+)?(привет\w*|здравствуй\w*|добр\w+\s+(утро|день|вечер|ночи)|доброе\s+утро|хай|hi|hello|спасибо\w*|благодар\w*|ок|ok|\+)\W*$",
+    re.IGNORECASE,
+)
+
+DEFAULT_FEATURES = 2 ** 18
+
+
+class RelevanceFilter:
+    """
+    Дешевый локальный фильтр релевантности перед обращением к LLM.
+
+    Сначала применяются эвристики (приветствия, вопросы без цифр, реклама со ссылками),
+    затем — линейная модель на хэшированных n-граммах, если она обучена.
+    """
+
+    def __init__(self, threshold: float = 0.5, n_features: int = DEFAULT_FEATURES):
+        self.threshold = threshold
+        self.n_features = n_features
+        self.bias = 0.0
+        self.weights: Dict[int, float] = {}
+        self.stats: Counter = Counter()
+
+    @property
+    def is_trained(self) -> bool:
+        return bool(self.weights)
+
+    @property
+    def drop_rate(self) -> float:
+        total = sum(self.stats.values())
+        return (total - self.stats["passed"]) / total if total else 0.0
+
+    def report(self) -> Dict[str, int]:
+        """Счетчики пропущенных и отброшенных (по причинам) сообщений."""
+        return dict(self.stats)
+
+    def _features(self, text: str) -> List[int]:
+        words = _WORD_RE.findall(text.lower())
+        tokens = [f"w:{w}" for w in words]
+        tokens += [f"b:{a}_{b}" for a, b in zip(words, words[1:])]
+        for w in words:
+            padded = f"<{w}>"
+            tokens += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+        tokens.append(f"d:{min(len(_DIGIT_RE.findall(text)), 10)}")
+        return [zlib.crc32(t.encode("utf-8")) % self.n_features for t in tokens]
+
+    def score(self, text: str) -> float:
+        """Вероятность того, что сообщение содержит торговое предложение."""
+        features = self._features(text)
+        z = self.bias + sum(self.weights.get(f, 0.0) for f in features)
+        return 1.0 / (1.0 + math.exp(-max(min(z, 30.0), -30.0)))
+
+    def _heuristic_reason(self, text: str) -> Optional[str]:
+        """Причина отбрасывания по эвристикам или None."""
+        stripped = text.strip()
+        if not stripped:
+            return "empty"
+
+        has_digits = bool(_DIGIT_RE.search(stripped))
+        has_trade_words = bool(_TRADE_RE.search(stripped))
+
+        if not has_digits and _GREETING_RE.match(stripped):
+            return "greeting"
+        if not has_digits and stripped.endswith("?"):
+            return "question"
+        if _LINK_RE.search(stripped) and not has_trade_words:
+            return "ad"
+        if not has_digits and not has_trade_words:
+            return "no_trade_signal"
+        return None
+
+    def is_relevant(self, text: str) -> bool:
+        """Решение фильтра с учетом счетчиков отброшенных сообщений."""
+        reason = self._heuristic_reason(text or "")
+        if reason is None and self.is_trained and self.score(text) < self.threshold:
+            reason = "model"
+
+        if reason is None:
+            self.stats["passed"] += 1
+            return True
+
+        self.stats[f"dropped_{reason}"] += 1
+        return False
+
+    def train(self, samples: Iterable[Tuple[str, bool]], epochs: int = 5, learning_rate: float = 0.1, l2: float = 1e-6):
+        """Обучение логистической регрессии SGD на парах (текст, релевантно)."""
+        samples = list(samples)
+        for _ in range(epochs):
+            for text, label in samples:
+                features = self._features(text)
+                error = self.score(text) - (1.0 if label else 0.0)
+                self.bias -= learning_rate * error
+                for f in features:
+                    w = self.weights.get(f, 0.0)
+                    self.weights[f] = w - learning_rate * (error + l2 * w)
+
+    def save(self, path: Path):
+        payload = {
+            "n_features": self.n_features,
+            "bias": self.bias,
+            "weights": {str(k): v for k, v in self.weights.items() if abs(v) > 1e-6},
+        }
+        Path(path).write_text(json.dumps(payload))
+
+    def load(self, path: Path):
+        payload = json.loads(Path(path).read_text())
+        self.n_features = payload["n_features"]
+        self.bias = payload["bias"]
+        self.weights = {int(k): v for k, v in payload["weights"].items()}
+
+
+def capture_sample(text: str, relevant: bool):
+    """Сохраняет размеченное LLM сообщение для последующего обучения фильтра."""
+    if not Config.PREFILTER_CAPTURE_PATH:
+        return
+    try:
+        with open(Config.PREFILTER_CAPTURE_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"text": text, "relevant": relevant}, ensure_ascii=False) + "\n")
+    except OSError as e:
+        logger.warning(f"Failed to capture prefilter sample: {e}")
+
+
+def _create_filter() -> RelevanceFilter:
+    relevance = RelevanceFilter(threshold=Config.PREFILTER_THRESHOLD)
+    if Config.PREFILTER_MODEL_PATH and Path(Config.PREFILTER_MODEL_PATH).exists():
+        try:
+            relevance.load(Config.PREFILTER_MODEL_PATH)
+            logger.info(f"🧠 Prefilter model loaded: {len(relevance.weights)} weights")
+        except Exception as e:
+            logger.error(f"Failed to load prefilter model: {e}")
+    return relevance
+
+
+# Глобальный инстанс
+relevance_filter = _create_filter()
@@ -0,0 +1,190 @@
+import asyncio
+import random
+import time
+from collections import deque, Counter
+from enum import Enum
+from typing import Optional, Any, Callable, Awaitable
+
+import httpx
+
+from config import logger
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Размыкатель цепи для запросов к провайдеру LLM.
+
+    После failure_threshold ошибок подряд цепь размыкается на reset_timeout секунд,
+    затем пропускает один пробный запрос (half-open): успех замыкает цепь, ошибка — снова размыкает.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+
+    @property
+    def state(self) -> CircuitState:
+        if self._state == CircuitState.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = CircuitState.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == CircuitState.OPEN
+
+    @property
+    def retry_after(self) -> float:
+        """Через сколько секунд цепь перейдет в half-open."""
+        if self._state != CircuitState.OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def allow_request(self) -> bool:
+        state = self.state
+        if state == CircuitState.CLOSED:
+            return True
+        if state == CircuitState.HALF_OPEN:
+            # Пробный запрос мог потеряться (отказ очереди, кэш) — через reset_timeout разрешаем новый
+            if not self._probe_in_flight or time.monotonic() - self._probe_started >= self.reset_timeout:
+                self._probe_in_flight = True
+                self._probe_started = time.monotonic()
+                return True
+        return False
+
+    def record_success(self):
+        if self._state != CircuitState.CLOSED:
+            logger.info("✅ LLM circuit closed, provider recovered")
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self._failures += 1
+        if self._state == CircuitState.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != CircuitState.OPEN:
+                logger.warning(f"⚡ LLM circuit opened after {self._failures} failures")
+            self._state = CircuitState.OPEN
+            self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+
+class TransientHTTPError(Exception):
+    """Ответ провайдера, который имеет смысл повторить (429, 5xx)."""
+
+    def __init__(self, status_code: int, text: str = ""):
+        super().__init__(f"HTTP {status_code}: {text[:200]}")
+        self.status_code = status_code
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Таймауты, ошибки соединения, 429 и 5xx; остальные ошибки (4xx, разбор ответа) не повторяются."""
+    return isinstance(error, (httpx.TransportError, TransientHTTPError))
+
+
+async def retry_with_jitter(
+    factory: Callable[[], Awaitable[Any]],
+    attempts: int = 3,
+    base_delay: float = 0.3,
+    max_delay: float = 2.0,
+    is_transient: Callable[[Exception], bool] = is_transient_error,
+    breaker: Optional[CircuitBreaker] = None,
+) -> Any:
+    """
+    Повторяет запрос с экспоненциальной задержкой и полным джиттером.
+    Повторяются только транзиентные ошибки (is_transient); перед каждой попыткой
+    проверяется breaker — при разомкнутой цепи повторы прекращаются и пробрасывается последняя ошибка.
+    """
+    last_error: Optional[Exception] = None
+    for attempt in range(attempts):
+        if breaker is not None and breaker.is_open:
+            break
+        try:
+            return await factory()
+        except Exception as e:
+            if not is_transient(e) or attempt == attempts - 1:
+                raise
+            last_error = e
+            logger.warning(f"Retrying after error (attempt {attempt + 1}/{attempts}): {e}")
+        await asyncio.sleep(random.uniform(0, min(max_delay, base_delay * 2 ** attempt)))
+    if last_error is not None:
+        raise last_error
+    return None
+
+
+class DeferredQueue:
+    """
+    Очередь отложенной обработки сообщений на время разомкнутой цепи.
+    Когда провайдер восстанавливается, сохраненные задачи выполняются повторно.
+    """
+
+    def __init__(self, breaker: CircuitBreaker, max_size: int = 1000, concurrency: int = 4):
+        self.breaker = breaker
+        self.max_size = max_size
+        self.concurrency = concurrency
+        self.stats: Counter = Counter()
+        self._items: deque = deque()
+        self._has_items = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def park(self, factory: Callable[[], Awaitable[None]]):
+        if len(self._items) >= self.max_size:
+            self._items.popleft()
+            self.stats["dropped"] += 1
+        self._items.append(factory)
+        self.stats["parked"] += 1
+        self._has_items.set()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._drain_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self, factory: Callable[[], Awaitable[None]]):
+        try:
+            await factory()
+            self.stats["replayed"] += 1
+        except Exception as e:
+            logger.error(f"Deferred message processing failed: {e}")
+
+    async def _drain_loop(self):
+        while True:
+            await self._has_items.wait()
+            if not self._items:
+                self._has_items.clear()
+                continue
+
+            if self.breaker.is_open:
+                await asyncio.sleep(max(self.breaker.retry_after, 0.5))
+                continue
+
+            if self.breaker.state == CircuitState.HALF_OPEN:
+                # Один пробный запрос: его результат решит, замыкать ли цепь
+                await self._run(self._items.popleft())
+                if self.breaker.state == CircuitState.HALF_OPEN:
+                    await asyncio.sleep(0.5)
+                continue
+
+            batch = [self._items.popleft() for _ in range(min(self.concurrency, len(self._items)))]
+            if batch:
+                logger.info(f"♻️ Replaying {len(batch)} deferred messages ({len(self._items)} left)")
+            await asyncio.gather(*(self._run(factory) for factory in batch))
@@ -0,0 +1,129 @@
+import asyncio
+import time
+from collections import deque
+from typing import Optional, Any, Callable, Awaitable, List, Dict
+
+from config import logger
+
+# Сколько последних запросов учитывается в статистике модели
+WINDOW_SIZE = 50
+# Модель с долей ошибок выше порога считается нездоровой
+MAX_ERROR_RATE = 0.5
+MIN_SAMPLES = 5
+
+
+class ModelStats:
+    """Скользящая статистика задержек и ошибок одной модели."""
+
+    def __init__(self):
+        self.latencies: deque = deque(maxlen=WINDOW_SIZE)
+        self.outcomes: deque = deque(maxlen=WINDOW_SIZE)
+
+    def record(self, latency: float, ok: bool):
+        self.outcomes.append(ok)
+        if ok or latency > 0:
+            self.latencies.append(latency)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    @property
+    def is_healthy(self) -> bool:
+        return len(self.outcomes) < MIN_SAMPLES or self.error_rate <= MAX_ERROR_RATE
+
+
+class ModelRouter:
+    """
+    Выбор модели по задержке и доле ошибок с хеджированными запросами:
+    если основная модель не ответила за свой p90, параллельно отправляется запрос
+    к следующей модели, и берется первый корректный ответ.
+    """
+
+    def __init__(self, models: List[str], hedge_enabled: bool = True, min_hedge_delay: float = 1.5, default_hedge_delay: float = 4.0):
+        self.models = models
+        self.hedge_enabled = hedge_enabled
+        self.min_hedge_delay = min_hedge_delay
+        self.default_hedge_delay = default_hedge_delay
+        self.stats: Dict[str, ModelStats] = {model: ModelStats() for model in models}
+        self.hedges_fired = 0
+        self.hedges_won = 0
+
+    def ordered_models(self) -> List[str]:
+        """Здоровые модели первыми, затем по медианной задержке; без статистики — в порядке конфигурации."""
+        def key(model: str):
+            stats = self.stats[model]
+            p50 = stats.percentile(0.5)
+            return (not stats.is_healthy, p50 if p50 is not None else float("inf"), self.models.index(model))
+        return sorted(self.models, key=key)
+
+    def pick(self) -> str:
+        return self.ordered_models()[0]
+
+    def hedge_delay(self, model: str) -> float:
+        p90 = self.stats[model].percentile(0.9)
+        if p90 is None:
+            return self.default_hedge_delay
+        return max(self.min_hedge_delay, p90)
+
+    def record(self, model: str, latency: float, ok: bool):
+        self.stats[model].record(latency, ok)
+
+    async def _timed(self, model: str, request: Callable[[str], Awaitable[Any]], validate: Callable[[Any], bool]) -> Any:
+        started = time.monotonic()
+        try:
+            result = await request(model)
+        except asyncio.CancelledError:
+            # Проигравший хедж прерван раньше ответа — его время не задержка модели, не учитываем
+            raise
+        except Exception as e:
+            self.record(model, 0.0, ok=False)
+            logger.warning(f"Model {model} request failed: {e}")
+            return None
+
+        ok = validate(result)
+        self.record(model, time.monotonic() - started if ok else 0.0, ok=ok)
+        return result if ok else None
+
+    async def run(self, request: Callable[[str], Awaitable[Any]], validate: Callable[[Any], bool] = lambda r: r is not None) -> Any:
+        """
+        Выполняет request(model) на лучшей модели, при необходимости хеджируя запрос.
+        Возвращает первый результат, прошедший validate, или None.
+        """
+        candidates = self.ordered_models()
+        primary = candidates[0]
+        tasks = {asyncio.create_task(self._timed(primary, request, validate)): primary}
+        backups = candidates[1:] if self.hedge_enabled else []
+
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay(primary))
+            while True:
+                for task in done:
+                    model = tasks.pop(task)
+                    result = task.result()
+                    if result is not None:
+                        if model != primary:
+                            self.hedges_won += 1
+                        return result
+
+                # Основной запрос завис или вернул ошибку — подключаем следующую модель
+                if backups and (not tasks or not done):
+                    hedge = backups.pop(0)
+                    self.hedges_fired += 1
+                    logger.info(f"🔀 Hedging LLM request: {primary} -> {hedge}")
+                    tasks[asyncio.create_task(self._timed(hedge, request, validate))] = hedge
+
+                if not tasks:
+                    return None
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,122 @@
+import asyncio
+import itertools
+from collections import Counter
+from enum import IntEnum
+from typing import Optional, Any, Callable, Awaitable, List
+
+from config import logger
+
+
+class Priority(IntEnum):
+    """Приоритет запроса к LLM (меньше — важнее)."""
+    REPLY = 0          # ответ на наше сообщение рассылки
+    KNOWN_TRADER = 1   # сообщение от трейдера, который уже присылал офферы
+    NORMAL = 2
+
+
+class LLMScheduler:
+    """
+    Диспетчер запросов к LLM: ограничивает число одновременных запросов,
+    выдает их в порядке приоритета и отбрасывает запросы с истекшим дедлайном.
+
+    При переполнении очереди запросы с приоритетом NORMAL отклоняются (backpressure).
+    """
+
+    def __init__(self, max_concurrency: int = 8, max_queue: int = 200):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.stats: Counter = Counter()
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._workers: List[asyncio.Task] = []
+        self._seq = itertools.count()
+        self._active = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def load(self) -> int:
+        """Запросы в работе и в очереди."""
+        return self._active + self.queue_depth
+
+    @property
+    def is_saturated(self) -> bool:
+        """Сигнал для вызывающих: новые запросы будут ждать или отклоняться."""
+        return self.queue_depth >= self.max_queue
+
+    def _ensure_workers(self):
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.max_concurrency)]
+
+    async def run(
+        self,
+        factory: Callable[[], Awaitable[Any]],
+        priority: Priority = Priority.NORMAL,
+        deadline: Optional[float] = None,
+    ) -> Any:
+        """
+        Ставит запрос в очередь и ждет результат.
+        deadline — момент времени по loop.time(), после которого результат не нужен (вернется None).
+        """
+        self._ensure_workers()
+
+        if self.is_saturated and priority >= Priority.NORMAL:
+            self.stats["rejected"] += 1
+            logger.warning(f"LLM queue is full ({self.queue_depth}), request rejected")
+            return None
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((int(priority), next(self._seq), deadline, factory, future))
+        self.stats["submitted"] += 1
+        return await future
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            _, _, deadline, factory, future = await self._queue.get()
+            try:
+                if future.done():
+                    continue
+
+                timeout = None
+                if deadline is not None:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        self.stats["expired"] += 1
+                        future.set_result(None)
+                        continue
+
+                self._active += 1
+                try:
+                    result = await asyncio.wait_for(factory(), timeout)
+                except asyncio.TimeoutError:
+                    self.stats["expired"] += 1
+                    if not future.done():
+                        future.set_result(None)
+                    continue
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    if not future.done():
+                        future.set_exception(e)
+                    continue
+                finally:
+                    self._active -= 1
+
+                self.stats["completed"] += 1
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self._queue.task_done()
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
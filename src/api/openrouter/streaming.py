@@ -0,0 +1,88 @@
+import json
+from typing import Optional, Dict, Any, List
+
+
+def parse_sse_line(line: str) -> Optional[str]:
+    """
+    Разбирает строку server-sent events от chat/completions.
+    Возвращает фрагмент текста ответа, "" для служебных строк и None в конце потока.
+    """
+    if not line.startswith("data:"):
+        return ""
+    data = line[5:].strip()
+    if data == "[DONE]":
+        return None
+    try:
+        chunk = json.loads(data)
+    except json.JSONDecodeError:
+        return ""
+    choices = chunk.get("choices") or []
+    if not choices:
+        return ""
+    return (choices[0].get("delta") or {}).get("content") or ""
+
+
+class OffersStreamParser:
+    """
+    Инкрементальный разбор массива "offers" из потокового JSON-ответа модели.
+
+    feed() принимает очередной фрагмент текста и возвращает офферы,
+    объекты которых полностью получены к этому моменту.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._array_found = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._object_start: Optional[int] = None
+        self._finished = False
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        self.buffer += chunk
+        completed = []
+
+        if not self._array_found:
+            key = self.buffer.find('"offers"')
+            if key == -1:
+                return completed
+            bracket = self.buffer.find("[", key)
+            if bracket == -1:
+                return completed
+            self._array_found = True
+            self._pos = bracket + 1
+
+        while self._pos < len(self.buffer) and not self._finished:
+            char = self.buffer[self._pos]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                if self._depth == 0:
+                    self._object_start = self._pos
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0 and self._object_start is not None:
+                    try:
+                        offer = json.loads(self.buffer[self._object_start:self._pos + 1])
+                        if isinstance(offer, dict):
+                            completed.append(offer)
+                    except json.JSONDecodeError:
+                        pass
+                    self._object_start = None
+            elif char == "]" and self._depth == 0:
+                self._finished = True
+
+            self._pos += 1
+
+        return completed
@@ -0,0 +1,248 @@
+import asyncio
+import re
+from collections import Counter
+from typing import Optional, Dict, Any, List
+
+from config import Config, logger
+
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)?")
+_WHITESPACE_RE = re.compile(r"\s+")
+_VOLUME_SHAPE = r"(?:от\s*)?\d+(?:[.,]\d+)?\s*(?:кк|kk|k|к|тыс\.?|млн|m)?"
+_VOLUME_RE = re.compile(rf"^{_VOLUME_SHAPE}$", re.IGNORECASE)
+_PRICE_SLOT = r"\d+(?:[.,]\d+)?"
+
+
+def _to_float(token: str) -> float:
+    return float(token.replace(",", "."))
+
+
+def _looks_like_price(token: str) -> bool:
+    """Число, которое могло быть ценой: дробное или двух-трехзначное целое."""
+    if "," in token or "." in token:
+        return True
+    return 10 <= int(token) <= 999
+
+
+def _literal(text: str) -> str:
+    """Экранированный литерал; пробелы — гибкие, прочие числа — обобщенные."""
+    parts = []
+    for piece in _WHITESPACE_RE.split(text):
+        escaped = []
+        last = 0
+        for num in _NUMBER_RE.finditer(piece):
+            escaped.append(re.escape(piece[last:num.start()]))
+            escaped.append(r"\d+")
+            last = num.end()
+        escaped.append(re.escape(piece[last:]))
+        parts.append("".join(escaped))
+    return r"\s+".join(parts)
+
+
+def induce_template(text: str, offers: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Строит шаблон сообщения по подтвержденному LLM разбору:
+    цены и объемы становятся именованными группами, остальной текст — литералом.
+    Возвращает None, если разбор не объясняет все похожие на цену числа в тексте.
+    """
+    text = _WHITESPACE_RE.sub(" ", (text or "").strip())
+    if not text or not offers:
+        return None
+
+    slots = []  # (start, end, regex, name)
+    skeleton = []
+    used = set()
+
+    for i, offer in enumerate(offers):
+        price = offer.get("price")
+        if price is None:
+            return None
+
+        price_match = next(
+            (m for m in _NUMBER_RE.finditer(text) if m.start() not in used and _to_float(m.group()) == float(price)),
+            None
+        )
+        if price_match is None:
+            return None
+        used.add(price_match.start())
+        slots.append((price_match.start(), price_match.end(), _PRICE_SLOT, f"p{i}"))
+
+        volume_name = None
+        volume = offer.get("volume")
+        if volume:
+            pos = text.lower().find(str(volume).lower())
+            if pos == -1 or pos in used or not _VOLUME_RE.match(str(volume)):
+                return None
+            used.add(pos)
+            volume_name = f"v{i}"
+            slots.append((pos, pos + len(str(volume)), _VOLUME_SHAPE, volume_name))
+
+        skeleton.append({
+            "side": offer.get("side"),
+            "currency": offer.get("currency"),
+            "price": f"p{i}",
+            "volume": volume_name,
+        })
+
+    slots.sort()
+    for (_, end, _, _), (start, _, _, _) in zip(slots, slots[1:]):
+        if start < end:
+            return None
+
+    pattern = []
+    last = 0
+    for start, end, slot_re, name in slots:
+        literal = text[last:start]
+        if any(_looks_like_price(num.group()) for num in _NUMBER_RE.finditer(literal)):
+            return None
+        pattern.append(_literal(literal))
+        pattern.append(f"(?P<{name}>{slot_re})")
+        last = end
+    tail = text[last:]
+    if any(_looks_like_price(num.group()) for num in _NUMBER_RE.finditer(tail)):
+        return None
+    pattern.append(_literal(tail))
+
+    return {"pattern": "".join(pattern), "offers": skeleton}
+
+
+class GroupTemplates:
+    """Шаблоны одной группы и статистика их срабатывания."""
+
+    def __init__(self, templates: Optional[List[Dict[str, Any]]] = None):
+        self.templates: List[Dict[str, Any]] = list(templates or [])
+        self.candidates: Counter = Counter()
+        self.hits = 0
+        self.misses = 0
+        self._compiled: List[tuple] = []
+        self._compile()
+
+    def _compile(self):
+        self._compiled = []
+        for template in self.templates:
+            try:
+                self._compiled.append((re.compile(template["pattern"], re.IGNORECASE), template["offers"]))
+            except re.error:
+                logger.warning(f"Skipping invalid template: {template['pattern']}")
+
+    def add(self, template: Dict[str, Any], max_size: int):
+        """Добавить рабочий шаблон (самый старый вытесняется сверх max_size) и перекомпилировать."""
+        self.templates.append(template)
+        if len(self.templates) > max_size:
+            self.templates.pop(0)
+        self._compile()
+
+    def match(self, text: str) -> Optional[List[Dict[str, Any]]]:
+        normalized = _WHITESPACE_RE.sub(" ", (text or "").strip())
+        for regex, skeleton in self._compiled:
+            m = regex.fullmatch(normalized)
+            if m is None:
+                continue
+            self.hits += 1
+            return [
+                {
+                    "side": offer["side"],
+                    "price": _to_float(m.group(offer["price"])),
+                    "volume": m.group(offer["volume"]).strip() if offer["volume"] else None,
+                    "currency": offer["currency"],
+                }
+                for offer in skeleton
+            ]
+        self.misses += 1
+        return None
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class TemplateStore:
+    """
+    Хранилище шаблонов сообщений по группам (Group.telegram_id).
+
+    Шаблон индуцируется из каждого подтвержденного LLM разбора и начинает
+    использоваться после min_support совпадений; рабочие шаблоны сохраняются в groups.templates.
+    """
+
+    def __init__(self, min_support: int = 2, max_per_group: int = 20):
+        self.min_support = min_support
+        self.max_per_group = max_per_group
+        self.groups: Dict[int, GroupTemplates] = {}
+
+    def _group(self, chat_id: int) -> GroupTemplates:
+        if chat_id not in self.groups:
+            self.groups[chat_id] = GroupTemplates()
+        return self.groups[chat_id]
+
+    def match(self, chat_id: Optional[int], text: str) -> Optional[List[Dict[str, Any]]]:
+        if chat_id is None:
+            return None
+        return self._group(chat_id).match(text)
+
+    def learn(self, chat_id: Optional[int], text: str, offers: List[Dict[str, Any]]):
+        if chat_id is None or not offers:
+            return
+        template = induce_template(text, offers)
+        if template is None:
+            return
+
+        group = self._group(chat_id)
+        if any(t["pattern"] == template["pattern"] for t in group.templates):
+            return
+
+        group.candidates[template["pattern"]] += 1
+        if group.candidates[template["pattern"]] < self.min_support:
+            return
+
+        del group.candidates[template["pattern"]]
+        group.add(template, self.max_per_group)
+        logger.info(f"🧩 New message template for group {chat_id}: {template['pattern']}")
+        asyncio.create_task(self._save(chat_id, list(group.templates)))
+
+    async def _save(self, chat_id: int, templates: List[Dict[str, Any]]):
+        from database.client import get_db_session
+        from services import GroupService
+        try:
+            async with get_db_session() as session:
+                await GroupService(session).update_templates(chat_id, templates)
+        except Exception as e:
+            logger.error(f"Failed to save templates for group {chat_id}: {e}")
+
+    async def load(self):
+        """Загружает сохраненные шаблоны групп из БД."""
+        from database.client import get_db_session
+        from services import GroupService
+        try:
+            async with get_db_session() as session:
+                groups = await GroupService(session).list_groups()
+        except Exception as e:
+            logger.error(f"Failed to load message templates: {e}")
+            return
+
+        loaded = 0
+        for group in groups:
+            if group.templates:
+                self.groups[group.telegram_id] = GroupTemplates(group.templates)
+                loaded += len(group.templates)
+        logger.info(f"🧩 Loaded {loaded} message templates")
+
+    def report(self) -> List[Dict[str, Any]]:
+        """Статистика по группам: число шаблонов, попадания и промахи."""
+        return [
+            {
+                "chat_id": chat_id,
+                "templates": len(group.templates),
+                "hits": group.hits,
+                "misses": group.misses,
+                "hit_rate": group.hit_rate,
+            }
+            for chat_id, group in self.groups.items()
+            if group.templates or group.hits
+        ]
+
+
+# Глобальный инстанс
+template_store = TemplateStore(
+    min_support=Config.TEMPLATES_MIN_SUPPORT,
+    max_per_group=Config.TEMPLATES_MAX_PER_GROUP
+)
@@ -4,7 +4,7 @@ from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
 from aiogram.types import BotCommand
 
-from bot.handlers import group_handlers, session_handlers, base_handlers, custom_broadcast_handlers
+from bot.handlers import group_handlers, session_handlers, base_handlers, custom_broadcast_handlers, broadcast_handlers
 from bot.middleware.db_middleware import DatabaseMiddleware
 from bot.middleware.auth_middleware import AuthMiddleware
 from config import Config
@@ -30,6 +30,7 @@ async def setup_bot():
     dp.include_router(group_handlers.router)
     dp.include_router(session_handlers.router)
     dp.include_router(custom_broadcast_handlers.router)
+    dp.include_router(broadcast_handlers.router)
     # Fallback роутер (catch-all) должен быть ПОСЛЕДНИМ
     dp.include_router(base_handlers.router)
     
@@ -40,8 +41,11 @@ async def setup_bot():
         BotCommand(command="groups", description="Список групп"),
         BotCommand(command="update_groups", description="Обновить чаты из аккаунта"),
         BotCommand(command="remove_groups", description="Удалить все группы"),
+        BotCommand(command="templates", description="Шаблоны сообщений групп"),
+        BotCommand(command="stats", description="Статистика разбора сообщений"),
         BotCommand(command="create_session", description="Создать запрос"),
         BotCommand(command="broadcast_custom", description="Произвольная рассылка"),
+        BotCommand(command="cancel_broadcast", description="Отменить идущую рассылку"),
     ]
     await bot.set_my_commands(commands)
     
@@ -28,6 +28,9 @@ async def cmd_help(message: Message):
         "<b>Управление:</b>\n"
         "• /groups — Список всех отслеживаемых групп\n"
         "• /create_session — Создать запрос сбора ликвидности\n"
+        "• /cancel_broadcast — Отменить идущую рассылку\n"
+        "• /templates — Шаблоны сообщений групп и их попадания\n"
+        "• /stats — Статистика префильтра и кэша LLM\n"
         "<b>Дополнительно:</b>\n"
         "• /start — Начать работу с ботом\n"
         "• /help — Показать эту справку"
@@ -0,0 +1,61 @@
+"""
+Фоновая рассылка: сообщение о ходе рассылки и ее отмена
+"""
+from typing import List
+
+from aiogram import Router, F
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.filters import Command
+
+from database import Group
+from userbot.manager import UserbotManager
+from userbot.broadcast import BroadcastJob, format_broadcast_progress, format_broadcast_report
+from userbot.deliveries import start_session_broadcast
+
+router = Router()
+
+CANCEL_KEYBOARD = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="⛔ Отменить рассылку", callback_data="broadcast_cancel")]
+])
+
+
+async def launch_broadcast(message: Message, userbot: UserbotManager, session_id: int, groups: List[Group], text: str) -> BroadcastJob:
+    """
+    Запускает рассылку сессии фоновой задачей. Каждый чат добавляется в мониторинг
+    сразу после отправки в него, ход рассылки обновляется в отдельном сообщении.
+    """
+    status_msg = await message.answer(f"🚀 Рассылка в {len(groups)} групп запущена...", reply_markup=CANCEL_KEYBOARD)
+    titles = {g.telegram_id: g.title for g in groups}
+
+    async def on_progress(job: BroadcastJob, finished: bool):
+        if not finished:
+            await status_msg.edit_text(format_broadcast_progress(job), reply_markup=CANCEL_KEYBOARD)
+            return
+        summary = format_broadcast_report(job.report, titles)
+        if job.cancelled:
+            summary = f"⛔ Рассылка отменена, не отправлено: {job.remaining}\n" + summary
+        elif job.interrupted:
+            summary = f"⏸ Рассылка прервана перезапуском, будет дослана: {job.remaining}\n" + summary
+        await status_msg.edit_text(summary)
+
+    return await start_session_broadcast(
+        userbot, session_id, [g.telegram_id for g in groups], text, on_progress=on_progress
+    )
+
+
+async def _cancel(userbot: UserbotManager) -> str:
+    if userbot.dispatcher.cancel_job():
+        return "⛔ Рассылка останавливается. Уже отправленные сообщения продолжают отслеживаться."
+    return "ℹ️ Нет идущей рассылки."
+
+
+@router.message(Command("cancel_broadcast"))
+async def cmd_cancel_broadcast(message: Message, userbot: UserbotManager):
+    """Отменить идущую рассылку"""
+    await message.answer(await _cancel(userbot))
+
+
+@router.callback_query(F.data == "broadcast_cancel")
+async def callback_cancel_broadcast(callback: CallbackQuery, userbot: UserbotManager):
+    """Отмена рассылки кнопкой в сообщении о ходе рассылки"""
+    await callback.answer(await _cancel(userbot), show_alert=False)
@@ -4,11 +4,11 @@ from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from sqlalchemy.ext.asyncio import AsyncSession
-import asyncio
 
-from services import GroupService
-from config import logger
+from services import GroupService, SessionService
+from database import TradeDirection
 from userbot.manager import UserbotManager
+from bot.handlers.broadcast_handlers import launch_broadcast
 from utils.broadcast_state import broadcast_manager
 
 
@@ -54,26 +54,29 @@ async def process_custom_ttl(message: Message, state: FSMContext, session: Async
         group_service = GroupService(session)
         active_groups = await group_service.get_active_groups()
         
-        chat_ids = []
-        if active_groups:
-            status_msg = await message.answer(f"🚀 Запускаю рассылку в {len(active_groups)} групп...")
-            for group in active_groups:
-                try:
-                    await userbot.client.send_message(entity=group.telegram_id, message=custom_text, parse_mode='html')
-                    chat_ids.append(group.telegram_id)
-                    await asyncio.sleep(1.0)  # Анти-флуд
-                except Exception as e:
-                    logger.error(f"Broadcast error: {e}")
-        else:
+        if not active_groups:
             await message.answer("⚠️ Нет активных групп для рассылки.")
             await state.clear()
             return
         
-        # Запускаем мониторинг в кастомном режиме
+        # Сохраняем рассылку как сессию — по ней учитывается доставка
+        trading_session = await SessionService(session).create_session(
+            direction=TradeDirection.BUY,  # Dummy value
+            currency_from='N/A',  # Dummy value
+            currency_to='N/A',  # Dummy value
+            volume='',
+            time_to_live_minutes=ttl,
+            is_custom_broadcast=True,
+            custom_message=custom_text,
+            admin_id=message.from_user.id
+        )
+
+        # Запускаем мониторинг в кастомном режиме; чаты добавляются по мере отправки рассылки
+        userbot.dispatcher.cancel_job()
         broadcast_manager.start(
             admin_id=message.from_user.id,
             duration_minutes=ttl,
-            target_chat_ids=chat_ids,
+            target_chat_ids=[],
             direction='buy',  # Dummy value
             currency_from='N/A',  # Dummy value
             currency_to='N/A',  # Dummy value
@@ -94,6 +97,7 @@ async def process_custom_ttl(message: Message, state: FSMContext, session: Async
         except Exception as e:
             await message.answer(f"⚠️ Табло не создалось: {e}")
         
+        await launch_broadcast(message, userbot, trading_session.id, active_groups, custom_text)
         await state.clear()
         
     except ValueError:
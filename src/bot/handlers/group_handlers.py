@@ -44,8 +44,8 @@ async def get_groups_page_data(session: AsyncSession, page: int = 1):
         display_title = (group.title[:25] + '..') if len(group.title) > 25 else group.title
         
         # Статус кнопка
-        status_text = "🔊 Включить" if group.status == GroupStatus.INACTIVE else "🔇 Выключить"
-        status_action = "enable_group" if group.status == GroupStatus.INACTIVE else "disable_group"
+        status_text = "🔊 Включить" if group.status != GroupStatus.ACTIVE else "🔇 Выключить"
+        status_action = "enable_group" if group.status != GroupStatus.ACTIVE else "disable_group"
 
         buttons.append([
             InlineKeyboardButton(text=f"{idx}. {display_title}", callback_data=f"groups_page:{page}"), # Просто кнопка-метка
@@ -77,6 +77,28 @@ async def get_groups_page_data(session: AsyncSession, page: int = 1):
     return text, keyboard
 
 
+def format_sync_result(group_sync: Any, started: bool) -> str:
+    """Статус фоновой синхронизации и итог последнего прохода для админа"""
+    if started:
+        text = "🔍 Синхронизация запущена в фоне.\n\n"
+    elif group_sync.is_running:
+        text = "⏳ Синхронизация уже идет.\n\n"
+    else:
+        text = ""
+
+    result = group_sync.last_result
+    if result is None:
+        return text + "ℹ️ Результатов синхронизации пока нет."
+    kind = "полной" if result['full'] else "инкрементальной"
+    return text + (
+        f"✅ Итог последней {kind} синхронизации ({result['finished_at'].strftime('%H:%M:%S')}):\n"
+        f"➕ Добавлено: {result['added']}\n"
+        f"✏️ Обновлено: {result['updated']}\n"
+        f"🔇 Вышли из групп: {result['deactivated']}\n"
+        f"▫️ Без изменений: {result['unchanged']}"
+    )
+
+
 @router.message(Command("groups"))
 async def cmd_groups(message: Message, session: AsyncSession):
     """Список групп"""
@@ -87,10 +109,8 @@ async def cmd_groups(message: Message, session: AsyncSession):
 @router.message(Command("update_groups"))
 async def cmd_sync(message: Message, session: AsyncSession, userbot: Any):
     """Принудительная синхронизация групп"""
-    from userbot.handlers import sync_groups
-    sent_msg = await message.answer("🔍 Синхронизация... это может занять время.")
-    await sync_groups(userbot.client)
-    await sent_msg.edit_text("✅ Синхронизация завершена!")
+    started = userbot.group_sync.trigger(full=True)
+    await message.answer(format_sync_result(userbot.group_sync, started))
     # Показываем обновленный список
     text, keyboard = await get_groups_page_data(session, page=1)
     await message.answer(text, reply_markup=keyboard)
@@ -107,6 +127,54 @@ async def cmd_remove_groups(message: Message, session: AsyncSession):
     await message.answer(text, reply_markup=keyboard)
 
 
+@router.message(Command("templates"))
+async def cmd_templates(message: Message, session: AsyncSession):
+    """Статистика выученных шаблонов сообщений по группам"""
+    from api.openrouter.templates import template_store
+    report = template_store.report()
+    if not report:
+        await message.answer("🧩 Шаблоны сообщений еще не выучены.")
+        return
+
+    service = GroupService(session)
+    text = "🧩 <b>Шаблоны сообщений по группам:</b>\n\n"
+    for row in sorted(report, key=lambda r: r["hits"], reverse=True):
+        group = await service.get_group_by_telegram_id(row["chat_id"])
+        title = html.escape(group.title) if group and group.title else str(row["chat_id"])
+        text += f"<b>{title}</b>\n"
+        text += f"   Шаблонов: {row['templates']}, попаданий: {row['hits']}/{row['hits'] + row['misses']} ({row['hit_rate']:.0%})\n\n"
+    await message.answer(text)
+
+
+@router.message(Command("stats"))
+async def cmd_stats(message: Message):
+    """Счетчики конвейера разбора сообщений"""
+    from api.openrouter.prefilter import relevance_filter
+    prefilter_stats = relevance_filter.report()
+    text = "📈 <b>Статистика разбора сообщений</b>\n\n"
+
+    from userbot.ingest import ingest_queue
+    ingest = ingest_queue.snapshot()
+    text += f"<b>Очередь приема</b> ({ingest['depth']}/{ingest_queue.max_size}, максимум {ingest['max_depth']}):\n"
+    text += f"   Принято: {ingest.get('enqueued', 0)}, обработано: {ingest.get('processed', 0)}, ошибок: {ingest.get('failed', 0)}\n"
+    dropped = ingest.get('dropped_oldest', 0) + ingest.get('dropped_newest', 0)
+    text += f"   Отброшено при переполнении: {dropped}\n"
+    text += f"   Ожидание в очереди: p50 {ingest['wait_p50']:.2f} с, p99 {ingest['wait_p99']:.2f} с\n"
+
+    text += f"\n<b>Префильтр</b> (модель {'обучена' if relevance_filter.is_trained else 'не обучена'}):\n"
+    text += f"   Пропущено: {prefilter_stats.get('passed', 0)}, отброшено: {relevance_filter.drop_rate:.0%}\n"
+    for reason, count in sorted(prefilter_stats.items()):
+        if reason.startswith("dropped_"):
+            text += f"   • {reason[len('dropped_'):]}: {count}\n"
+
+    from api.openrouter.cache import offer_cache
+    cache_stats = offer_cache.stats
+    text += f"\n<b>Кэш ответов LLM</b> ({len(offer_cache)}/{offer_cache.max_size} записей):\n"
+    text += f"   Попаданий: {cache_stats['hits']}, промахов: {cache_stats['misses']} ({offer_cache.hit_rate:.0%} попаданий)\n"
+    text += f"   Устарело: {cache_stats['expired']}, вытеснено: {cache_stats['evictions']}\n"
+    await message.answer(text)
+
+
 @router.callback_query(F.data == "remove_groups")
 async def callback_remove_groups(callback: CallbackQuery, session: AsyncSession):
     """Удаление всех групп"""
@@ -120,10 +188,9 @@ async def callback_remove_groups(callback: CallbackQuery, session: AsyncSession)
 @router.callback_query(F.data == "sync_groups")
 async def callback_sync_groups(callback: CallbackQuery, session: AsyncSession, userbot: Any):
     """Синхронизация через кнопку"""
-    from userbot.handlers import sync_groups
-    await callback.answer("⏳ Начинаю сканирование чатов...")
-    await sync_groups(userbot.client)
-    await callback.message.answer("✅ Группы синхронизированы!")
+    started = userbot.group_sync.trigger(full=True)
+    await callback.answer()
+    await callback.message.answer(format_sync_result(userbot.group_sync, started))
     
     # Обновляем сообщение со списком
     text, keyboard = await get_groups_page_data(session, page=1)
@@ -5,13 +5,12 @@ from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from sqlalchemy.ext.asyncio import AsyncSession
-import asyncio
 from datetime import datetime, timedelta, timezone
 
 from services import SessionService, GroupService
 from database import TradeDirection, PaymentMethod
-from config import logger
 from userbot.manager import UserbotManager
+from bot.handlers.broadcast_handlers import launch_broadcast
 
 router = Router()
 
@@ -145,7 +144,7 @@ async def process_ttl(message: Message, state: FSMContext, session: AsyncSession
         ttl = int(message.text.strip()) if message.text.strip() else 60
         data = await state.get_data()
         
-        # 1. Формирование красивого текста рассылки
+        # 1. Параметры сессии
         direction = TradeDirection(data["direction"])
         currency_from = data["currency_from"]
         currency_to = data["currency_to"]
@@ -153,42 +152,27 @@ async def process_ttl(message: Message, state: FSMContext, session: AsyncSession
         target_rate = data["target_rate"]
         payment_method_enum = PaymentMethod(data["payment_method"]) if data.get("payment_method") else None
         
-        # Шаблон сообщения в группы
-        if direction == TradeDirection.BUY:
-            broadcast_text = f"Коллеги, купим <b>{volume}</b> USDT"
-        else:
-            broadcast_text = f"Коллеги, продадим <b>{volume}</b> USDT"
-
-        if target_rate and target_rate > 0:
-            broadcast_text += f"\n\nЦелевой курс <b>{target_rate}</b>"
-
         # 2. Получаем активные группы
         group_service = GroupService(session)
         active_groups = await group_service.get_active_groups()
         
-        chat_ids = []
-        if active_groups:
-           status_msg = await message.answer(f"🚀 Запускаю сессию! Рассылка в {len(active_groups)} групп...")
-           for group in active_groups:
-               try:
-                   await userbot.client.send_message(entity=group.telegram_id, message=broadcast_text, parse_mode='html')
-                   chat_ids.append(group.telegram_id)
-                   await asyncio.sleep(1.0) # Анти-флуд
-               except Exception as e:
-                   logger.error(f"Broadcast error: {e}")
-        else:
+        if not active_groups:
            await message.answer("⚠️ Нет активных групп для рассылки, но сессия создана локально.")
 
-        # 3. Сохраняем сессию в БД (опционально, для истории)
+        # 3. Сохраняем сессию в БД — по ней учитывается доставка рассылки
         service = SessionService(session)
-        await service.create_session(
+        trading_session = await service.create_session(
             direction=direction,
             currency_from=currency_from,
             currency_to=currency_to,
             volume=volume,
             payment_method=payment_method_enum,
-            time_to_live_minutes=ttl
+            time_to_live_minutes=ttl,
+            target_rate=target_rate,
+            admin_id=message.from_user.id
         )
+        # Шаблон сообщения в группы
+        broadcast_text = trading_session.broadcast_text()
 
         # 4. Запускаем "Табло" (Broadcast Monitor)
         from utils.broadcast_state import broadcast_manager
@@ -196,14 +180,18 @@ async def process_ttl(message: Message, state: FSMContext, session: AsyncSession
         # Направление для менеджера: если мы BUY, то ищем продавцов, передаем 'buy'
         trade_dir_str = "buy" if direction == TradeDirection.BUY else "sell"
         
+        # Прошлая рассылка не должна добавлять свои чаты в новую сессию
+        userbot.dispatcher.cancel_job()
+        # Чаты добавляются в мониторинг по мере отправки рассылки
         broadcast_manager.start(
             admin_id=message.from_user.id, 
             duration_minutes=ttl, 
-            target_chat_ids=chat_ids,
+            target_chat_ids=[],
             direction=trade_dir_str,
             currency_from=currency_from,
             currency_to=currency_to,
-            target_rate=target_rate
+            target_rate=target_rate,
+            volume=volume
         )
         
         # Создаем сообщение-табло через бота (без entity в userbot — избегаем PeerUser not found)
@@ -220,6 +208,10 @@ async def process_ttl(message: Message, state: FSMContext, session: AsyncSession
         except Exception as e:
              await message.answer(f"⚠️ Табло не создалось: {e}")
 
+        # 5. Рассылка в фоне — мониторинг каждого чата начинается сразу после отправки в него
+        if active_groups:
+            await launch_broadcast(message, userbot, trading_session.id, active_groups, broadcast_text)
+
         await state.clear()
         
     except ValueError:
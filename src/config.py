@@ -142,12 +142,272 @@ class Settings(BaseSettings):
         description="Telethon String Session (for cloud deployment)"
     )
 
+    TELETHON_SESSIONS: Optional[str] = Field(
+        default=None,
+        description="Comma-separated String Sessions of additional userbot accounts in the pool"
+    )
+
+    GROUP_SYNC_INTERVAL: int = Field(
+        default=6 * 3600,
+        description="Seconds between full group syncs (also marks left groups inactive)"
+    )
+
+    GROUP_SYNC_INCREMENTAL_INTERVAL: int = Field(
+        default=600,
+        description="Seconds between incremental group syncs over recently active dialogs"
+    )
+
+    BROADCAST_RATE: float = Field(
+        default=1.0,
+        description="Broadcast messages per second per userbot account"
+    )
+
+    BROADCAST_BURST: int = Field(
+        default=3,
+        description="Number of broadcast messages an account may send back-to-back"
+    )
+
+    BROADCAST_CONCURRENCY: int = Field(
+        default=5,
+        description="Maximum number of broadcast sends in flight"
+    )
+
+    BROADCAST_MAX_ATTEMPTS: int = Field(
+        default=3,
+        description="Send attempts per group, including retries after FloodWait"
+    )
+
+    BROADCAST_PROGRESS_INTERVAL: float = Field(
+        default=5.0,
+        description="Seconds between broadcast progress message updates"
+    )
+
+    DELIVERY_BATCH_SIZE: int = Field(
+        default=50,
+        description="Broadcast delivery results written to the database per batch"
+    )
+
+    DELIVERY_FLUSH_INTERVAL: float = Field(
+        default=2.0,
+        description="Maximum seconds broadcast delivery results are buffered before writing"
+    )
+
+    INGEST_WORKERS: int = Field(
+        default=8,
+        description="Number of workers processing incoming group messages"
+    )
+
+    INGEST_QUEUE_SIZE: int = Field(
+        default=1000,
+        description="Maximum number of incoming messages waiting for processing"
+    )
+
+    INGEST_OVERFLOW_POLICY: Literal["drop_oldest", "drop_newest"] = Field(
+        default="drop_oldest",
+        description="Which message to drop when the ingest queue is full"
+    )
+
+    ENTITY_CACHE_MAX_SIZE: int = Field(
+        default=10000,
+        description="Maximum number of cached chat titles and sender names (each)"
+    )
+
+    ENTITY_CACHE_TTL: int = Field(
+        default=6 * 3600,
+        description="Seconds before a cached chat title or sender name is re-fetched from Telegram"
+    )
+
+    DEDUP_WINDOW_SECONDS: float = Field(
+        default=120.0,
+        description="Window in which copies of the same sender's message in other groups are suppressed"
+    )
+
     # ==================== AI Parser Settings ====================
     OPENROUTER_API_KEY: Optional[str] = Field(
         default=None,
         description="OpenAI API key for AI parser (future feature)"
     )
 
+    OPENROUTER_BASE_URL: str = Field(
+        default="https://openrouter.ai/api/v1",
+        description="OpenRouter API base URL (point to scripts/mock_openrouter.py for offline benchmarks)"
+    )
+
+    OPENROUTER_MODELS: str = Field(
+        default="anthropic/claude-3.5-sonnet,anthropic/claude-3.5-haiku",
+        description="Comma-separated OpenRouter models, in order of preference"
+    )
+
+    OPENROUTER_HEDGE_ENABLED: bool = Field(
+        default=True,
+        description="Send a hedged request to the next model when the primary is slow"
+    )
+
+    OPENROUTER_HEDGE_MIN_DELAY: float = Field(
+        default=1.5,
+        description="Minimum delay in seconds before a hedged request is sent"
+    )
+
+    OPENROUTER_HEDGE_DEFAULT_DELAY: float = Field(
+        default=4.0,
+        description="Hedge delay in seconds while a model has no latency statistics"
+    )
+
+    OPENROUTER_TIMEOUT: float = Field(
+        default=10.0,
+        description="OpenRouter request timeout in seconds"
+    )
+
+    OPENROUTER_HTTP2: bool = Field(
+        default=True,
+        description="Use HTTP/2 for OpenRouter connections"
+    )
+
+    OPENROUTER_MAX_CONNECTIONS: int = Field(
+        default=20,
+        description="Maximum number of pooled OpenRouter connections"
+    )
+
+    OPENROUTER_MAX_KEEPALIVE: int = Field(
+        default=10,
+        description="Maximum number of idle keep-alive OpenRouter connections"
+    )
+
+    OPENROUTER_KEEPALIVE_EXPIRY: float = Field(
+        default=60.0,
+        description="Idle keep-alive connection expiry in seconds"
+    )
+
+    LLM_BATCH_ENABLED: bool = Field(
+        default=True,
+        description="Group messages arriving within a short window into one LLM request"
+    )
+
+    LLM_BATCH_WINDOW_MS: int = Field(
+        default=200,
+        description="Batching window in milliseconds"
+    )
+
+    LLM_BATCH_MAX_SIZE: int = Field(
+        default=10,
+        description="Maximum number of messages in one batched LLM request"
+    )
+
+    LLM_CACHE_ENABLED: bool = Field(
+        default=True,
+        description="Cache LLM extraction results by normalized message text"
+    )
+
+    LLM_CACHE_TTL: int = Field(
+        default=300,
+        description="LLM result cache TTL in seconds"
+    )
+
+    LLM_CACHE_MAX_SIZE: int = Field(
+        default=5000,
+        description="Maximum number of cached LLM results in memory"
+    )
+
+    LLM_CACHE_PERSIST: bool = Field(
+        default=False,
+        description="Persist LLM result cache to Postgres so it survives restarts"
+    )
+
+    LLM_MAX_CONCURRENCY: int = Field(
+        default=8,
+        description="Maximum number of concurrent LLM requests"
+    )
+
+    LLM_MAX_QUEUE: int = Field(
+        default=200,
+        description="LLM queue depth after which normal-priority requests are rejected"
+    )
+
+    LLM_REQUEST_DEADLINE: float = Field(
+        default=30.0,
+        description="Seconds after which a queued LLM extraction result is no longer needed"
+    )
+
+    LLM_STREAMING_ENABLED: bool = Field(
+        default=True,
+        description="Stream LLM responses and publish offers as soon as each one is complete"
+    )
+
+    LLM_STREAM_MAX_LOAD: int = Field(
+        default=2,
+        description="Stream non-reply messages only while fewer LLM requests are running or queued; above it they are batched"
+    )
+
+    LLM_RETRY_ATTEMPTS: int = Field(
+        default=2,
+        description="Attempts per LLM request (including the first one)"
+    )
+
+    LLM_RETRY_BASE_DELAY: float = Field(
+        default=0.3,
+        description="Base delay in seconds for jittered exponential retry backoff"
+    )
+
+    LLM_RETRY_MAX_DELAY: float = Field(
+        default=2.0,
+        description="Maximum retry backoff delay in seconds"
+    )
+
+    LLM_BREAKER_FAILURES: int = Field(
+        default=5,
+        description="Consecutive LLM failures after which the circuit opens"
+    )
+
+    LLM_BREAKER_RESET_SECONDS: float = Field(
+        default=30.0,
+        description="Seconds the circuit stays open before a probe request is allowed"
+    )
+
+    LLM_DEFERRED_MAX: int = Field(
+        default=1000,
+        description="Maximum number of messages parked for re-extraction while the circuit is open"
+    )
+
+    TEMPLATES_ENABLED: bool = Field(
+        default=True,
+        description="Learn per-group message templates from LLM extractions and match them before the LLM"
+    )
+
+    TEMPLATES_MIN_SUPPORT: int = Field(
+        default=2,
+        description="Number of confirmed extractions with the same shape before a template is used"
+    )
+
+    TEMPLATES_MAX_PER_GROUP: int = Field(
+        default=20,
+        description="Maximum number of learned templates kept per group"
+    )
+
+    FAST_PARSER_ENABLED: bool = Field(
+        default=True,
+        description="Parse templated offers locally before calling the LLM"
+    )
+
+    PREFILTER_ENABLED: bool = Field(
+        default=True,
+        description="Drop chatter and spam locally before calling the LLM"
+    )
+
+    PREFILTER_THRESHOLD: float = Field(
+        default=0.5,
+        description="Minimum relevance score of the prefilter model to pass a message"
+    )
+
+    PREFILTER_MODEL_PATH: Optional[str] = Field(
+        default=None,
+        description="Path to trained prefilter model weights (JSON)"
+    )
+
+    PREFILTER_CAPTURE_PATH: Optional[str] = Field(
+        default=None,
+        description="JSONL file to capture LLM-labeled messages for prefilter training"
+    )
+
     # ==================== Access Control ====================
     BOT_ACCESS_PASSWORD: Optional[str] = Field(
         default=None,
@@ -185,6 +445,16 @@ class Settings(BaseSettings):
         """Get SQLAlchemy database URL object."""    
         return make_url(str(self.DB_URL))
 
+    @property
+    def openrouter_models(self) -> list[str]:
+        """Get list of OpenRouter models in order of preference."""
+        return [m.strip() for m in self.OPENROUTER_MODELS.split(",") if m.strip()]
+
+    @property
+    def telethon_sessions(self) -> list[str]:
+        """Get String Sessions of additional userbot accounts."""
+        return [s.strip() for s in (self.TELETHON_SESSIONS or "").split(",") if s.strip()]
+
     @property
     def is_production(self) -> bool:
         """Check if running in production environment."""
@@ -6,4 +6,7 @@ from .models.common import (
     TradeDirection, 
     PaymentMethod, 
     GroupStatus,
+    LlmCacheEntry,
+    BroadcastDelivery,
+    DeliveryStatus,
 )
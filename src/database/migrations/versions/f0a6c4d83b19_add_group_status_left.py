@@ -0,0 +1,29 @@
+"""add_group_status_left
+
+Revision ID: f0a6c4d83b19
+Revises: e3f19b6a4d52
+Create Date: 2026-10-18 10:12:44.281906
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f0a6c4d83b19'
+down_revision: Union[str, None] = 'e3f19b6a4d52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Новое значение enum нельзя использовать в той же транзакции — выполняем вне нее
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE groupstatus ADD VALUE IF NOT EXISTS 'LEFT'")
+
+
+def downgrade() -> None:
+    # Значение из enum в PostgreSQL не удаляется — переводим покинутые группы в неактивные
+    op.execute("UPDATE groups SET status = 'INACTIVE' WHERE status = 'LEFT'")
@@ -16,7 +16,15 @@ class PaymentMethod(str, Enum):
 
 class GroupStatus(str, Enum):
     ACTIVE = "active"
-    INACTIVE = "inactive"
+    INACTIVE = "inactive"  # выключена админом
+    LEFT = "left"  # аккаунты не состоят в группе; включается снова при синхронизации
+
+class DeliveryStatus(str, Enum):
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    REJECTED = "rejected"  # отправка невозможна (бан, нет прав на запись) — повторно не досылается
 
 class User(Base):
     __tablename__ = "users"
@@ -45,11 +53,29 @@ class TradingSession(Base):
     # Custom broadcast fields
     is_custom_broadcast = Column(Boolean, default=False)
     custom_message = Column(String, nullable=True)
+    # Админ, запустивший сессию: ему восстанавливается табло после перезапуска
+    admin_id = Column(BigInteger, nullable=True)
 
     def is_expired(self) -> bool:
         delta = datetime.utcnow() - self.created_at
         return delta.total_seconds() > self.time_to_live_minutes * 60
 
+    def remaining_minutes(self) -> int:
+        delta = datetime.utcnow() - self.created_at
+        return max(0, int(self.time_to_live_minutes - delta.total_seconds() // 60))
+
+    def broadcast_text(self) -> str:
+        """Текст рассылки сессии (для кастомной — сохраненный текст)"""
+        if self.is_custom_broadcast:
+            return self.custom_message or ""
+        if self.direction == TradeDirection.BUY:
+            text = f"Коллеги, купим <b>{self.volume}</b> USDT"
+        else:
+            text = f"Коллеги, продадим <b>{self.volume}</b> USDT"
+        if self.target_rate and self.target_rate > 0:
+            text += f"\n\nЦелевой курс <b>{self.target_rate}</b>"
+        return text
+
 class Group(Base):
     __tablename__ = "groups"
 
@@ -58,6 +84,27 @@ class Group(Base):
     title = Column(String, nullable=False)
     status = Column(SQLEnum(GroupStatus), default=GroupStatus.ACTIVE)
     tags = Column(JSON, default=list)
+    templates = Column(JSON, default=list)
+    userbot_account = Column(String, nullable=True, index=True)  # id аккаунта userbot, ведущего группу
+    access_hashes = Column(JSON, default=dict)  # {id аккаунта userbot: access_hash} для отправки без резолва
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+class BroadcastDelivery(Base):
+    """Доставка рассылки сессии в группу — по ней рассылка продолжается после перезапуска"""
+    __tablename__ = "broadcast_deliveries"
+
+    session_id = Column(Integer, ForeignKey("trading_sessions.id", ondelete="CASCADE"), primary_key=True)
+    group_telegram_id = Column(BigInteger, primary_key=True)
+    status = Column(SQLEnum(DeliveryStatus), default=DeliveryStatus.PENDING, nullable=False, index=True)
+    message_id = Column(BigInteger, nullable=True)  # id нашего сообщения в группе (для сопоставления ответов)
+    error = Column(String, nullable=True)
+    attempts = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class LlmCacheEntry(Base):
+    __tablename__ = "llm_offer_cache"
+
+    key = Column(String(64), primary_key=True)
+    offers = Column(JSON, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
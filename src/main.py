@@ -10,6 +10,13 @@ if ROOT_DIR not in sys.path:
 from config import Config, logger
 from bot.bot import setup_bot
 from userbot.manager import UserbotManager
+from userbot.ingest import ingest_queue
+from userbot.deliveries import resume_broadcast
+from userbot.entity_cache import entity_cache
+from userbot.peers import peer_store
+from api.openrouter.client import ai_client
+from api.openrouter.cache import offer_cache
+from api.openrouter.templates import template_store
 
 async def main():
     """ Основная точка входа в приложение. """
@@ -18,10 +25,22 @@ async def main():
     # 1. Инициализируем Aiogram бота
     # Миграции теперь запустятся сами при первом импорте базы данных
     bot, dp = await setup_bot()
+
+    # Пул соединений к OpenRouter живет все время работы приложения
+    await ai_client.start()
+    await offer_cache.load()
+    await template_store.load()
+    await entity_cache.warm()
+    await peer_store.load()
     
     # 2. Инициализируем Telethon (Userbot)
     userbot = UserbotManager()
     await userbot.start()
+    # Досылаем рассылку, прерванную перезапуском; ошибка не должна мешать запуску
+    try:
+        await resume_broadcast(userbot, bot)
+    except Exception as e:
+        logger.error(f"Failed to resume broadcast: {e}", exc_info=True)
 
     # 3. Формирование списка задач для параллельного запуска
     tasks = [
@@ -38,8 +57,12 @@ async def main():
         logger.critical(f"💥 Critical error in main loop: {e}", exc_info=True)
     finally:
         logger.info("🛑 Shutting down services...")
+        # Рассылка останавливается до закрытия клиентов: журнал доставки успевает сохраниться
+        await userbot.dispatcher.shutdown()
         if 'bot' in locals():
             await bot.session.close()
+        await ingest_queue.stop()
+        await ai_client.close()
 
 if __name__ == "__main__":
     try:
@@ -1,2 +1,4 @@
 from .session.session_service import SessionService
 from .group.group_service import GroupService
+from .llm_cache.llm_cache_service import LlmCacheService
+from .delivery.delivery_service import DeliveryService
@@ -0,0 +1 @@
+from .delivery_service import DeliveryService
@@ -0,0 +1,77 @@
+from datetime import datetime
+from typing import List, Dict, Any
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models.common import BroadcastDelivery, DeliveryStatus, TradingSession
+
+# Недоставленные, но досылаемые после перезапуска; REJECTED сюда не входит
+UNDELIVERED = (DeliveryStatus.PENDING, DeliveryStatus.FAILED)
+
+class DBMethods:
+    """DAO для работы с доставками рассылок в базе данных"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def insert_pending(self, rows: List[Dict[str, Any]]):
+        stmt = insert(BroadcastDelivery).values(rows).on_conflict_do_nothing(
+            index_elements=[BroadcastDelivery.session_id, BroadcastDelivery.group_telegram_id]
+        )
+        await self.session.execute(stmt)
+
+    async def upsert_outcomes(self, rows: List[Dict[str, Any]]):
+        stmt = insert(BroadcastDelivery).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[BroadcastDelivery.session_id, BroadcastDelivery.group_telegram_id],
+            set_={
+                "status": stmt.excluded.status,
+                "message_id": stmt.excluded.message_id,
+                "error": stmt.excluded.error,
+                "attempts": BroadcastDelivery.attempts + stmt.excluded.attempts,
+                "updated_at": stmt.excluded.updated_at,
+            }
+        )
+        await self.session.execute(stmt)
+
+    async def set_status(self, session_id: int, group_ids: List[int], status: DeliveryStatus) -> int:
+        stmt = (
+            update(BroadcastDelivery)
+            .where(
+                BroadcastDelivery.session_id == session_id,
+                BroadcastDelivery.group_telegram_id.in_(group_ids),
+                BroadcastDelivery.status.in_(UNDELIVERED)
+            )
+            .values(status=status, updated_at=datetime.utcnow())
+        )
+        result = await self.session.execute(stmt)
+        return result.rowcount or 0
+
+    async def get_by_session(self, session_id: int) -> List[BroadcastDelivery]:
+        stmt = select(BroadcastDelivery).where(BroadcastDelivery.session_id == session_id)
+        result = await self.session.execute(stmt)
+        return list(result.scalars().all())
+
+    async def get_unfinished_sessions(self) -> List[TradingSession]:
+        """Сессии, у которых остались недоставленные группы (новые первыми)"""
+        unfinished = (
+            select(BroadcastDelivery.session_id)
+            .where(BroadcastDelivery.status.in_(UNDELIVERED))
+            .distinct()
+        )
+        stmt = (
+            select(TradingSession)
+            .where(TradingSession.id.in_(unfinished))
+            .order_by(TradingSession.created_at.desc())
+        )
+        result = await self.session.execute(stmt)
+        return list(result.scalars().all())
+
+    async def cancel_undelivered(self, session_ids: List[int]) -> int:
+        stmt = (
+            update(BroadcastDelivery)
+            .where(BroadcastDelivery.session_id.in_(session_ids), BroadcastDelivery.status.in_(UNDELIVERED))
+            .values(status=DeliveryStatus.CANCELLED, updated_at=datetime.utcnow())
+        )
+        result = await self.session.execute(stmt)
+        return result.rowcount or 0
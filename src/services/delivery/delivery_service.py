@@ -0,0 +1,86 @@
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .db_methods import DBMethods, UNDELIVERED
+from database.models.common import TradingSession, BroadcastDelivery, DeliveryStatus
+
+class DeliveryService:
+    """Сервис учета доставки рассылок по группам"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.db_methods = DBMethods(session)
+
+    async def create_pending(self, session_id: int, group_ids: List[int], chunk_size: int = 1000):
+        """Завести строки доставки для всех групп рассылки (уже существующие не трогаются)"""
+        now = datetime.utcnow()
+        for start in range(0, len(group_ids), chunk_size):
+            rows = [
+                {
+                    "session_id": session_id,
+                    "group_telegram_id": group_id,
+                    "status": DeliveryStatus.PENDING,
+                    "attempts": 0,
+                    "updated_at": now,
+                }
+                for group_id in group_ids[start:start + chunk_size]
+            ]
+            await self.db_methods.insert_pending(rows)
+        await self.session.commit()
+
+    async def record_outcomes(self, session_id: int, outcomes: List[Dict]):
+        """
+        Сохранить пачку результатов отправки одним запросом.
+        outcomes — словари telegram_id/ok/permanent/message_id/error/attempts.
+        """
+        if not outcomes:
+            return
+        now = datetime.utcnow()
+        rows = [
+            {
+                "session_id": session_id,
+                "group_telegram_id": o["telegram_id"],
+                "status": self._status(o),
+                "message_id": o["message_id"],
+                "error": o["error"],
+                "attempts": o["attempts"],
+                "updated_at": now,
+            }
+            for o in outcomes
+        ]
+        await self.db_methods.upsert_outcomes(rows)
+        await self.session.commit()
+
+    async def cancel_groups(self, session_id: int, group_ids: List[int]) -> int:
+        """Пометить отмененными недоставленные группы (рассылка отменена админом)"""
+        if not group_ids:
+            return 0
+        cancelled = await self.db_methods.set_status(session_id, group_ids, DeliveryStatus.CANCELLED)
+        await self.session.commit()
+        return cancelled
+
+    async def find_resumable(self) -> Optional[Tuple[TradingSession, List[BroadcastDelivery]]]:
+        """
+        Последняя неистекшая сессия с недоставленными группами и ее доставки.
+        Недоставленные группы истекших сессий помечаются отмененными.
+        """
+        sessions = await self.db_methods.get_unfinished_sessions()
+        resumable = next((s for s in sessions if not s.is_expired()), None)
+        stale = [s.id for s in sessions if s is not resumable]
+        if stale:
+            await self.db_methods.cancel_undelivered(stale)
+            await self.session.commit()
+        if resumable is None:
+            return None
+        return resumable, await self.db_methods.get_by_session(resumable.id)
+
+    @staticmethod
+    def _status(outcome: Dict) -> DeliveryStatus:
+        if outcome["ok"]:
+            return DeliveryStatus.SENT
+        return DeliveryStatus.REJECTED if outcome.get("permanent") else DeliveryStatus.FAILED
+
+    @staticmethod
+    def is_undelivered(delivery: BroadcastDelivery) -> bool:
+        return delivery.status in UNDELIVERED
@@ -1,5 +1,7 @@
-from typing import List, Optional
-from sqlalchemy import select, delete
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import datetime
+from sqlalchemy import select, delete, update, bindparam, literal_column, case, or_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from database.models.common import Group, GroupStatus
 
@@ -62,6 +64,68 @@ class DBMethods:
         await self.session.flush()
         return group
 
+    async def upsert_groups(self, rows: List[Dict[str, Any]]) -> List[Tuple[int, bool]]:
+        """
+        Вставка новых групп и обновление названий существующих одним запросом.
+        Группы со статусом LEFT снова есть среди диалогов — они включаются (выключенные админом не трогаются).
+        Возвращает (telegram_id, вставлена ли) для вставленных и измененных строк;
+        строки без изменений не возвращаются.
+        """
+        stmt = insert(Group).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Group.telegram_id],
+            set_={
+                "title": stmt.excluded.title,
+                "status": case((Group.status == GroupStatus.LEFT, GroupStatus.ACTIVE), else_=Group.status),
+                "updated_at": stmt.excluded.updated_at,
+            },
+            where=or_(Group.title.is_distinct_from(stmt.excluded.title), Group.status == GroupStatus.LEFT)
+        ).returning(Group.telegram_id, literal_column("(xmax = 0)").label("inserted"))
+        result = await self.session.execute(stmt)
+        return [(row[0], row[1]) for row in result.all()]
+
+    async def set_status(self, telegram_ids: List[int], status: GroupStatus) -> int:
+        stmt = (
+            update(Group)
+            .where(Group.telegram_id.in_(telegram_ids), Group.status != status)
+            .values(status=status, updated_at=datetime.utcnow())
+        )
+        result = await self.session.execute(stmt)
+        return result.rowcount or 0
+
+    async def deactivate_missing(self, present_ids: List[int]) -> int:
+        stmt = (
+            update(Group)
+            .where(Group.status == GroupStatus.ACTIVE, Group.telegram_id.notin_(present_ids))
+            .values(status=GroupStatus.LEFT, updated_at=datetime.utcnow())
+        )
+        result = await self.session.execute(stmt)
+        return result.rowcount or 0
+
+    async def update_userbot_accounts(self, assignments: Dict[int, str]):
+        table = Group.__table__
+        stmt = (
+            table.update()
+            .where(table.c.telegram_id == bindparam("b_telegram_id"))
+            .values(userbot_account=bindparam("b_account"))
+        )
+        await self.session.execute(
+            stmt,
+            [{"b_telegram_id": telegram_id, "b_account": account} for telegram_id, account in assignments.items()]
+        )
+
+    async def update_access_hashes(self, hashes: Dict[int, Dict[str, int]]):
+        table = Group.__table__
+        stmt = (
+            table.update()
+            .where(table.c.telegram_id == bindparam("b_telegram_id"))
+            .values(access_hashes=bindparam("b_hashes"))
+        )
+        await self.session.execute(
+            stmt,
+            [{"b_telegram_id": telegram_id, "b_hashes": group_hashes} for telegram_id, group_hashes in hashes.items()]
+        )
+
     async def delete_group(self, group_id: int) -> bool:
         group = await self.get_by_id(group_id)
         if group:
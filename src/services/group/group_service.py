@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import List, Optional, Dict
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 
@@ -29,6 +29,38 @@ class GroupService:
         await self.session.commit()
         return new_group
 
+    async def upsert_groups(self, dialogs: Dict[int, str], chunk_size: int = 1000) -> Dict[str, int]:
+        """
+        Массовая синхронизация групп (telegram_id -> название): новые добавляются,
+        у существующих обновляется название. Возвращает счетчики added/updated/unchanged.
+        """
+        now = datetime.utcnow()
+        rows = [
+            {
+                "telegram_id": telegram_id,
+                "title": title,
+                "status": GroupStatus.ACTIVE,
+                "tags": [],
+                "templates": [],
+                "access_hashes": {},
+                "created_at": now,
+                "updated_at": now,
+            }
+            for telegram_id, title in dialogs.items()
+        ]
+
+        added = updated = 0
+        if not rows:
+            return {"added": 0, "updated": 0, "unchanged": 0}
+        for start in range(0, len(rows), chunk_size):
+            for _, inserted in await self.db_methods.upsert_groups(rows[start:start + chunk_size]):
+                if inserted:
+                    added += 1
+                else:
+                    updated += 1
+        await self.session.commit()
+        return {"added": added, "updated": updated, "unchanged": len(rows) - added - updated}
+
     async def get_group(self, group_id: int) -> Optional[Group]:
         """Получить группу по ID"""
         return await self.db_methods.get_by_id(group_id)
@@ -91,6 +123,42 @@ class GroupService:
                 return updated
         return None
 
+    async def update_templates(self, telegram_id: int, templates: List[dict]) -> Optional[Group]:
+        """Сохранить выученные шаблоны сообщений группы"""
+        group = await self.db_methods.get_by_telegram_id(telegram_id)
+        if group:
+            group.templates = templates
+            updated = await self.db_methods.update_group(group)
+            await self.session.commit()
+            return updated
+        return None
+
+    async def set_groups_status(self, telegram_ids: List[int], status: GroupStatus) -> int:
+        """Изменить статус групп по Telegram ID"""
+        count = await self.db_methods.set_status(telegram_ids, status)
+        await self.session.commit()
+        return count
+
+    async def deactivate_missing_groups(self, present_ids: List[int]) -> int:
+        """Пометить покинутыми (LEFT) активные группы, которых нет среди диалогов аккаунтов"""
+        count = await self.db_methods.deactivate_missing(present_ids)
+        await self.session.commit()
+        return count
+
+    async def assign_userbot_accounts(self, assignments: Dict[int, str]):
+        """Сохранить аккаунты userbot, ведущие группы (telegram_id -> id аккаунта)"""
+        if not assignments:
+            return
+        await self.db_methods.update_userbot_accounts(assignments)
+        await self.session.commit()
+
+    async def update_access_hashes(self, hashes: Dict[int, Dict[str, int]]):
+        """Сохранить access hash групп (telegram_id -> {id аккаунта: access_hash})"""
+        if not hashes:
+            return
+        await self.db_methods.update_access_hashes(hashes)
+        await self.session.commit()
+
     async def delete_group(self, group_id: int) -> bool:
         """Удалить группу"""
         result = await self.db_methods.delete_group(group_id)
@@ -0,0 +1 @@
+from .llm_cache_service import LlmCacheService
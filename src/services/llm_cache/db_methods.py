@@ -0,0 +1,35 @@
+from datetime import datetime
+from typing import List, Optional, Any
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models.common import LlmCacheEntry
+
+class DBMethods:
+    """DAO для работы с кэшем результатов LLM в базе данных"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def upsert(self, key: str, offers: Optional[Any], created_at: datetime):
+        stmt = insert(LlmCacheEntry).values(key=key, offers=offers, created_at=created_at)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[LlmCacheEntry.key],
+            set_={"offers": stmt.excluded.offers, "created_at": stmt.excluded.created_at}
+        )
+        await self.session.execute(stmt)
+
+    async def get_newer_than(self, since: datetime, limit: int) -> List[LlmCacheEntry]:
+        stmt = (
+            select(LlmCacheEntry)
+            .where(LlmCacheEntry.created_at >= since)
+            .order_by(LlmCacheEntry.created_at.desc())
+            .limit(limit)
+        )
+        result = await self.session.execute(stmt)
+        return list(result.scalars().all())
+
+    async def delete_older_than(self, before: datetime) -> int:
+        stmt = delete(LlmCacheEntry).where(LlmCacheEntry.created_at < before)
+        result = await self.session.execute(stmt)
+        return result.rowcount or 0
@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta
+from typing import List, Optional, Any
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .db_methods import DBMethods
+from database.models.common import LlmCacheEntry
+
+class LlmCacheService:
+    """Сервис хранения кэша результатов LLM"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.db_methods = DBMethods(session)
+
+    async def save_entry(self, key: str, offers: Optional[Any], created_at: datetime):
+        """Сохранить (или обновить) результат извлечения"""
+        await self.db_methods.upsert(key, offers, created_at)
+        await self.session.commit()
+
+    async def get_fresh_entries(self, ttl_seconds: int, limit: int) -> List[LlmCacheEntry]:
+        """Получить записи не старше TTL (самые свежие первыми)"""
+        since = datetime.utcnow() - timedelta(seconds=ttl_seconds)
+        return await self.db_methods.get_newer_than(since, limit)
+
+    async def purge_expired(self, ttl_seconds: int) -> int:
+        """Удалить устаревшие записи"""
+        before = datetime.utcnow() - timedelta(seconds=ttl_seconds)
+        deleted = await self.db_methods.delete_older_than(before)
+        await self.session.commit()
+        return deleted
@@ -24,7 +24,11 @@ class SessionService:
         volume: str,
         payment_method: Optional[PaymentMethod] = None,
         time_to_live_minutes: int = 60,
-        target_tags: List[str] = None
+        target_tags: List[str] = None,
+        target_rate: float = 0,
+        is_custom_broadcast: bool = False,
+        custom_message: Optional[str] = None,
+        admin_id: Optional[int] = None
     ) -> TradingSession:
         """Создать новую торговую сессию"""
         if target_tags is None:
@@ -38,7 +42,11 @@ class SessionService:
             payment_method=payment_method,
             time_to_live_minutes=time_to_live_minutes,
             created_at=datetime.utcnow(),
-            target_tags=target_tags
+            target_tags=target_tags,
+            target_rate=target_rate or 0,
+            is_custom_broadcast=is_custom_broadcast,
+            custom_message=custom_message,
+            admin_id=admin_id
         )
         
         new_session = await self.db_methods.create_session(session_obj)
@@ -0,0 +1,318 @@
+import asyncio
+import html
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Optional, Dict, List, Callable, Awaitable, Iterable, Any
+
+from telethon.errors import FloodWaitError, ForbiddenError, BadRequestError
+
+from config import logger
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты отправки: rate сообщений в секунду с запасом capacity.
+    pause() останавливает выдачу токенов (FloodWait), не прерывая уже идущие отправки.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+@dataclass
+class DeliveryOutcome:
+    """Результат отправки в одну группу."""
+
+    telegram_id: int
+    ok: bool
+    message_id: Optional[int] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    flood_wait: int = 0  # суммарное ожидание FloodWait, сек
+    permanent: bool = False  # ошибка не исправится повтором (бан, нет прав, чат недоступен)
+
+
+@dataclass
+class BroadcastReport:
+    outcomes: Dict[int, DeliveryOutcome] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    @property
+    def sent(self) -> List[DeliveryOutcome]:
+        return [o for o in self.outcomes.values() if o.ok]
+
+    @property
+    def failed(self) -> List[DeliveryOutcome]:
+        return [o for o in self.outcomes.values() if not o.ok]
+
+    @property
+    def sent_message_ids(self) -> Dict[int, int]:
+        return {o.telegram_id: o.message_id for o in self.sent}
+
+
+class BroadcastDispatcher:
+    """
+    Параллельная рассылка по группам с ограничением частоты на каждый аккаунт пула.
+
+    FloodWaitError приостанавливает только корзину токенов этого аккаунта,
+    после паузы отправка в группу повторяется.
+    """
+
+    def __init__(self, userbot, rate: float = 1.0, burst: int = 3, concurrency: int = 5, max_attempts: int = 3):
+        self.userbot = userbot
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.stats: Counter = Counter()
+        self._buckets: Dict[str, TokenBucket] = {}
+        self.current_job: Optional["BroadcastJob"] = None
+
+    def _bucket(self, account_key: str) -> TokenBucket:
+        if account_key not in self._buckets:
+            self._buckets[account_key] = TokenBucket(self.rate, self.burst)
+        return self._buckets[account_key]
+
+    async def _send_one(self, telegram_id: int, text: str, semaphore: asyncio.Semaphore) -> DeliveryOutcome:
+        outcome = DeliveryOutcome(telegram_id, ok=False)
+        bucket = self._bucket(self.userbot.owner_key(telegram_id))
+        client = self.userbot.client_for(telegram_id)
+        # Сохраненный InputPeer: без резолва сущности на каждую отправку
+        entity = self.userbot.input_peer_for(telegram_id)
+
+        while outcome.attempts < self.max_attempts:
+            # Токен берется до слота: группы аккаунта на паузе FloodWait не занимают слоты остальных аккаунтов
+            await bucket.acquire()
+            outcome.attempts += 1
+            try:
+                async with semaphore:
+                    sent = await client.send_message(entity=entity, message=text, parse_mode='html')
+                outcome.ok = True
+                outcome.message_id = sent.id
+                outcome.error = None
+                self.stats["sent"] += 1
+                return outcome
+            except FloodWaitError as e:
+                # Пауза только для аккаунта, упершегося в лимит; группа будет отправлена повторно
+                logger.warning(f"FloodWait {e.seconds}s on broadcast to {telegram_id}")
+                bucket.pause(e.seconds)
+                outcome.flood_wait += e.seconds
+                outcome.error = f"FloodWait {e.seconds}s"
+                self.stats["flood_waits"] += 1
+            except Exception as e:
+                logger.error(f"Broadcast error ({telegram_id}): {e}")
+                outcome.error = str(e) or e.__class__.__name__
+                # 400/403 от Telegram — запрос к этому чату не пройдет и после перезапуска
+                outcome.permanent = isinstance(e, (ForbiddenError, BadRequestError))
+                break
+
+        self.stats["failed"] += 1
+        return outcome
+
+    async def send(
+        self,
+        telegram_ids: Iterable[int],
+        text: str,
+        on_outcome: Optional[Callable[[DeliveryOutcome], Awaitable[Any]]] = None,
+        report: Optional[BroadcastReport] = None
+    ) -> BroadcastReport:
+        """Рассылает text по группам; on_outcome вызывается по мере завершения каждой отправки."""
+        started = time.monotonic()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        report = report if report is not None else BroadcastReport()
+
+        async def run(telegram_id: int):
+            outcome = await self._send_one(telegram_id, text, semaphore)
+            report.outcomes[telegram_id] = outcome
+            if on_outcome is not None:
+                try:
+                    await on_outcome(outcome)
+                except Exception as e:
+                    logger.error(f"Broadcast outcome handler failed: {e}")
+
+        await asyncio.gather(*(run(telegram_id) for telegram_id in telegram_ids))
+        report.elapsed = time.monotonic() - started
+        logger.info(
+            f"📨 Broadcast finished in {report.elapsed:.1f}s: "
+            f"{len(report.sent)} sent, {len(report.failed)} failed"
+        )
+        return report
+
+    def start_job(
+        self,
+        telegram_ids: Iterable[int],
+        text: str,
+        on_sent: Optional[Callable[[DeliveryOutcome], Awaitable[Any]]] = None,
+        on_progress: Optional[Callable[["BroadcastJob", bool], Awaitable[Any]]] = None,
+        progress_interval: float = 5.0,
+        journal: Any = None
+    ) -> "BroadcastJob":
+        """Запускает рассылку фоновой задачей; идущая рассылка при этом отменяется."""
+        self.cancel_job()
+        self.current_job = BroadcastJob(self, telegram_ids, text, on_sent, on_progress, progress_interval, journal)
+        self.current_job.start()
+        return self.current_job
+
+    def cancel_job(self) -> bool:
+        return self.current_job.cancel() if self.current_job is not None else False
+
+    async def shutdown(self):
+        """Прерывает идущую рассылку при остановке приложения; недоставленные группы остаются для продолжения."""
+        if self.current_job is not None and self.current_job.interrupt():
+            await self.current_job.wait()
+
+
+class BroadcastJob:
+    """
+    Рассылка в фоне: on_sent вызывается сразу после отправки в каждую группу
+    (чтобы мониторинг чата начинался без ожидания остальных), on_progress — раз
+    в progress_interval секунд и один раз по завершении (finished=True).
+    journal (DeliveryJournal) сохраняет результат по каждой группе для продолжения после перезапуска.
+    cancel() — отмена админом (оставшиеся группы помечаются отмененными), interrupt() — остановка
+    приложения (оставшиеся группы будут досланы после перезапуска).
+    """
+
+    def __init__(
+        self,
+        dispatcher: BroadcastDispatcher,
+        telegram_ids: Iterable[int],
+        text: str,
+        on_sent: Optional[Callable[[DeliveryOutcome], Awaitable[Any]]] = None,
+        on_progress: Optional[Callable[["BroadcastJob", bool], Awaitable[Any]]] = None,
+        progress_interval: float = 5.0,
+        journal: Any = None
+    ):
+        self.dispatcher = dispatcher
+        self.telegram_ids = list(telegram_ids)
+        self.text = text
+        self.on_sent = on_sent
+        self.on_progress = on_progress
+        self.progress_interval = progress_interval
+        self.journal = journal
+        self.report = BroadcastReport()
+        self.cancelled = False
+        self.interrupted = False
+        self._started = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def total(self) -> int:
+        return len(self.telegram_ids)
+
+    @property
+    def remaining(self) -> int:
+        return self.total - len(self.report.outcomes)
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        self._started = time.monotonic()
+        self._task = asyncio.create_task(self._run())
+
+    def cancel(self) -> bool:
+        if not self.is_running:
+            return False
+        self.cancelled = True
+        self._task.cancel()
+        return True
+
+    def interrupt(self) -> bool:
+        if not self.is_running:
+            return False
+        self._task.cancel()
+        return True
+
+    async def wait(self) -> BroadcastReport:
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+        return self.report
+
+    async def _on_outcome(self, outcome: DeliveryOutcome):
+        if outcome.ok and self.on_sent is not None:
+            await self.on_sent(outcome)
+        if self.journal is not None:
+            await self.journal.record(outcome)
+
+    async def _close_journal(self):
+        if self.journal is None:
+            return
+        try:
+            await self.journal.flush()
+            if self.cancelled:
+                await self.journal.cancel([t for t in self.telegram_ids if t not in self.report.outcomes])
+        except Exception as e:
+            logger.error(f"Failed to close broadcast journal: {e}")
+
+    async def _progress_loop(self):
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            await self._report_progress(finished=False)
+
+    async def _report_progress(self, finished: bool):
+        if self.on_progress is None:
+            return
+        try:
+            await self.on_progress(self, finished)
+        except Exception as e:
+            logger.error(f"Broadcast progress update failed: {e}")
+
+    async def _run(self):
+        progress = asyncio.create_task(self._progress_loop())
+        try:
+            await self.dispatcher.send(self.telegram_ids, self.text, self._on_outcome, report=self.report)
+        except asyncio.CancelledError:
+            # Отмена задачи без cancel() — остановка приложения (в т.ч. asyncio.run при выходе)
+            self.interrupted = not self.cancelled
+            self.report.elapsed = time.monotonic() - self._started
+            action = "cancelled" if self.cancelled else "interrupted"
+            logger.info(f"⛔ Broadcast {action}: {len(self.report.sent)} sent, {self.remaining} not sent")
+        finally:
+            progress.cancel()
+            await asyncio.gather(progress, return_exceptions=True)
+        await self._close_journal()
+        await self._report_progress(finished=True)
+
+
+def format_broadcast_progress(job: BroadcastJob) -> str:
+    return (
+        f"🚀 Рассылка идет: отправлено {len(job.report.sent)}, "
+        f"ошибок {len(job.report.failed)}, осталось {job.remaining} из {job.total}"
+    )
+
+
+def format_broadcast_report(report: BroadcastReport, titles: Dict[int, str], limit: int = 10) -> str:
+    """Итог рассылки по группам для админа."""
+    lines = [f"📨 Рассылка: отправлено {len(report.sent)}, ошибок {len(report.failed)} ({report.elapsed:.0f} с)"]
+    for outcome in report.failed[:limit]:
+        # Отчет уходит с parse_mode HTML — названия групп и тексты ошибок экранируем
+        title = html.escape(str(titles.get(outcome.telegram_id) or outcome.telegram_id))
+        lines.append(f"❌ {title}: {html.escape(outcome.error or '')}")
+    if len(report.failed) > limit:
+        lines.append(f"… и еще {len(report.failed) - limit}")
+    return "\n".join(lines)
@@ -0,0 +1,64 @@
+import time
+from collections import OrderedDict, Counter
+from typing import Optional, List, Tuple
+
+from config import Config
+from api.openrouter.cache import normalize_text
+
+
+class DuplicateSuppressor:
+    """
+    Подавление копий одного сообщения, разосланного трейдером по нескольким группам.
+
+    Ключ — (отправитель, нормализованный текст) в скользящем окне window секунд.
+    Обрабатывается только первая копия; группы остальных копий добавляются
+    в общий список источников, на который ссылаются офферы первой копии.
+    """
+
+    def __init__(self, window: float = 120.0):
+        self.window = window
+        self.stats: Counter = Counter()
+        self._entries: "OrderedDict[Tuple[Optional[int], str], Tuple[float, List[int]]]" = OrderedDict()
+
+    def _purge(self, now: float):
+        # Записи упорядочены по времени первой копии — устаревшие всегда в начале
+        while self._entries:
+            key, (first_seen, _) = next(iter(self._entries.items()))
+            if now - first_seen < self.window:
+                break
+            del self._entries[key]
+
+    def claim(self, sender_id: Optional[int], text: str, chat_id: int) -> bool:
+        """True — первая копия (обрабатываем), False — дубликат (группа добавлена в источники)."""
+        normalized = normalize_text(text)
+        if not normalized:
+            return True
+
+        now = time.monotonic()
+        self._purge(now)
+        key = (sender_id, normalized)
+        entry = self._entries.get(key)
+        if entry is None:
+            self._entries[key] = (now, [chat_id])
+            self.stats["unique"] += 1
+            return True
+
+        sources = entry[1]
+        if chat_id not in sources:
+            sources.append(chat_id)
+        self.stats["duplicates"] += 1
+        return False
+
+    def sources(self, sender_id: Optional[int], text: str, chat_id: int) -> List[int]:
+        """Группы-источники сообщения; список пополняется по мере прихода копий."""
+        entry = self._entries.get((sender_id, normalize_text(text)))
+        if entry is None:
+            return [chat_id]
+        return entry[1]
+
+    def clear(self, *_):
+        self._entries.clear()
+
+
+# Глобальный инстанс
+message_dedup = DuplicateSuppressor(window=Config.DEDUP_WINDOW_SECONDS)
@@ -0,0 +1,156 @@
+import asyncio
+import time
+from typing import List, Dict, Iterable, Optional, Callable, Awaitable, Any
+
+from config import Config, logger
+from database.client import get_db_session
+from services import DeliveryService
+from userbot.broadcast import BroadcastJob, DeliveryOutcome, format_broadcast_progress, format_broadcast_report
+from utils.broadcast_state import broadcast_manager
+
+
+class DeliveryJournal:
+    """
+    Журнал доставки рассылки в таблицу broadcast_deliveries.
+    Результаты копятся в памяти и пишутся пачкой — по batch_size штук или раз в flush_interval секунд.
+    """
+
+    def __init__(self, session_id: int, batch_size: int = 50, flush_interval: float = 2.0):
+        self.session_id = session_id
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer: List[Dict] = []
+        self._last_flush = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def record(self, outcome: DeliveryOutcome):
+        self._buffer.append({
+            "telegram_id": outcome.telegram_id,
+            "ok": outcome.ok,
+            "permanent": outcome.permanent,
+            "message_id": outcome.message_id,
+            "error": outcome.error,
+            "attempts": outcome.attempts,
+        })
+        if len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            batch, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+            if not batch:
+                return
+            try:
+                async with get_db_session() as session:
+                    await DeliveryService(session).record_outcomes(self.session_id, batch)
+            except asyncio.CancelledError:
+                self._buffer = batch + self._buffer
+                raise
+            except Exception as e:
+                # Не теряем результаты: попробуем записать со следующей пачкой
+                self._buffer = batch + self._buffer
+                logger.error(f"Failed to save broadcast deliveries: {e}")
+
+    async def cancel(self, group_ids: List[int]):
+        async with get_db_session() as session:
+            await DeliveryService(session).cancel_groups(self.session_id, group_ids)
+
+
+async def start_session_broadcast(
+    userbot,
+    session_id: int,
+    telegram_ids: Iterable[int],
+    text: str,
+    on_progress: Optional[Callable[[BroadcastJob, bool], Awaitable[Any]]] = None,
+    new: bool = True
+) -> BroadcastJob:
+    """
+    Запускает фоновую рассылку сессии с учетом доставки по группам.
+    Каждый чат попадает в мониторинг сразу после отправки в него.
+    """
+    telegram_ids = list(telegram_ids)
+    if new:
+        async with get_db_session() as session:
+            await DeliveryService(session).create_pending(session_id, telegram_ids)
+
+    async def on_sent(outcome: DeliveryOutcome):
+        broadcast_manager.add_target_chat(outcome.telegram_id, outcome.message_id)
+
+    return userbot.dispatcher.start_job(
+        telegram_ids,
+        text,
+        on_sent=on_sent,
+        on_progress=on_progress,
+        progress_interval=Config.BROADCAST_PROGRESS_INTERVAL,
+        journal=DeliveryJournal(session_id, Config.DELIVERY_BATCH_SIZE, Config.DELIVERY_FLUSH_INTERVAL)
+    )
+
+
+async def _restore_admin_messages(bot, trading_session, left: int) -> Optional[Callable[[BroadcastJob, bool], Awaitable[Any]]]:
+    """Заново создает админу табло сессии и сообщение о ходе досылки; возвращает обработчик хода рассылки."""
+    admin_id = trading_session.admin_id
+    try:
+        dash_msg = await bot.send_message(
+            admin_id,
+            f"📊 <b>Сбор заявок восстановлен после перезапуска</b>\n"
+            f"⏱️ Осталось времени: {trading_session.remaining_minutes()} мин.\n\n"
+            f"⏳ Ожидаю новые офферы...",
+            parse_mode="html"
+        )
+        broadcast_manager.set_report_message(admin_id, dash_msg.message_id, bot)
+        status_msg = await bot.send_message(admin_id, f"🔁 Рассылка продолжена после перезапуска, осталось {left} групп")
+    except Exception as e:
+        logger.error(f"Failed to restore broadcast messages for admin {admin_id}: {e}")
+        return None
+
+    async def on_progress(job: BroadcastJob, finished: bool):
+        if not finished:
+            await status_msg.edit_text(format_broadcast_progress(job))
+            return
+        await status_msg.edit_text(format_broadcast_report(job.report, {}))
+
+    return on_progress
+
+
+async def resume_broadcast(userbot, bot=None) -> Optional[BroadcastJob]:
+    """
+    Продолжает прерванную перезапуском рассылку последней неистекшей сессии:
+    восстанавливает мониторинг уже доставленных групп, табло админа (через bot)
+    и досылает только недоставленные группы.
+    """
+    async with get_db_session() as session:
+        found = await DeliveryService(session).find_resumable()
+    if found is None:
+        return None
+
+    trading_session, deliveries = found
+    sent_message_ids = {
+        d.group_telegram_id: d.message_id
+        for d in deliveries
+        if not DeliveryService.is_undelivered(d) and d.message_id is not None
+    }
+    undelivered = [d.group_telegram_id for d in deliveries if DeliveryService.is_undelivered(d)]
+
+    broadcast_manager.start(
+        admin_id=trading_session.admin_id,
+        duration_minutes=trading_session.remaining_minutes(),
+        target_chat_ids=list(sent_message_ids),
+        sent_message_ids=sent_message_ids,
+        direction=trading_session.direction.value,
+        currency_from=trading_session.currency_from,
+        currency_to=trading_session.currency_to,
+        is_custom=bool(trading_session.is_custom_broadcast),
+        target_rate=trading_session.target_rate,
+        volume=trading_session.volume
+    )
+    logger.info(
+        f"🔁 Resuming broadcast of session {trading_session.id}: "
+        f"{len(sent_message_ids)} delivered, {len(undelivered)} left"
+    )
+    on_progress = None
+    if bot is not None and trading_session.admin_id:
+        on_progress = await _restore_admin_messages(bot, trading_session, len(undelivered))
+    return await start_session_broadcast(
+        userbot, trading_session.id, undelivered, trading_session.broadcast_text(), on_progress=on_progress, new=False
+    )
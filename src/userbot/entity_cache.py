@@ -0,0 +1,125 @@
+import time
+from collections import OrderedDict, Counter
+from typing import Optional, Any, Awaitable, Callable, Tuple
+
+from config import Config, logger
+
+
+class _TTLMap:
+    """LRU-словарь id -> значение со временем сохранения."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data: "OrderedDict[int, Tuple[str, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: int) -> Optional[Tuple[str, float]]:
+        entry = self._data.get(key)
+        if entry is not None:
+            self._data.move_to_end(key)
+        return entry
+
+    def put(self, key: int, value: str):
+        self._data[key] = (value, time.monotonic())
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+
+def sender_display_name(sender: Any) -> str:
+    """@username отправителя или его имя."""
+    username = getattr(sender, 'username', None)
+    if username:
+        return f"@{username}"
+    return getattr(sender, 'first_name', None) or 'Unknown'
+
+
+def chat_display_title(chat: Any) -> str:
+    return getattr(chat, 'title', None) or 'Unknown Group'
+
+
+class EntityCache:
+    """
+    Кэш названий чатов и имен отправителей по id.
+
+    Сущности из самого события (payload) обновляют кэш без запросов к Telegram;
+    сетевой get_chat/get_sender выполняется только при промахе или истекшем ttl.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 6 * 3600):
+        self.ttl = ttl
+        self.chats = _TTLMap(max_size)
+        self.senders = _TTLMap(max_size)
+        self.stats: Counter = Counter()
+
+    async def _resolve(
+        self,
+        cache: _TTLMap,
+        kind: str,
+        entity_id: Optional[int],
+        payload: Any,
+        fetch: Callable[[], Awaitable[Any]],
+        display: Callable[[Any], str]
+    ) -> str:
+        if payload is not None:
+            value = display(payload)
+            if entity_id is not None:
+                cache.put(entity_id, value)
+            self.stats[f"{kind}_payload"] += 1
+            return value
+
+        entry = cache.get(entity_id) if entity_id is not None else None
+        if entry is not None and time.monotonic() - entry[1] < self.ttl:
+            self.stats[f"{kind}_hits"] += 1
+            return entry[0]
+
+        self.stats[f"{kind}_fetches"] += 1
+        try:
+            value = display(await fetch())
+        except Exception as e:
+            if entry is not None:
+                # Устаревшее имя лучше, чем ошибка под флуд-лимитом
+                return entry[0]
+            logger.warning(f"Failed to resolve {kind} {entity_id}: {e}")
+            return display(None)
+
+        if entity_id is not None:
+            cache.put(entity_id, value)
+        return value
+
+    async def chat_title(self, event) -> str:
+        return await self._resolve(
+            self.chats, "chat", event.chat_id, getattr(event, 'chat', None), event.get_chat, chat_display_title
+        )
+
+    async def sender_name(self, event) -> str:
+        return await self._resolve(
+            self.senders, "sender", event.sender_id, getattr(event, 'sender', None), event.get_sender, sender_display_name
+        )
+
+    def remember_chat(self, chat_id: int, title: str):
+        self.chats.put(chat_id, title)
+
+    async def warm(self):
+        """Заполняет кэш названий чатов из таблицы groups."""
+        from database.client import get_db_session
+        from services import GroupService
+        try:
+            async with get_db_session() as session:
+                groups = await GroupService(session).list_groups()
+        except Exception as e:
+            logger.error(f"Failed to warm entity cache: {e}")
+            return
+        for group in groups:
+            if group.title:
+                self.remember_chat(group.telegram_id, group.title)
+        logger.info(f"👥 Entity cache warmed with {len(groups)} chats")
+
+
+# Глобальный инстанс
+entity_cache = EntityCache(
+    max_size=Config.ENTITY_CACHE_MAX_SIZE,
+    ttl=Config.ENTITY_CACHE_TTL
+)
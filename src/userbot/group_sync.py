@@ -0,0 +1,108 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any
+
+from telethon import events
+
+from config import logger
+from database.client import get_db_session
+from services import GroupService
+from database import GroupStatus
+from userbot.entity_cache import entity_cache
+from userbot.peers import peer_store
+
+
+class GroupSyncJob:
+    """
+    Фоновая синхронизация групп пула аккаунтов.
+
+    Инкрементальный проход каждые incremental_interval секунд смотрит только диалоги,
+    обновившиеся после прошлого прохода (watermark); полный проход раз в full_interval
+    дополнительно помечает покинутыми (LEFT) группы, из которых аккаунты вышли.
+    Вступление в группу, выход и смена названия применяются сразу по событиям ChatAction.
+    """
+
+    def __init__(self, manager, full_interval: float = 6 * 3600, incremental_interval: float = 600):
+        self.manager = manager
+        self.full_interval = full_interval
+        self.incremental_interval = incremental_interval
+        self.last_result: Optional[Dict[str, Any]] = None
+        self.watermark: Optional[datetime] = None  # время начала последнего успешного прохода
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._last_full = 0.0
+
+    @property
+    def is_running(self) -> bool:
+        return self._lock.locked()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def trigger(self, full: bool = True) -> bool:
+        """Запускает проход в фоне, если он еще не идет. Возвращает False, если уже идет."""
+        if self.is_running:
+            return False
+        asyncio.create_task(self.run(full))
+        return True
+
+    async def run(self, full: bool) -> Optional[Dict[str, Any]]:
+        async with self._lock:
+            started = datetime.now(timezone.utc)
+            try:
+                result = await self.manager.sync_groups(since=None if full else self.watermark)
+            except Exception as e:
+                logger.error(f"Group sync failed: {e}")
+                return None
+            self.watermark = started
+            if full:
+                self._last_full = time.monotonic()
+            self.last_result = {**result, "full": full, "finished_at": datetime.now()}
+            return self.last_result
+
+    async def _loop(self):
+        await self.run(full=True)
+        while True:
+            await asyncio.sleep(self.incremental_interval)
+            await self.run(full=time.monotonic() - self._last_full >= self.full_interval)
+
+    def attach(self, account):
+        """Подписывает аккаунт на события вступления, выхода и смены названия групп."""
+
+        async def handle_chat_action(event):
+            if not event.is_group:
+                return
+            me = int(account.key)
+            try:
+                if (event.user_joined or event.user_added) and me in (event.user_ids or []):
+                    chat = await event.get_chat()
+                    # Upsert включает группу, если она была помечена покинутой
+                    await self._upsert(event.chat_id, getattr(chat, 'title', None) or str(event.chat_id), account.key)
+                    peer_store.remember(account.key, event.chat_id, chat)
+                    await peer_store.save()
+                    logger.info(f"➕ Аккаунт [{account.name}] вступил в группу {event.chat_id}")
+                elif (event.user_left or event.user_kicked) and me in (event.user_ids or []):
+                    async with get_db_session() as session:
+                        await GroupService(session).set_groups_status([event.chat_id], GroupStatus.LEFT)
+                    logger.info(f"➖ Аккаунт [{account.name}] покинул группу {event.chat_id}")
+                elif event.new_title:
+                    await self._upsert(event.chat_id, event.new_title, None)
+            except Exception as e:
+                logger.error(f"Failed to apply chat action in {event.chat_id}: {e}")
+
+        account.client.add_event_handler(handle_chat_action, events.ChatAction())
+
+    async def _upsert(self, chat_id: int, title: str, account_key: Optional[str]):
+        entity_cache.remember_chat(chat_id, title)
+        async with get_db_session() as session:
+            await GroupService(session).upsert_groups({chat_id: title})
+        if account_key is not None and chat_id not in self.manager.assignments:
+            await self.manager.assign(chat_id, account_key)
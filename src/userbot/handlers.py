@@ -1,43 +1,61 @@
-from telethon import events, types
 from services import GroupService
 from database.client import get_db_session
 from datetime import datetime
+from typing import Optional, Callable, Dict
 from utils.broadcast_state import broadcast_manager
 from api.openrouter.client import ai_client
+from api.openrouter.scheduler import Priority
+from userbot.ingest import ingest_queue
+from userbot.entity_cache import entity_cache
+from userbot.peers import peer_store
+from userbot.subscription import ChatSubscription, MonitoredNewMessage, MonitoredMessageEdited, MonitoredMessageDeleted
+from userbot.dedup import message_dedup
 from config import logger
 
-async def sync_groups(client):
+async def collect_group_dialogs(client, since: Optional[datetime] = None, account_key: Optional[str] = None) -> Dict[int, str]:
     """
-    Проходит по всем диалогам аккаунта и добавляет группы в базу, если их там нет.
+    Группы и супергруппы аккаунта: telegram_id -> название.
+    since — только диалоги с активностью после этого момента (диалоги идут от новых к старым).
+    account_key — ключ аккаунта в пуле, под которым запоминаются access hash групп.
     """
+    dialogs = {}
+    async for dialog in client.iter_dialogs():
+        if since is not None and dialog.date is not None and dialog.date < since:
+            # Закрепленные диалоги идут первыми независимо от даты
+            if dialog.pinned:
+                continue
+            break
+        # Нам нужны только группы и супергруппы
+        if dialog.is_group:
+            dialogs[dialog.id] = dialog.name
+            entity_cache.remember_chat(dialog.id, dialog.name)
+            peer_store.remember(account_key, dialog.id, dialog.entity)
+    return dialogs
+
+
+async def save_groups(dialogs: Dict[int, str]) -> Dict[str, int]:
+    """Сохраняет группы одним массовым upsert и возвращает счетчики added/updated/unchanged."""
     async with get_db_session() as session:
-        service = GroupService(session)
-        logger.info("🔍 Начинаю синхронизацию групп из аккаунта...")
-        
-        count = 0
-        async for dialog in client.iter_dialogs():
-            # Нам нужны только группы и супергруппы
-            if dialog.is_group:
-                existing = await service.get_group_by_telegram_id(dialog.id)
-                if not existing:
-                    await service.add_group(
-                        telegram_id=dialog.id,
-                        title=dialog.name,
-                        tags=[]
-                    )
-                    count += 1
-                    logger.info(f"➕ Добавлена новая группа: {dialog.name}")
-        
-        if count > 0:
-            logger.info(f"✅ Синхронизация завершена. Добавлено групп: {count}")
-        else:
-            logger.info("ℹ️ Новых групп не обнаружено.")
+        result = await GroupService(session).upsert_groups(dialogs)
+    logger.info(
+        f"✅ Синхронизация завершена. Добавлено: {result['added']}, "
+        f"обновлено: {result['updated']}, без изменений: {result['unchanged']}"
+    )
+    return result
 
-def register_userbot_handlers(client):
+
+async def sync_groups(client) -> Dict[str, int]:
+    """
+    Проходит по всем диалогам аккаунта и сохраняет группы в базу (новые добавляются, названия обновляются).
+    """
+    logger.info("🔍 Начинаю синхронизацию групп из аккаунта...")
+    return await save_groups(await collect_group_dialogs(client))
+
+def register_userbot_handlers(client, owns_chat: Optional[Callable[[int], bool]] = None):
     """
     Регистрация обработчиков событий для Userbot (Telethon)
+    owns_chat — для пула аккаунтов: обрабатывать только группы этого аккаунта.
     """
-    @client.on(events.NewMessage)
     async def handle_new_message(event):
         """Main entry point for all messages"""
         if not event.is_group:
@@ -46,10 +64,136 @@ def register_userbot_handlers(client):
         if not broadcast_manager.is_monitoring(event.chat_id):
             return
         
-        if broadcast_manager.is_custom_mode:
-            await handle_custom_broadcast_message(event, client)
-        else:
-            await handle_structured_broadcast_message(event, client)
+        # Копии одного сообщения в других группах не обрабатываем: группа добавляется в источники
+        if not message_dedup.claim(event.sender_id, event.text, event.chat_id):
+            subscription.stats["duplicates"] += 1
+            return
+
+        # Обработка идет в пуле воркеров, чтобы не блокировать прием обновлений Telethon
+        subscription.stats["processed"] += 1
+        ingest_queue.submit(event.chat_id, make_job(event, client))
+
+    async def handle_message_edited(event):
+        """Повторный разбор только исправленного сообщения"""
+        if not broadcast_manager.is_monitoring(event.chat_id):
+            return
+
+        offers = broadcast_manager.message_offers(event.chat_id, event.id)
+        if offers and offers[0]['raw_text'] == event.text:
+            # Правка без изменения текста (разметка, реакции) — офферы актуальны
+            return
+
+        broadcast_manager.mark_message_edited(event.chat_id, event.id, event.message.edit_date)
+        subscription.stats["edited"] += 1
+        ingest_queue.submit(event.chat_id, make_job(event, client, replace=True))
+
+    async def handle_message_deleted(event):
+        """Убираем с табло офферы удаленных сообщений"""
+        if not broadcast_manager.is_active:
+            return
+
+        removed = sum(broadcast_manager.mark_message_deleted(event.chat_id, msg_id) for msg_id in event.deleted_ids)
+        if removed:
+            subscription.stats["deleted_offers"] += removed
+            await update_dashboard(client)
+
+    # Обработчики подписаны только на чаты активной сессии: остальные события Telethon отбрасывает до диспетчеризации
+    subscription = ChatSubscription(client, {
+        MonitoredNewMessage: handle_new_message,
+        MonitoredMessageEdited: handle_message_edited,
+        MonitoredMessageDeleted: handle_message_deleted,
+    }, owns_chat=owns_chat)
+    broadcast_manager.add_listener(subscription.on_session_change)
+    broadcast_manager.add_chat_listener(subscription.add_chat)
+    broadcast_manager.add_listener(message_dedup.clear)
+    return subscription
+
+
+async def process_message(event, client):
+    """Обработка сообщения из отслеживаемого чата в зависимости от режима сессии"""
+    if broadcast_manager.is_custom_mode:
+        await handle_custom_broadcast_message(event, client)
+    else:
+        await handle_structured_broadcast_message(event, client)
+
+
+def make_job(event, client, replace: bool = False):
+    """
+    Отложенная обработка сообщения, если сессия еще идет:
+    из очереди приема и повторно после восстановления LLM.
+    replace — сообщение исправлено: прежние офферы убираются перед повторным разбором.
+    """
+    async def job():
+        if not broadcast_manager.is_monitoring(event.chat_id):
+            return
+        if replace:
+            if broadcast_manager.is_outdated(event.chat_id, event.id, event.message.edit_date):
+                return
+            if broadcast_manager.remove_message_offers(event.chat_id, event.id):
+                await update_dashboard(client)
+        await process_message(event, client)
+    return job
+
+
+def get_message_priority(event) -> Priority:
+    """Ответы на нашу рассылку и сообщения знакомых трейдеров обрабатываются первыми"""
+    if broadcast_manager.is_reply_to_broadcast(event.chat_id, event.message.reply_to_msg_id):
+        return Priority.REPLY
+    if broadcast_manager.is_known_trader(event.sender_id):
+        return Priority.KNOWN_TRADER
+    return Priority.NORMAL
+
+
+class OfferPublisher:
+    """Добавляет офферы сообщения на табло (чат и отправитель берутся из кэша сущностей)"""
+
+    def __init__(self, event, client):
+        self.event = event
+        self.client = client
+        self.published = 0
+        self._source = None
+
+    async def _get_source(self):
+        if self._source is None:
+            user_link = await entity_cache.sender_name(self.event)
+            chat_title = await entity_cache.chat_title(self.event)
+            self._source = (user_link, chat_title)
+        return self._source
+
+    async def publish(self, offers):
+        if not offers:
+            return
+        # Сообщение удалено или исправлено, пока шел разбор, — офферы этой версии уже неактуальны
+        if broadcast_manager.is_outdated(self.event.chat_id, self.event.id, getattr(self.event.message, 'edit_date', None)):
+            return
+        user_link, chat_title = await self._get_source()
+        sources = message_dedup.sources(self.event.sender_id, self.event.text, self.event.chat_id)
+        text_line = self.event.text[:100].replace('\n', ' ')
+
+        # Process each offer from the list
+        for offer in offers:
+            broadcast_manager.add_response(
+                user=user_link,
+                group=chat_title,
+                text=text_line,
+                price=offer.get('price'),
+                volume=offer.get('volume'),
+                side=offer.get('side'),
+                raw_text=self.event.text,
+                sources=sources,
+                chat_id=self.event.chat_id,
+                message_id=self.event.id
+            )
+        self.published += len(offers)
+
+        broadcast_manager.mark_known_trader(self.event.sender_id)
+
+        # Update dashboard
+        await update_dashboard(self.client)
+
+    async def publish_one(self, offer):
+        """Колбэк для офферов, приходящих в потоковом режиме"""
+        await self.publish([offer])
 
 
 async def handle_structured_broadcast_message(event, client):
@@ -59,48 +203,39 @@ async def handle_structured_broadcast_message(event, client):
     currency_to = broadcast_manager.currency_to
     
     context_prompt = ""
+    target_side = None
     if my_direction == 'buy':
+        target_side = 'sell'
         context_prompt = (
             f"Мы ищем тех, кто ПРОДАЕТ {currency_to} за {currency_from}. "
             f"Нам нужны только предложения на ПРОДАЖУ (side='sell'). "
             f"Игнорируй тех, кто тоже хочет купить."
         )
     elif my_direction == 'sell':
+        target_side = 'buy'
         context_prompt = (
             f"Мы ищем тех, кто ПОКУПАЕТ {currency_to} за {currency_from}. "
             f"Нам нужны только предложения на ПОКУПКУ (side='buy'). "
             f"Игнорируй тех, кто тоже хочет продать."
         )
 
-    offers = await ai_client.analyze_message(event.text, context_prompt=context_prompt)
+    publisher = OfferPublisher(event, client)
+    offers = await ai_client.analyze_message(
+        event.text,
+        context_prompt=context_prompt,
+        target_side=target_side,
+        priority=get_message_priority(event),
+        on_offer=publisher.publish_one,
+        retry=make_job(event, client),
+        chat_id=event.chat_id
+    )
     
     if ai_client.api_key and offers is None:
         return
 
     try:
-        chat = await event.get_chat()
-        sender = await event.get_sender()
-        sender_name = getattr(sender, 'first_name', 'Unknown')
-        username = getattr(sender, 'username', 'no_username')
-        user_link = f"@{username}" if username != 'no_username' else sender_name
-        chat_title = getattr(chat, 'title', 'Unknown Group')
-
-        text_line = event.text[:100].replace('\n', ' ')
-        
-        # Process each offer from the list
-        for offer in offers:
-            broadcast_manager.add_response(
-                user=user_link, 
-                group=chat_title, 
-                text=text_line,
-                price=offer.get('price'),
-                volume=offer.get('volume'),
-                side=offer.get('side'),
-                raw_text=event.text
-            )
-        
-        # Update dashboard
-        await update_dashboard(client)
+        # Офферы, уже показанные в потоковом режиме, повторно не добавляем
+        await publisher.publish(offers[publisher.published:])
 
     except Exception as e:
         logger.error(f"Error handling structured broadcast message: {e}")
@@ -114,7 +249,15 @@ async def handle_custom_broadcast_message(event, client):
         "Игнорируй только явный спам и нерелевантные сообщения."
     )
     
-    offers = await ai_client.analyze_message(event.text, context_prompt=context_prompt)
+    publisher = OfferPublisher(event, client)
+    offers = await ai_client.analyze_message(
+        event.text,
+        context_prompt=context_prompt,
+        priority=get_message_priority(event),
+        on_offer=publisher.publish_one,
+        retry=make_job(event, client),
+        chat_id=event.chat_id
+    )
     
     if ai_client.api_key and offers is None:
         return
@@ -123,27 +266,8 @@ async def handle_custom_broadcast_message(event, client):
         offers = [{"side": None, "price": None, "volume": None}]
     
     try:
-        chat = await event.get_chat()
-        sender = await event.get_sender()
-        sender_name = getattr(sender, 'first_name', 'Unknown')
-        username = getattr(sender, 'username', 'no_username')
-        user_link = f"@{username}" if username != 'no_username' else sender_name
-        chat_title = getattr(chat, 'title', 'Unknown Group')
-        
-        # Process each offer from the list
-        for offer in offers:
-            broadcast_manager.add_response(
-                user=user_link,
-                group=chat_title,
-                text=event.text[:100].replace('\n', ' '),
-                price=offer.get('price'),
-                volume=offer.get('volume'),
-                side=offer.get('side'),
-                raw_text=event.text
-            )
-        
-        # Update dashboard
-        await update_dashboard(client)
+        # Офферы, уже показанные в потоковом режиме, повторно не добавляем
+        await publisher.publish(offers[publisher.published:])
         
     except Exception as e:
         logger.error(f"Error handling custom broadcast message: {e}")
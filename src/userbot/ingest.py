@@ -0,0 +1,121 @@
+import asyncio
+import time
+from collections import Counter, deque
+from typing import Callable, Awaitable, List, NamedTuple
+
+from config import Config, logger
+
+
+class IngestItem(NamedTuple):
+    """Запись о сообщении в очереди приема."""
+
+    chat_id: int
+    job: Callable[[], Awaitable[None]]
+    received_at: float
+
+
+class IngestQueue:
+    """
+    Ограниченная очередь входящих сообщений userbot с пулом обработчиков.
+
+    Обработчик Telethon только ставит запись в очередь и сразу возвращается,
+    поэтому задержки LLM, запросов к Telegram и табло не блокируют прием обновлений.
+    При переполнении отбрасывается самое старое (drop_oldest) или новое (drop_newest) сообщение.
+    """
+
+    def __init__(self, workers: int = 8, max_size: int = 1000, overflow: str = "drop_oldest"):
+        self.workers = workers
+        self.max_size = max_size
+        self.overflow = overflow
+        self.stats: Counter = Counter()
+        self.max_depth = 0
+        self.wait_times: deque = deque(maxlen=1000)  # ожидание в очереди, сек
+        self.latencies: deque = deque(maxlen=1000)  # от приема до конца обработки, сек
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self._tasks: List[asyncio.Task] = []
+        self._warned_at = 0.0
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def start(self):
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"📥 Ingest queue started ({self.workers} workers, max {self.max_size} messages)")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def join(self):
+        """Ждет обработки всех поставленных сообщений."""
+        await self._queue.join()
+
+    def submit(self, chat_id: int, job: Callable[[], Awaitable[None]]) -> bool:
+        """Ставит сообщение в очередь без ожидания. Возвращает False, если оно отброшено."""
+        item = IngestItem(chat_id, job, time.monotonic())
+        if self._queue.full():
+            if self.overflow == "drop_newest":
+                self.stats["dropped_newest"] += 1
+                self._warn_overflow()
+                return False
+            self._queue.get_nowait()
+            self._queue.task_done()
+            self.stats["dropped_oldest"] += 1
+            self._warn_overflow()
+
+        self._queue.put_nowait(item)
+        self.stats["enqueued"] += 1
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+        return True
+
+    def _warn_overflow(self):
+        # Не чаще раза в 10 секунд, чтобы не засорять лог под нагрузкой
+        now = time.monotonic()
+        if now - self._warned_at >= 10:
+            self._warned_at = now
+            logger.warning(f"📥 Ingest queue full ({self.max_size}), dropping messages: {dict(self.stats)}")
+
+    async def _worker(self):
+        while True:
+            item = await self._queue.get()
+            started = time.monotonic()
+            self.wait_times.append(started - item.received_at)
+            try:
+                await item.job()
+                self.stats["processed"] += 1
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.error(f"Error processing message from chat {item.chat_id}: {e}")
+            finally:
+                self.latencies.append(time.monotonic() - item.received_at)
+                self._queue.task_done()
+
+    @staticmethod
+    def _percentile(values, q: float) -> float:
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def snapshot(self) -> dict:
+        """Текущие метрики очереди."""
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "wait_p50": self._percentile(self.wait_times, 0.5),
+            "wait_p99": self._percentile(self.wait_times, 0.99),
+            **self.stats,
+        }
+
+
+# Глобальный инстанс
+ingest_queue = IngestQueue(
+    workers=Config.INGEST_WORKERS,
+    max_size=Config.INGEST_QUEUE_SIZE,
+    overflow=Config.INGEST_OVERFLOW_POLICY
+)
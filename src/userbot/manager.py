@@ -1,17 +1,26 @@
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional
+
 from telethon import TelegramClient
 from config import Config, logger
-from userbot.handlers import register_userbot_handlers
+from database.client import get_db_session
+from services import GroupService
+from userbot.handlers import register_userbot_handlers, collect_group_dialogs, save_groups
+from userbot.ingest import ingest_queue
+from userbot.sharding import HashRing
+from userbot.group_sync import GroupSyncJob
+from userbot.broadcast import BroadcastDispatcher
+from userbot.peers import peer_store
 
 from telethon.sessions import StringSession
 
-class UserbotManager:
-    def __init__(self):
-        session = Config.TELEGRAM_SESSION_NAME
-        
-        if Config.TELETHON_SESSION:
-            logger.info("Using StringSession for Telethon")
-            session = StringSession(Config.TELETHON_SESSION)
-            
+class UserbotAccount:
+    """Один аккаунт userbot со своим MTProto-соединением"""
+
+    def __init__(self, session, name: str):
+        self.name = name
+        self.key: Optional[str] = None  # Telegram id аккаунта — ключ шардирования
         self.client = TelegramClient(
             session,
             Config.TELEGRAM_API_ID,
@@ -19,19 +28,168 @@ class UserbotManager:
         )
 
     async def start(self):
-        logger.info("🔑 Starting Userbot (Telethon)...")
         # При первом запуске попросит код в терминале
         await self.client.start()
-        
+
         # Получаем данные о себе для проверки
         me = await self.client.get_me()
-        logger.info(f"✅ Userbot started as: {me.first_name} (@{me.username})")
+        self.key = str(me.id)
+        logger.info(f"✅ Userbot [{self.name}] started as: {me.first_name} (@{me.username})")
+
+
+class UserbotManager:
+    """
+    Пул аккаунтов userbot.
+
+    Группы распределяются между аккаунтами консистентным хешированием по telegram_id,
+    назначение хранится в groups.userbot_account. Прием сообщений и рассылка
+    идут через аккаунт, ведущий группу.
+    """
+
+    def __init__(self):
+        session = Config.TELEGRAM_SESSION_NAME
+
+        if Config.TELETHON_SESSION:
+            logger.info("Using StringSession for Telethon")
+            session = StringSession(Config.TELETHON_SESSION)
+
+        self.accounts: List[UserbotAccount] = [UserbotAccount(session, "main")]
+        for i, extra_session in enumerate(Config.telethon_sessions, 1):
+            self.accounts.append(UserbotAccount(StringSession(extra_session), f"pool-{i}"))
+
+        self.ring = HashRing()
+        self.assignments: Dict[int, str] = {}  # telegram_id группы -> ключ аккаунта
+        self._by_key: Dict[str, UserbotAccount] = {}
+        self.dispatcher = BroadcastDispatcher(
+            self,
+            rate=Config.BROADCAST_RATE,
+            burst=Config.BROADCAST_BURST,
+            concurrency=Config.BROADCAST_CONCURRENCY,
+            max_attempts=Config.BROADCAST_MAX_ATTEMPTS
+        )
+        self.group_sync = GroupSyncJob(
+            self,
+            full_interval=Config.GROUP_SYNC_INTERVAL,
+            incremental_interval=Config.GROUP_SYNC_INCREMENTAL_INTERVAL
+        )
+
+    @property
+    def client(self) -> TelegramClient:
+        """Основной аккаунт (для операций, не привязанных к группе)"""
+        return self.accounts[0].client
+
+    async def start(self):
+        logger.info(f"🔑 Starting Userbot pool (Telethon), accounts: {len(self.accounts)}...")
+        for account in self.accounts:
+            await account.start()
+            self._by_key[account.key] = account
+            self.ring.add(account.key)
+
+            # Регистрируем обработчики событий (парсинг сообщений) — каждый аккаунт слушает свои группы
+            register_userbot_handlers(
+                account.client,
+                owns_chat=lambda chat_id, key=account.key: self.owner_key(chat_id) == key
+            )
+            self.group_sync.attach(account)
+
+        await self.load_assignments()
+        ingest_queue.start()
+        self.group_sync.start()
+
+    def owner_key(self, chat_id: int) -> Optional[str]:
+        key = self.assignments.get(chat_id)
+        if key not in self._by_key:
+            key = self.ring.get(chat_id)
+        return key
+
+    def input_peer_for(self, chat_id: int):
+        """InputPeer группы для аккаунта-владельца (без резолва); bare id, если access hash неизвестен"""
+        return peer_store.input_peer(self.owner_key(chat_id), chat_id) or chat_id
+
+    def client_for(self, chat_id: int) -> TelegramClient:
+        """Клиент аккаунта, ведущего группу"""
+        account = self._by_key.get(self.owner_key(chat_id))
+        return account.client if account else self.client
+
+    async def _save_assignments(self, changed: Dict[int, str]):
+        if not changed:
+            return
+        async with get_db_session() as session:
+            await GroupService(session).assign_userbot_accounts(changed)
+        logger.info(f"🔀 Assigned {len(changed)} groups to userbot accounts")
+
+    async def load_assignments(self):
+        """Загружает назначения групп; группы без живого аккаунта распределяются по кольцу"""
+        async with get_db_session() as session:
+            groups = await GroupService(session).list_groups()
+
+        changed = {}
+        for group in groups:
+            if group.userbot_account in self._by_key:
+                self.assignments[group.telegram_id] = group.userbot_account
+            else:
+                owner = self.ring.get(group.telegram_id)
+                self.assignments[group.telegram_id] = owner
+                changed[group.telegram_id] = owner
+        await self._save_assignments(changed)
+
+    async def sync_groups(self, since: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Синхронизирует группы всех аккаунтов и закрепляет каждую группу
+        за аккаунтом, который в ней состоит (по кольцу среди участников).
+        since — инкрементальный проход только по диалогам, обновившимся после этого момента;
+        полный проход (since=None) помечает покинутыми группы, из которых аккаунты вышли,
+        если диалоги всех аккаунтов получены.
+        Возвращает счетчики added/updated/unchanged/deactivated.
+        """
+        logger.info(f"🔍 Начинаю {'инкрементальную' if since else 'полную'} синхронизацию групп из аккаунтов...")
+        dialogs = {}
+        failed = []
+        for account in self.accounts:
+            try:
+                dialogs[account.key] = await collect_group_dialogs(account.client, since, account.key)
+            except Exception as e:
+                failed.append(account)
+                logger.error(f"Failed to collect dialogs of account [{account.name}]: {e}")
+        merged = {chat_id: title for chats in dialogs.values() for chat_id, title in chats.items()}
+        result = await save_groups(merged)
+        await peer_store.save()
+
+        result["deactivated"] = 0
+        if since is None and (failed or not merged):
+            # Неполный список диалогов — не помечаем покинутыми группы, которых в нем просто нет
+            logger.warning(f"⚠️ Пропускаю пометку покинутых групп: ошибки аккаунтов {[a.name for a in failed]}, диалогов {len(merged)}")
+        elif since is None:
+            async with get_db_session() as session:
+                result["deactivated"] = await GroupService(session).deactivate_missing_groups(list(merged))
+            if result["deactivated"]:
+                logger.info(f"🔇 Помечено покинутыми групп, из которых вышли аккаунты: {result['deactivated']}")
+
+        membership = {key: set(chats) for key, chats in dialogs.items()}
+        failed_keys = {account.key for account in failed}
+        changed = {}
+        for chat_id in set().union(*membership.values()):
+            members = {key for key, chat_ids in membership.items() if chat_id in chat_ids}
+            current = self.assignments.get(chat_id)
+            # Инкрементальный проход видит не всех участников — переназначаем только группы без живого владельца;
+            # группы аккаунта, чьи диалоги не получены, не трогаем
+            if current in members or current in failed_keys or (since is not None and current in self._by_key):
+                continue
+            owner = self.ring.get(chat_id, candidates=members)
+            self.assignments[chat_id] = owner
+            changed[chat_id] = owner
+        await self._save_assignments(changed)
+        return result
 
-        # Регистрируем обработчики событий (парсинг сообщений)
-        register_userbot_handlers(self.client)
+    async def assign(self, chat_id: int, account_key: str):
+        self.assignments[chat_id] = account_key
+        await self._save_assignments({chat_id: account_key})
 
     async def run_until_disconnected(self):
-        await self.client.run_until_disconnected()
+        await asyncio.gather(*(account.client.run_until_disconnected() for account in self.accounts))
 
     async def stop(self):
-        await self.client.disconnect()
\ No newline at end of file
+        await self.group_sync.stop()
+        await ingest_queue.stop()
+        for account in self.accounts:
+            await account.client.disconnect()
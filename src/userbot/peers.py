@@ -0,0 +1,78 @@
+from typing import Dict, Optional, Set, Any
+
+from telethon import utils
+from telethon.tl.types import Channel, InputPeerChannel, InputPeerChat, PeerChannel, PeerChat
+
+from config import logger
+
+
+class PeerStore:
+    """
+    Access hash групп по аккаунтам пула для отправки без резолва сущности.
+
+    Access hash выдается Telegram отдельно каждому аккаунту, поэтому хранится
+    в groups.access_hashes как {ключ аккаунта: hash}. Обычным (не супер-) группам
+    access hash не нужен — для них InputPeerChat строится по id.
+    """
+
+    def __init__(self):
+        self._hashes: Dict[int, Dict[str, int]] = {}  # telegram_id -> {ключ аккаунта: access_hash}
+        self._dirty: Set[int] = set()  # группы с новыми hash, еще не сохраненные в базу
+
+    def __len__(self) -> int:
+        return sum(len(hashes) for hashes in self._hashes.values())
+
+    def remember(self, account_key: Optional[str], chat_id: int, entity: Any):
+        """Запоминает access hash канала/супергруппы из сущности, полученной аккаунтом."""
+        if account_key is None or not isinstance(entity, Channel) or entity.access_hash is None:
+            return
+        hashes = self._hashes.setdefault(chat_id, {})
+        if hashes.get(account_key) != entity.access_hash:
+            hashes[account_key] = entity.access_hash
+            self._dirty.add(chat_id)
+
+    def input_peer(self, account_key: Optional[str], chat_id: int):
+        """InputPeer группы для аккаунта или None, если access hash неизвестен."""
+        real_id, peer_type = utils.resolve_id(chat_id)
+        if peer_type is PeerChat:
+            return InputPeerChat(real_id)
+        if peer_type is PeerChannel:
+            access_hash = self._hashes.get(chat_id, {}).get(account_key)
+            if access_hash is not None:
+                return InputPeerChannel(real_id, access_hash)
+        return None
+
+    async def load(self):
+        """Загружает access hash всех групп из таблицы groups."""
+        from database.client import get_db_session
+        from services import GroupService
+        try:
+            async with get_db_session() as session:
+                groups = await GroupService(session).list_groups()
+        except Exception as e:
+            logger.error(f"Failed to load group access hashes: {e}")
+            return
+        for group in groups:
+            if group.access_hashes:
+                self._hashes[group.telegram_id] = {key: int(h) for key, h in group.access_hashes.items()}
+        logger.info(f"🔑 Loaded {len(self)} group access hashes")
+
+    async def save(self):
+        """Сохраняет новые access hash одним пакетным обновлением."""
+        if not self._dirty:
+            return
+        from database.client import get_db_session
+        from services import GroupService
+        dirty, self._dirty = self._dirty, set()
+        try:
+            async with get_db_session() as session:
+                await GroupService(session).update_access_hashes(
+                    {chat_id: dict(self._hashes[chat_id]) for chat_id in dirty}
+                )
+        except Exception as e:
+            self._dirty |= dirty
+            logger.error(f"Failed to save group access hashes: {e}")
+
+
+# Глобальный инстанс
+peer_store = PeerStore()
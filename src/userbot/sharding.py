@@ -0,0 +1,45 @@
+import bisect
+import hashlib
+from typing import Iterable, List, Optional, Set, Tuple
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    """
+    Консистентное хеширование групп по аккаунтам userbot.
+
+    Каждый аккаунт представлен replicas виртуальными точками на кольце; группа достается
+    первому по часовой стрелке аккаунту. При добавлении аккаунта переезжает ~1/N групп.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = 100):
+        self.replicas = replicas
+        self._ring: List[Tuple[int, str]] = []
+        self.nodes: Set[str] = set()
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str):
+        if node in self.nodes:
+            return
+        self.nodes.add(node)
+        for i in range(self.replicas):
+            bisect.insort(self._ring, (_hash(f"{node}#{i}"), node))
+
+    def remove(self, node: str):
+        self.nodes.discard(node)
+        self._ring = [(h, n) for h, n in self._ring if n != node]
+
+    def get(self, key: int, candidates: Optional[Set[str]] = None) -> Optional[str]:
+        """Аккаунт для группы; candidates ограничивает выбор (например, аккаунтами-участниками)."""
+        if not self._ring:
+            return None
+        start = bisect.bisect(self._ring, (_hash(str(key)), ""))
+        for offset in range(len(self._ring)):
+            node = self._ring[(start + offset) % len(self._ring)][1]
+            if candidates is None or node in candidates:
+                return node
+        return None
@@ -0,0 +1,103 @@
+from collections import Counter
+from typing import Iterable, Optional, Callable, Awaitable, Dict, Type, Any, List, Set, Tuple
+
+from telethon import events
+
+from config import logger
+
+
+class _MonitoredChats:
+    """
+    Фильтр событий по отслеживаемым чатам.
+
+    Проверка выполняется в filter() — Telethon вызывает его до привязки клиента
+    и загрузки сущностей события, так что события остальных чатов отбрасываются сразу.
+    """
+
+    allow_unknown_chat = False
+
+    def __init__(self, chat_ids: Set[int], stats: Counter):
+        super().__init__()
+        self.chat_ids = chat_ids  # общий для всех билдеров подписки, пополняется по ходу рассылки
+        self.stats = stats
+
+    def filter(self, event):
+        chat_id = event.chat_id
+        if chat_id not in self.chat_ids and not (chat_id is None and self.allow_unknown_chat):
+            self.stats["filtered"] += 1
+            return None
+        self.stats["passed"] += 1
+        return super().filter(event)
+
+
+class MonitoredNewMessage(_MonitoredChats, events.NewMessage):
+    pass
+
+
+class MonitoredMessageEdited(_MonitoredChats, events.MessageEdited):
+    pass
+
+
+class MonitoredMessageDeleted(_MonitoredChats, events.MessageDeleted):
+    # Для обычных (не супер-) групп Telegram присылает удаление без chat_id
+    allow_unknown_chat = True
+
+
+class ChatSubscription:
+    """
+    Подписка обработчиков на события только из чатов текущей сессии.
+    Обработчики ставятся при старте сессии и снимаются при ее остановке.
+    """
+
+    def __init__(
+        self,
+        client,
+        callbacks: Dict[Type[_MonitoredChats], Callable[[Any], Awaitable[None]]],
+        owns_chat: Optional[Callable[[int], bool]] = None
+    ):
+        self.client = client
+        self.callbacks = callbacks
+        self.owns_chat = owns_chat  # для пула аккаунтов: слушаем только свои группы
+        self.builders: List[Tuple[_MonitoredChats, Callable[[Any], Awaitable[None]]]] = []
+        self.chat_ids: Set[int] = set()
+        self.stats: Counter = Counter()
+
+    @property
+    def is_active(self) -> bool:
+        return bool(self.builders)
+
+    def activate(self, chat_ids: Iterable[int]):
+        self.deactivate()
+        self.chat_ids = {c for c in chat_ids if self.owns_chat is None or self.owns_chat(c)}
+        if not self.chat_ids:
+            return
+        for builder_cls, callback in self.callbacks.items():
+            builder = builder_cls(self.chat_ids, self.stats)
+            self.client.add_event_handler(callback, builder)
+            self.builders.append((builder, callback))
+        logger.info(f"📡 Listening to {len(self.chat_ids)} chats")
+
+    def deactivate(self):
+        if not self.builders:
+            return
+        for builder, callback in self.builders:
+            self.client.remove_event_handler(callback, builder)
+        self.builders = []
+        logger.info(f"📡 Chat subscription removed: {dict(self.stats)}")
+
+    def on_session_change(self, chat_ids: Optional[Iterable[int]]):
+        """Слушатель broadcast_manager: набор чатов сессии или None при остановке."""
+        if chat_ids:
+            self.activate(chat_ids)
+        else:
+            self.deactivate()
+
+    def add_chat(self, chat_id: int):
+        """Слушатель broadcast_manager: чат добавлен в идущую сессию (фоновая рассылка)."""
+        if self.owns_chat is not None and not self.owns_chat(chat_id):
+            return
+        if self.builders:
+            # Билдеры разделяют один set — обработчики не переустанавливаются
+            self.chat_ids.add(chat_id)
+        else:
+            self.activate([chat_id])
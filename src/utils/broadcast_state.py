@@ -1,5 +1,70 @@
+from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import Optional, Set, Any
+from typing import Optional, Set, Any, Dict, List, Tuple, Callable
+
+from utils.volume import VolumeRange, parse_volume, format_volume
+
+
+class LiquidityStats:
+    """Агрегаты офферов одной стороны, обновляемые за O(1) на оффер: средний курс, VWAP, ликвидность, глубина."""
+
+    def __init__(self):
+        self.count = 0
+        self.price_sum = 0.0
+        self.weighted_sum = 0.0  # Σ цена × объем
+        self.volume_sum = 0.0
+        self.open_ended = 0  # офферы без верхней границы объема ("от 100")
+        self.depth: Dict[float, float] = defaultdict(float)  # цена -> суммарный объем
+
+    def add(self, price: float, volume: Optional[VolumeRange]):
+        self.count += 1
+        self.price_sum += price
+        # "до 1 млн" не гарантирует объема — в VWAP, ликвидность и глубину не входит
+        if volume is not None and volume.amount > 0:
+            self.weighted_sum += price * volume.amount
+            self.volume_sum += volume.amount
+            self.depth[price] += volume.amount
+            if volume.high is None:
+                self.open_ended += 1
+
+    def remove(self, price: float, volume: Optional[VolumeRange]):
+        self.count -= 1
+        self.price_sum -= price
+        if volume is not None and volume.amount > 0:
+            self.weighted_sum -= price * volume.amount
+            self.volume_sum -= volume.amount
+            self.depth[price] -= volume.amount
+            if self.depth[price] <= 1e-9:
+                del self.depth[price]
+            if volume.high is None:
+                self.open_ended -= 1
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.price_sum / self.count if self.count else None
+
+    @property
+    def vwap(self) -> Optional[float]:
+        return self.weighted_sum / self.volume_sum if self.volume_sum else None
+
+    def depth_levels(self, reverse: bool = False, limit: int = 5) -> List[Tuple[float, float]]:
+        return sorted(self.depth.items(), reverse=reverse)[:limit]
+
+    @classmethod
+    def combine(cls, *parts: Optional["LiquidityStats"]) -> "LiquidityStats":
+        combined = cls()
+        for part in parts:
+            if part is None:
+                continue
+            combined.count += part.count
+            combined.price_sum += part.price_sum
+            combined.weighted_sum += part.weighted_sum
+            combined.volume_sum += part.volume_sum
+            combined.open_ended += part.open_ended
+            for price, volume in part.depth.items():
+                combined.depth[price] += volume
+        return combined
+
 
 class BroadcastState:
     def __init__(self):
@@ -16,8 +81,18 @@ class BroadcastState:
         self.currency_to: str = ''
         self.is_custom_mode: bool = False
         self.target_rate: Optional[float] = None
+        self.sent_message_ids: Dict[int, int] = {}  # chat_id -> id нашего сообщения рассылки
+        self.known_trader_ids: Set[int] = set()  # отправители офферов (сохраняются между сессиями)
+        self.target_volume: Optional[VolumeRange] = None  # объем запроса сессии
+        self.liquidity: Dict[Optional[str], LiquidityStats] = defaultdict(LiquidityStats)  # сторона -> агрегаты
+        self.target_liquidity: Dict[Optional[str], LiquidityStats] = defaultdict(LiquidityStats)  # то же в пределах целевого курса
+        self.offer_index: Dict[Tuple[int, int], List[dict]] = {}  # (chat_id, message_id) -> офферы сообщения на табло
+        self.message_edits: Dict[Tuple[int, int], datetime] = {}  # время последней правки сообщения
+        self.deleted_messages: Set[Tuple[int, int]] = set()
+        self._listeners: List[Callable[[Optional[Set[int]]], None]] = []  # подписки userbot на чаты сессии
+        self._chat_listeners: List[Callable[[int], None]] = []  # добавление чата в идущую сессию
 
-    def start(self, admin_id: int, duration_minutes: int, target_chat_ids: list[int], direction: str = 'buy', currency_from: str = '', currency_to: str = '', is_custom: bool = False, target_rate: Optional[float] = None):
+    def start(self, admin_id: int, duration_minutes: int, target_chat_ids: list[int], direction: str = 'buy', currency_from: str = '', currency_to: str = '', is_custom: bool = False, target_rate: Optional[float] = None, sent_message_ids: Optional[Dict[int, int]] = None, volume: str = ''):
         self.admin_id = admin_id
         self.end_time = datetime.now() + timedelta(minutes=duration_minutes)
         self.target_chat_ids = set(target_chat_ids)
@@ -30,6 +105,14 @@ class BroadcastState:
         self.currency_to = currency_to
         self.is_custom_mode = is_custom
         self.target_rate = target_rate
+        self.sent_message_ids = dict(sent_message_ids or {})
+        self.target_volume = parse_volume(volume)
+        self.liquidity = defaultdict(LiquidityStats)
+        self.target_liquidity = defaultdict(LiquidityStats)
+        self.offer_index = {}
+        self.message_edits = {}
+        self.deleted_messages = set()
+        self._notify(self.target_chat_ids)
 
     def stop(self):
         self.is_active = False
@@ -39,6 +122,33 @@ class BroadcastState:
         self.report_message_id = None
         self.report_chat_id = None
         self._bot = None
+        self.sent_message_ids = {}
+        self._notify(None)
+
+    def add_target_chat(self, chat_id: int, message_id: Optional[int] = None) -> bool:
+        """Начать мониторинг чата сразу после отправки в него рассылки (фоновая рассылка)."""
+        if not self.is_active:
+            return False
+        self.target_chat_ids.add(chat_id)
+        if message_id is not None:
+            self.sent_message_ids[chat_id] = message_id
+        for callback in self._chat_listeners:
+            callback(chat_id)
+        return True
+
+    def add_listener(self, callback: Callable[[Optional[Set[int]]], None]):
+        """Колбэк при старте (набор чатов) и остановке (None) сессии."""
+        self._listeners.append(callback)
+        if self.is_active:
+            callback(self.target_chat_ids)
+
+    def add_chat_listener(self, callback: Callable[[int], None]):
+        """Колбэк при добавлении одного чата в идущую сессию (add_target_chat)."""
+        self._chat_listeners.append(callback)
+
+    def _notify(self, chat_ids: Optional[Set[int]]):
+        for callback in self._listeners:
+            callback(chat_ids)
 
     def set_report_message_id(self, msg_id: int):
         self.report_message_id = msg_id
@@ -54,17 +164,114 @@ class BroadcastState:
         """Установить экземпляр aiogram Bot для редактирования табло."""
         self._bot = bot
 
-    def add_response(self, user: str, group: str, text: str, price: float = None, volume: str = None, side: str = None, raw_text: str = ""):
-        self.responses.append({
+    def add_response(self, user: str, group: str, text: str, price: float = None, volume: str = None, side: str = None, raw_text: str = "", sources: Optional[List[int]] = None, chat_id: Optional[int] = None, message_id: Optional[int] = None):
+        # Объем разбираем один раз при поступлении, агрегаты обновляем инкрементально
+        volume_range = parse_volume(volume)
+        response = {
             "time": datetime.now().strftime("%H:%M:%S"),
             "user": user,
             "group": group,
             "text": text,
             "price": price,
             "volume": volume,
+            "volume_range": volume_range,
             "side": side,
-            "raw_text": raw_text
-        })
+            "raw_text": raw_text,
+            "sources": sources if sources is not None else [],  # группы, куда трейдер разослал это сообщение
+            "chat_id": chat_id,
+            "message_id": message_id
+        }
+        self.responses.append(response)
+        if chat_id is not None and message_id is not None:
+            self.offer_index.setdefault((chat_id, message_id), []).append(response)
+        if price is not None:
+            self.liquidity[side].add(price, volume_range)
+            if self._within_target_rate(price):
+                self.target_liquidity[side].add(price, volume_range)
+
+    def message_offers(self, chat_id: int, message_id: int) -> List[dict]:
+        return self.offer_index.get((chat_id, message_id), [])
+
+    def remove_message_offers(self, chat_id: int, message_id: int) -> int:
+        """Убирает с табло офферы сообщения и вычитает их из агрегатов. Возвращает число удаленных."""
+        removed = self.offer_index.pop((chat_id, message_id), [])
+        if not removed:
+            return 0
+        removed_ids = {id(r) for r in removed}
+        self.responses = [r for r in self.responses if id(r) not in removed_ids]
+        for r in removed:
+            if r['price'] is not None:
+                self.liquidity[r['side']].remove(r['price'], r['volume_range'])
+                if self._within_target_rate(r['price']):
+                    self.target_liquidity[r['side']].remove(r['price'], r['volume_range'])
+        return len(removed)
+
+    def mark_message_edited(self, chat_id: int, message_id: int, edit_date: Optional[datetime]):
+        """Запоминает последнюю правку, чтобы не показывать офферы более старой версии сообщения."""
+        key = (chat_id, message_id)
+        if edit_date is not None and (key not in self.message_edits or edit_date > self.message_edits[key]):
+            self.message_edits[key] = edit_date
+
+    def mark_message_deleted(self, chat_id: Optional[int], message_id: int) -> int:
+        """
+        Убирает офферы удаленного сообщения. Для обычных групп Telegram не сообщает chat_id —
+        тогда ищем сообщение по id во всех чатах сессии.
+        """
+        if chat_id is not None:
+            keys = [(chat_id, message_id)]
+        else:
+            keys = [key for key in self.offer_index if key[1] == message_id]
+        removed = 0
+        for key in keys:
+            self.deleted_messages.add(key)
+            removed += self.remove_message_offers(*key)
+        return removed
+
+    def is_outdated(self, chat_id: int, message_id: int, edit_date: Optional[datetime]) -> bool:
+        """Сообщение удалено или уже есть более новая его правка."""
+        key = (chat_id, message_id)
+        if key in self.deleted_messages:
+            return True
+        latest = self.message_edits.get(key)
+        return latest is not None and (edit_date is None or edit_date < latest)
+
+    @staticmethod
+    def _format_group(response: dict) -> str:
+        """Название группы и число других групп с той же копией сообщения."""
+        extra = len(response.get("sources", [])) - 1
+        return f"{response['group']} +{extra}" if extra > 0 else response['group']
+
+    def _within_target_rate(self, price: float) -> bool:
+        """Проходит ли цена фильтр целевого курса сессии."""
+        if self.target_rate is None or self.target_rate <= 0:
+            return True
+        if self.session_direction == 'buy':
+            return price <= self.target_rate
+        return price >= self.target_rate
+
+    def _format_liquidity(self, stats: LiquidityStats, reverse: bool = False) -> List[str]:
+        """Строки VWAP, ликвидности и глубины по агрегатам стороны."""
+        lines = []
+        if stats.vwap is not None:
+            lines.append(f"⚖️ <b>Средневзвешенный курс (VWAP): {stats.vwap:.2f}</b>")
+        if stats.volume_sum:
+            more = "+" if stats.open_ended else ""
+            lines.append(f"💧 Доступная ликвидность: {format_volume(stats.volume_sum)}{more}")
+            levels = stats.depth_levels(reverse=reverse)
+            if levels:
+                lines.append("🧱 Глубина: " + ", ".join(f"{price:g} — {format_volume(volume)}" for price, volume in levels))
+        return lines
+
+    def is_reply_to_broadcast(self, chat_id: int, reply_to_msg_id: Optional[int]) -> bool:
+        """Является ли сообщение ответом на наше сообщение рассылки."""
+        return reply_to_msg_id is not None and self.sent_message_ids.get(chat_id) == reply_to_msg_id
+
+    def mark_known_trader(self, sender_id: Optional[int]):
+        if sender_id is not None:
+            self.known_trader_ids.add(sender_id)
+
+    def is_known_trader(self, sender_id: Optional[int]) -> bool:
+        return sender_id in self.known_trader_ids
 
     def get_dashboard_text(self) -> str:
         """Route to appropriate dashboard formatter"""
@@ -110,11 +317,17 @@ class BroadcastState:
             for i, r in enumerate(valid_responses[:10], 1): # Топ 10
                 price_str = f"{r['price']}"
                 vol_str = f" | {r['volume']}" if r['volume'] else ""
-                lines.append(f"{i}. <b>{price_str}</b>{vol_str} | {r['user']} ({r['group']})")
+                lines.append(f"{i}. <b>{price_str}</b>{vol_str} | {r['user']} ({self._format_group(r)})")
             
-            # Средневзвешенный курс (просто среднее, т.к. объем строка)
-            avg_price = sum(r['price'] for r in valid_responses) / len(valid_responses)
-            lines.append(f"\n📈 <b>Средний курс: {avg_price:.2f}</b>")
+            stats = LiquidityStats.combine(
+                self.target_liquidity.get(target_side),
+                self.target_liquidity.get(None)
+            )
+            lines.append(f"\n📈 <b>Средний курс: {stats.mean:.2f}</b>")
+            lines.extend(self._format_liquidity(stats, reverse=reverse_sort))
+            if self.target_volume is not None and self.target_volume.display_amount and stats.volume_sum:
+                coverage = stats.volume_sum / self.target_volume.display_amount
+                lines.append(f"🎯 Покрытие запроса: {format_volume(stats.volume_sum)} / {format_volume(self.target_volume.display_amount)} ({coverage:.0%})")
         
         if other_responses:
             lines.append("\n📋 <b>Прочие сообщения:</b>")
@@ -141,17 +354,21 @@ class BroadcastState:
             lines.append("💰 <b>ПРОДАЖА (лучшие предложения):</b>")
             for i, r in enumerate(sell_offers[:5], 1):
                 vol_str = f" | {r.get('volume', '?')}" if r.get('volume') else ""
-                lines.append(f"{i}. {r['price']}{vol_str} | {r['user']} ({r['group']})")
-            avg_sell = sum(r['price'] for r in sell_offers) / len(sell_offers)
-            lines.append(f"Средний: {avg_sell:.2f}\n")
+                lines.append(f"{i}. {r['price']}{vol_str} | {r['user']} ({self._format_group(r)})")
+            avg_sell = self.liquidity['sell'].mean
+            lines.append(f"Средний: {avg_sell:.2f}")
+            lines.extend(self._format_liquidity(self.liquidity['sell']))
+            lines.append("")
         
         if buy_offers:
             lines.append("🛒 <b>ПОКУПКА (лучшие предложения):</b>")
             for i, r in enumerate(buy_offers[:5], 1):
                 vol_str = f" | {r.get('volume', '?')}" if r.get('volume') else ""
-                lines.append(f"{i}. {r['price']}{vol_str} | {r['user']} ({r['group']})")
-            avg_buy = sum(r['price'] for r in buy_offers) / len(buy_offers)
-            lines.append(f"Средний: {avg_buy:.2f}\n")
+                lines.append(f"{i}. {r['price']}{vol_str} | {r['user']} ({self._format_group(r)})")
+            avg_buy = self.liquidity['buy'].mean
+            lines.append(f"Средний: {avg_buy:.2f}")
+            lines.extend(self._format_liquidity(self.liquidity['buy'], reverse=True))
+            lines.append("")
         
         if buy_offers and sell_offers:
             spread = avg_sell - avg_buy
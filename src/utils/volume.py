@@ -0,0 +1,84 @@
+import re
+from typing import NamedTuple, Optional
+
+_NUMBER = r"\d{1,3}(?:[  ]\d{3})+(?:[.,]\d+)?|\d+(?:[.,]\d+)?"
+_UNIT = r"кк|kk|млн|миллион(?:ов|а)?|mln|mio|m|м|тыс(?:яч[аи]?|\.)?|k|к|т"
+
+_VOLUME_RE = re.compile(
+    rf"(?P<prefix>от|до|from|up\s+to|to)?\s*"
+    rf"(?P<low>{_NUMBER})(?:\s*(?P<low_unit>{_UNIT})\b)?"
+    rf"(?:\s*(?:-|–|—|до|to)\s*(?P<high>{_NUMBER})(?:\s*(?P<high_unit>{_UNIT})\b)?)?",
+    re.IGNORECASE
+)
+
+_MULTIPLIERS = {
+    "k": 1e3, "к": 1e3, "т": 1e3, "тыс": 1e3,
+    "kk": 1e6, "кк": 1e6, "m": 1e6, "м": 1e6, "млн": 1e6, "mln": 1e6, "mio": 1e6,
+}
+
+
+class VolumeRange(NamedTuple):
+    """Объем предложения: нижняя граница и верхняя (None — без ограничения сверху)."""
+
+    low: float
+    high: Optional[float]
+
+    @property
+    def amount(self) -> float:
+        """Гарантированный объем — по нему считаются VWAP и ликвидность (0 для "до 1 млн")."""
+        return self.low
+
+    @property
+    def display_amount(self) -> float:
+        """Объем для показа: для диапазона только с верхней границей — сама граница."""
+        return self.low or self.high or 0.0
+
+
+def _to_number(token: str, unit: Optional[str]) -> float:
+    value = float(re.sub(r"[  ]", "", token).replace(",", "."))
+    if not unit:
+        return value
+    unit = unit.lower()
+    if unit.startswith("миллион"):
+        unit = "млн"
+    elif unit.startswith("тыс"):
+        unit = "тыс"
+    return value * _MULTIPLIERS.get(unit, 1.0)
+
+
+def parse_volume(text: Optional[str]) -> Optional[VolumeRange]:
+    """
+    Преобразует свободный текст объема в числовой диапазон.
+    "50k" → (50000, 50000), "от 100" → (100, None), "до 1 млн" → (0, 1000000),
+    "100-500k" → (100000, 500000). Возвращает None, если число не найдено.
+    """
+    if not text:
+        return None
+    m = _VOLUME_RE.search(str(text))
+    if m is None:
+        return None
+
+    low_unit = m.group("low_unit")
+    high_unit = m.group("high_unit")
+    if m.group("high"):
+        # "100-500k": единица относится к обеим границам
+        low = _to_number(m.group("low"), low_unit or high_unit)
+        high = _to_number(m.group("high"), high_unit or low_unit)
+        return VolumeRange(min(low, high), max(low, high))
+
+    value = _to_number(m.group("low"), low_unit)
+    prefix = (m.group("prefix") or "").lower()
+    if prefix in ("от", "from"):
+        return VolumeRange(value, None)
+    if prefix.startswith(("до", "up", "to")):
+        return VolumeRange(0.0, value)
+    return VolumeRange(value, value)
+
+
+def format_volume(amount: float) -> str:
+    """Краткая запись объема: 50 тыс, 1.5 млн."""
+    if amount >= 1e6:
+        return f"{amount / 1e6:.4g} млн"
+    if amount >= 1e3:
+        return f"{amount / 1e3:.4g} тыс"
+    return f"{amount:.4g}"
@@ -0,0 +1,65 @@
+import asyncio
+
+from api.openrouter.batcher import MessageBatcher
+
+
+class _FakeClient:
+    """Пакетный разбор возвращает batch_result(messages); одиночный — оффер с текстом сообщения."""
+
+    def __init__(self, batch_result):
+        self.batch_result = batch_result
+        self.batches = []
+        self.singles = []
+
+    async def extract_offers_batch(self, messages, context_prompt="", priority=None, deadline=None):
+        self.batches.append(dict(messages))
+        return self.batch_result(messages)
+
+    async def extract_offers(self, text, context_prompt="", priority=None, deadline=None):
+        self.singles.append(text)
+        return [{"text": text}]
+
+
+def _submit_all(client, texts, window=0.01):
+    async def scenario():
+        batcher = MessageBatcher(client, window=window, max_size=10)
+        return await asyncio.gather(*(batcher.submit(text) for text in texts))
+
+    return asyncio.run(scenario())
+
+
+def test_messages_within_window_share_one_request():
+    client = _FakeClient(lambda messages: {msg_id: [{"id": msg_id}] for msg_id in messages})
+    results = _submit_all(client, ["a", "b", "c"])
+    assert len(client.batches) == 1 and client.singles == []
+    assert [r[0]["id"] for r in results] == list(client.batches[0])
+
+
+def test_only_missing_ids_are_retried_individually():
+    # Модель ответила только на первое сообщение пакета
+    client = _FakeClient(lambda messages: {next(iter(messages)): []})
+    results = _submit_all(client, ["a", "b", "c"])
+    assert results[0] == []
+    assert client.singles == ["b", "c"]
+    assert results[1:] == [[{"text": "b"}], [{"text": "c"}]]
+
+
+def test_failed_batch_is_not_fanned_out():
+    client = _FakeClient(lambda messages: {})
+    assert _submit_all(client, ["a", "b", "c"]) == [None, None, None]
+    assert client.singles == []
+
+
+def test_batch_exception_fails_all_messages():
+    def boom(messages):
+        raise RuntimeError("provider down")
+
+    client = _FakeClient(boom)
+    assert _submit_all(client, ["a", "b"]) == [None, None]
+    assert client.singles == []
+
+
+def test_single_message_uses_regular_request():
+    client = _FakeClient(lambda messages: {})
+    assert _submit_all(client, ["a"]) == [[{"text": "a"}]]
+    assert client.batches == []
@@ -0,0 +1,163 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from telethon.errors import FloodWaitError, ChatWriteForbiddenError
+
+from userbot.broadcast import TokenBucket, BroadcastDispatcher, BroadcastReport, DeliveryOutcome, format_broadcast_report
+
+
+def test_token_bucket_allows_burst_then_limits_rate():
+    async def scenario():
+        bucket = TokenBucket(rate=20, capacity=3)
+        started = time.monotonic()
+        for _ in range(3):
+            await bucket.acquire()
+        burst = time.monotonic() - started
+        for _ in range(2):
+            await bucket.acquire()
+        return burst, time.monotonic() - started
+
+    burst, total = asyncio.run(scenario())
+    assert burst < 0.05
+    assert total >= 0.09  # два токена по 1/20 с
+
+
+def test_token_bucket_pause():
+    async def scenario():
+        bucket = TokenBucket(rate=100, capacity=5)
+        bucket.pause(0.2)
+        started = time.monotonic()
+        await bucket.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) >= 0.19
+
+
+class _FakeClient:
+    def __init__(self, flood_first: bool = False):
+        self.flood_first = flood_first
+        self.sent = []
+
+    async def send_message(self, entity, message, parse_mode=None):
+        if self.flood_first and not self.sent:
+            self.sent.append(None)
+            raise FloodWaitError(request=None, capture=1)
+        self.sent.append(entity)
+        return SimpleNamespace(id=len(self.sent))
+
+
+class _FakePool:
+    """Группы < 0 ведет аккаунт "slow" (получает FloodWait), остальные — "fast"."""
+
+    def __init__(self):
+        self.clients = {"slow": _FakeClient(flood_first=True), "fast": _FakeClient()}
+
+    def owner_key(self, chat_id):
+        return "slow" if chat_id < 0 else "fast"
+
+    def client_for(self, chat_id):
+        return self.clients[self.owner_key(chat_id)]
+
+    def input_peer_for(self, chat_id):
+        return chat_id
+
+
+def test_flood_wait_pauses_only_its_account():
+    pool = _FakePool()
+    dispatcher = BroadcastDispatcher(pool, rate=100, burst=10, concurrency=2, max_attempts=3)
+    finished = {}
+
+    async def on_outcome(outcome):
+        finished[outcome.telegram_id] = time.monotonic()
+
+    async def scenario():
+        started = time.monotonic()
+        report = await dispatcher.send([-1, -2, -3, 1, 2, 3], "текст", on_outcome)
+        return started, report
+
+    started, report = asyncio.run(scenario())
+    assert len(report.sent) == 6
+    assert report.outcomes[-1].attempts == 2
+    # Группы второго аккаунта не ждут паузу FloodWait первого
+    assert all(finished[t] - started < 0.5 for t in (1, 2, 3))
+    assert all(finished[t] - started >= 0.9 for t in (-1, -2, -3))
+
+
+def test_report_escapes_html():
+    report = BroadcastReport(outcomes={1: DeliveryOutcome(1, ok=False, error="bad <tag>")})
+    text = format_broadcast_report(report, {1: "A & B <group>"})
+    assert "A &amp; B &lt;group&gt;: bad &lt;tag&gt;" in text
+
+
+class _FakeJournal:
+    def __init__(self):
+        self.recorded = []
+        self.flushed = 0
+        self.cancelled_groups = None
+
+    async def record(self, outcome):
+        self.recorded.append(outcome.telegram_id)
+
+    async def flush(self):
+        self.flushed += 1
+
+    async def cancel(self, group_ids):
+        self.cancelled_groups = group_ids
+
+
+def _run_stopped_job(stop):
+    """Запускает рассылку, которая упирается в FloodWait, и останавливает ее через stop(dispatcher)."""
+    async def scenario():
+        dispatcher = BroadcastDispatcher(_FakePool(), rate=100, burst=10)
+        journal = _FakeJournal()
+        job = dispatcher.start_job([-1, -2], "текст", journal=journal)
+        await asyncio.sleep(0.1)
+        await stop(dispatcher)
+        await job.wait()
+        return job, journal
+
+    return asyncio.run(scenario())
+
+
+def test_admin_cancel_marks_remaining_groups_cancelled():
+    async def stop(dispatcher):
+        dispatcher.cancel_job()
+
+    job, journal = _run_stopped_job(stop)
+    assert job.cancelled and not job.interrupted
+    assert journal.flushed == 1
+    assert sorted(journal.cancelled_groups) == [-2, -1]
+
+
+def test_shutdown_keeps_remaining_groups_for_resume():
+    async def stop(dispatcher):
+        await dispatcher.shutdown()
+
+    job, journal = _run_stopped_job(stop)
+    assert job.interrupted and not job.cancelled
+    assert journal.flushed == 1
+    assert journal.cancelled_groups is None
+
+
+class _RejectingPool(_FakePool):
+    """Аккаунт "slow" не может писать в группы < 0, у "fast" пропадает соединение."""
+
+    def __init__(self):
+        super().__init__()
+
+        async def forbidden(entity, message, parse_mode=None):
+            raise ChatWriteForbiddenError(request=None)
+
+        async def disconnected(entity, message, parse_mode=None):
+            raise ConnectionError("Connection lost")
+
+        self.clients["slow"].send_message = forbidden
+        self.clients["fast"].send_message = disconnected
+
+
+def test_only_telegram_rejections_are_permanent():
+    dispatcher = BroadcastDispatcher(_RejectingPool(), rate=100, burst=10)
+    report = asyncio.run(dispatcher.send([-1, 1], "текст"))
+    assert report.outcomes[-1].permanent
+    assert not report.outcomes[1].permanent
@@ -0,0 +1,37 @@
+from api.openrouter.decoder import extract_json, decode_offers, decode_batch
+
+
+def test_extracts_json_from_markdown_and_prose():
+    content = 'Вот результат:\n```json\n{"offers": [{"side": "buy", "price": 89.5}]}\n```\nГотово.'
+    assert extract_json(content) == {"offers": [{"side": "buy", "price": 89.5}]}
+
+
+def test_skips_braces_inside_strings_and_invalid_objects():
+    content = '{не json} {"note": "скобка } внутри", "offers": []}'
+    assert extract_json(content) == {"note": "скобка } внутри", "offers": []}
+
+
+def test_returns_none_without_json():
+    assert extract_json("") is None
+    assert extract_json("нет офферов") is None
+    assert decode_offers("нет офферов") is None
+
+
+def test_normalizes_offer_fields():
+    offers = decode_offers('{"offers": [{"side": "Покупка", "price": "88,90", "volume": 50000, "currency": "rub"}]}')
+    assert len(offers) == 1
+    offer = offers[0]
+    assert (offer.side, offer.price, offer.volume, offer.currency) == ("buy", 88.9, "50000", "RUB")
+
+
+def test_drops_invalid_offers_individually():
+    offers = decode_offers('{"offers": [{"side": "sell", "price": 90}, {"side": "sell", "price": "дорого"}, 42]}')
+    assert [o.price for o in offers] == [90.0]
+
+
+def test_decodes_batch_results_by_message_id():
+    content = '{"results": {"1": {"offers": [{"side": "sell", "price": 91}]}, "2": {"offers": []}, "3": "oops"}}'
+    result = decode_batch(content)
+    assert set(result) == {"1", "2"}
+    assert result["1"][0].price == 91.0
+    assert result["2"] == []
@@ -0,0 +1,40 @@
+from userbot.dedup import DuplicateSuppressor
+
+
+def test_first_copy_is_claimed_and_copies_are_merged():
+    dedup = DuplicateSuppressor(window=60)
+    assert dedup.claim(1, "Продам USDT 92.5", -100) is True
+    # Копия в другой группе с другими пробелами и регистром — дубликат
+    assert dedup.claim(1, "продам  usdt 92.5", -200) is False
+    assert dedup.sources(1, "Продам USDT 92.5", -100) == [-100, -200]
+
+
+def test_same_group_repeat_is_a_duplicate():
+    dedup = DuplicateSuppressor(window=60)
+    assert dedup.claim(1, "Куплю 90", -100) is True
+    assert dedup.claim(1, "Куплю 90", -100) is False
+    assert dedup.sources(1, "Куплю 90", -100) == [-100]
+
+
+def test_different_senders_are_independent():
+    dedup = DuplicateSuppressor(window=60)
+    assert dedup.claim(1, "Куплю 90", -100) is True
+    assert dedup.claim(2, "Куплю 90", -200) is True
+
+
+def test_window_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("userbot.dedup.time.monotonic", lambda: now[0])
+    dedup = DuplicateSuppressor(window=10)
+    assert dedup.claim(1, "Куплю 90", -100) is True
+    now[0] += 11
+    assert dedup.claim(1, "Куплю 90", -200) is True
+
+
+def test_clear_and_empty_text():
+    dedup = DuplicateSuppressor(window=60)
+    dedup.claim(1, "Куплю 90", -100)
+    dedup.clear(None)
+    assert dedup.claim(1, "Куплю 90", -200) is True
+    assert dedup.claim(1, "", -100) is True
+    assert dedup.sources(3, "неизвестно", -300) == [-300]
@@ -0,0 +1,77 @@
+import pytest
+
+from api.openrouter.fast_parser import FastOfferParser
+
+
+@pytest.fixture
+def parser():
+    return FastOfferParser()
+
+
+def test_parses_two_sided_template(parser):
+    offers = parser.parse("USDT: Покупка 89,55, Продажа 89,95")
+    assert offers == [
+        {"side": "buy", "price": 89.55, "volume": None, "currency": "RUB"},
+        {"side": "sell", "price": 89.95, "volume": None, "currency": "RUB"},
+    ]
+
+
+def test_parses_volume_with_prefix(parser):
+    offers = parser.parse("Продам USDT 92.5 от 100к")
+    assert offers == [{"side": "sell", "price": 92.5, "volume": "от 100к", "currency": "RUB"}]
+
+
+def test_dash_separator_is_not_a_sign(parser):
+    assert parser.parse("Покупка USDT - 89,55")[0]["price"] == 89.55
+
+
+def test_integer_price_needs_price_keyword(parser):
+    offers = parser.parse("Продаю USDT по 92 до 1 млн")
+    assert offers == [{"side": "sell", "price": 92.0, "volume": "до 1 млн", "currency": "RUB"}]
+
+
+def test_amount_in_currency_is_volume(parser):
+    offers = parser.parse("Куплю 500usdt курс 91.2 руб")
+    assert offers == [{"side": "buy", "price": 91.2, "volume": "500", "currency": "RUB"}]
+    offers = parser.parse("Продам 300 usdt по 92,5")
+    assert offers == [{"side": "sell", "price": 92.5, "volume": "300", "currency": "RUB"}]
+
+
+@pytest.mark.parametrize("text", [
+    "Продам USDT курс ЦБ +2%",
+    "Куплю USDT, ЦБ + 1.5%",
+    "Куплю usdt 91 2%",
+    "Продам USDT 92.5 +1",
+    "Продам USDT 92,5 -0.3",
+])
+def test_relative_quotes_fall_through_to_llm(parser, text):
+    assert parser.parse(text) is None
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "Куплю USDT?",
+    "Продам 90 и 91",
+    "100 Продам 90",
+])
+def test_ambiguous_messages_are_not_parsed(parser, text):
+    assert parser.parse(text) is None
+
+
+@pytest.mark.parametrize("text", [
+    "Продам 300 usdt",
+    "buy 500 usdt",
+    "Куплю 500$",
+    "Куплю USDT 90",
+    "Не покупаю по 90",
+    "Продаю по 92 до 1 млн",
+    "Покупка 89,55",
+])
+def test_unsure_offers_fall_through_to_llm(parser, text):
+    assert parser.parse(text) is None
+
+
+def test_counts_hits_and_misses(parser):
+    parser.parse("Покупка USDT 89,55")
+    parser.parse("Куплю USDT, ЦБ + 1.5%")
+    assert (parser.hits, parser.misses) == (1, 1)
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from api.openrouter.client import OpenRouterClient
+from api.openrouter.resilience import CircuitBreaker, CircuitState, DeferredQueue, TransientHTTPError, retry_with_jitter
+
+
+def test_breaker_opens_and_lets_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.is_open and not breaker.allow_request()
+
+    time.sleep(0.06)
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()  # пока пробный запрос не завершился
+
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED and breaker.allow_request()
+
+
+def test_failed_probe_reopens_breaker():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.05)
+    for _ in range(3):
+        breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.is_open
+
+
+def _counting(errors):
+    """Фабрика запроса: бросает ошибки из списка по очереди, затем возвращает "ok"."""
+    calls = []
+
+    async def factory():
+        calls.append(None)
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    return factory, calls
+
+
+def test_retry_recovers_from_transient_errors():
+    factory, calls = _counting([TransientHTTPError(503), httpx.ConnectError("reset")])
+    assert asyncio.run(retry_with_jitter(factory, attempts=3, base_delay=0.01)) == "ok"
+    assert len(calls) == 3
+
+
+def test_retry_does_not_repeat_non_transient_errors():
+    factory, calls = _counting([ValueError("bad json")])
+    with pytest.raises(ValueError):
+        asyncio.run(retry_with_jitter(factory, attempts=3, base_delay=0.01))
+    assert len(calls) == 1
+
+
+def test_retry_stops_when_breaker_opens():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    calls = []
+
+    async def factory():
+        calls.append(None)
+        breaker.record_failure()
+        raise TransientHTTPError(502)
+
+    with pytest.raises(TransientHTTPError):
+        asyncio.run(retry_with_jitter(factory, attempts=5, base_delay=0.01, breaker=breaker))
+    assert len(calls) == 1
+
+
+def test_deferred_queue_replays_after_recovery():
+    async def scenario():
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.1)
+        breaker.record_failure()
+        queue = DeferredQueue(breaker, max_size=2)
+        replayed = []
+
+        async def job(i):
+            replayed.append(i)
+            breaker.record_success()
+
+        for i in range(3):
+            queue.park(lambda i=i: job(i))
+        queue.start()
+        await asyncio.sleep(0.05)
+        assert replayed == []  # цепь разомкнута — ждем
+        await asyncio.sleep(0.6)
+        await queue.stop()
+        return queue, replayed
+
+    queue, replayed = asyncio.run(scenario())
+    # Первое сообщение вытеснено переполнением, следующее ушло пробным запросом, остальные — после замыкания
+    assert replayed == [1, 2]
+    assert queue.stats["dropped"] == 1
+
+
+def _sse(content: str) -> bytes:
+    events = [
+        "data: " + json.dumps({"choices": [{"delta": {"content": content[i:i + 7]}}]})
+        for i in range(0, len(content), 7)
+    ]
+    return ("\n\n".join(events + ["data: [DONE]"]) + "\n\n").encode()
+
+
+ANSWER = json.dumps({"offers": [{"side": "sell", "price": 92.5, "volume": "10k", "currency": "USDT"}]})
+
+
+def _run_stream(responses):
+    """Потоковый разбор через клиента с подмененным транспортом; responses(payload) -> httpx.Response."""
+    payloads = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        payloads.append(payload)
+        return responses(payload, len(payloads))
+
+    async def scenario():
+        client = OpenRouterClient()
+        client._http = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://test")
+        emitted = []
+
+        async def on_offer(offer):
+            emitted.append(offer)
+
+        try:
+            offers = await client.extract_offers_stream("Продам USDT 92.5 10k", "", on_offer)
+        finally:
+            await client.close()
+        return offers, emitted, client
+
+    offers, emitted, client = asyncio.run(scenario())
+    return offers, emitted, payloads, client
+
+
+def test_stream_retries_transient_error():
+    def responses(payload, n):
+        if n == 1:
+            return httpx.Response(503, text="overloaded")
+        return httpx.Response(200, content=_sse(ANSWER))
+
+    offers, emitted, payloads, client = _run_stream(responses)
+    assert [o["price"] for o in offers] == [92.5]
+    assert emitted == offers
+    assert all(p.get("stream") for p in payloads)
+    assert client.breaker.state == CircuitState.CLOSED
+
+
+def test_stream_falls_back_to_regular_request():
+    def responses(payload, n):
+        if payload.get("stream"):
+            return httpx.Response(400, text="stream not supported")
+        return httpx.Response(200, json={"choices": [{"message": {"content": ANSWER}}]})
+
+    offers, emitted, payloads, _ = _run_stream(responses)
+    assert [o["price"] for o in offers] == [92.5]
+    assert [bool(p.get("stream")) for p in payloads] == [True, False]
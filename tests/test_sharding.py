@@ -0,0 +1,34 @@
+from userbot.sharding import HashRing
+
+
+def test_empty_ring():
+    assert HashRing().get(-1001) is None
+
+
+def test_assignment_is_deterministic_and_balanced():
+    ring = HashRing(["a", "b", "c"])
+    again = HashRing(["c", "b", "a"])
+    keys = range(-1000_000, -1000_000 + 3000)
+    owners = [ring.get(k) for k in keys]
+    assert owners == [again.get(k) for k in keys]
+    for node in ("a", "b", "c"):
+        assert 600 < owners.count(node) < 1400
+
+
+def test_adding_a_node_moves_only_its_share():
+    ring = HashRing(["a", "b", "c"])
+    keys = list(range(3000))
+    before = {k: ring.get(k) for k in keys}
+    ring.add("d")
+    moved = [k for k in keys if ring.get(k) != before[k]]
+    assert all(ring.get(k) == "d" for k in moved)
+    assert len(moved) < 3000 / 2
+
+
+def test_remove_and_candidates():
+    ring = HashRing(["a", "b"])
+    ring.remove("a")
+    assert {ring.get(k) for k in range(100)} == {"b"}
+    ring.add("a")
+    assert ring.get(42, candidates={"a"}) == "a"
+    assert ring.get(42, candidates={"z"}) is None
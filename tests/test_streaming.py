@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from api.openrouter.scheduler import Priority
+from api.openrouter.streaming import OffersStreamParser, parse_sse_line
+
+OFFERS = [
+    {"side": "sell", "price": 92.5, "volume": "от 10k", "currency": "USDT"},
+    {"side": "buy", "price": 91.1, "volume": 'до "1 млн" }', "currency": "USDT"},
+]
+ANSWER = json.dumps({"offers": OFFERS}, ensure_ascii=False)
+
+
+def test_sse_line_parsing():
+    assert parse_sse_line('data: {"choices": [{"delta": {"content": "{\\"of"}}]}') == '{"of'
+    assert parse_sse_line(": OPENROUTER PROCESSING") == ""
+    assert parse_sse_line("data: {not json") == ""
+    assert parse_sse_line('data: {"choices": []}') == ""
+    assert parse_sse_line("data: [DONE]") is None
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, len(ANSWER)])
+def test_offers_are_emitted_once_when_complete(size):
+    parser = OffersStreamParser()
+    emitted = []
+    for i in range(0, len(ANSWER), size):
+        chunk = ANSWER[i:i + size]
+        emitted.extend(parser.feed(chunk))
+    assert emitted == OFFERS
+    assert parser.buffer == ANSWER
+
+
+def test_partial_object_is_held_back():
+    parser = OffersStreamParser()
+    head = ANSWER[:ANSWER.index("}")]
+    assert parser.feed(head) == []
+    assert parser.feed("}") == [OFFERS[0]]
+
+
+def test_key_split_across_chunks():
+    parser = OffersStreamParser()
+    assert parser.feed('{"off') == []
+    assert parser.feed('ers": [') == []
+    assert parser.feed(json.dumps(OFFERS[0]) + ", ") == [OFFERS[0]]
+
+
+def test_reply_priority_always_streams():
+    from api.openrouter.client import OpenRouterClient
+    from config import Config
+
+    client = OpenRouterClient()
+    client.scheduler._active = Config.LLM_STREAM_MAX_LOAD
+    assert client._should_stream(Priority.REPLY)
+    assert not client._should_stream(Priority.NORMAL)
+    client.scheduler._active = 0
+    assert client._should_stream(Priority.NORMAL)
@@ -0,0 +1,60 @@
+import pytest
+
+from utils.volume import VolumeRange, parse_volume, format_volume
+from utils.broadcast_state import LiquidityStats
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("50k", VolumeRange(50_000, 50_000)),
+    ("от 100", VolumeRange(100, None)),
+    ("до 1 млн", VolumeRange(0, 1_000_000)),
+    ("100-500k", VolumeRange(100_000, 500_000)),
+    ("300 тысяч", VolumeRange(300_000, 300_000)),
+    ("2 миллиона", VolumeRange(2_000_000, 2_000_000)),
+    ("1 500 000", VolumeRange(1_500_000, 1_500_000)),
+    ("1,5кк", VolumeRange(1_500_000, 1_500_000)),
+])
+def test_parse_volume(text, expected):
+    assert parse_volume(text) == expected
+
+
+@pytest.mark.parametrize("text", [None, "", "объем обсуждается"])
+def test_parse_volume_without_number(text):
+    assert parse_volume(text) is None
+
+
+def test_upper_bound_only_has_no_guaranteed_amount():
+    volume = parse_volume("до 1 млн")
+    assert volume.amount == 0
+    assert volume.display_amount == 1_000_000
+
+
+def test_format_volume():
+    assert format_volume(50_000) == "50 тыс"
+    assert format_volume(1_500_000) == "1.5 млн"
+    assert format_volume(500) == "500"
+
+
+def test_liquidity_stats_add_and_remove():
+    stats = LiquidityStats()
+    stats.add(90.0, parse_volume("100k"))
+    stats.add(92.0, parse_volume("300k"))
+    stats.add(95.0, None)
+    assert stats.mean == pytest.approx((90 + 92 + 95) / 3)
+    assert stats.vwap == pytest.approx((90 * 100_000 + 92 * 300_000) / 400_000)
+    assert stats.depth_levels() == [(90.0, 100_000), (92.0, 300_000)]
+
+    stats.remove(92.0, parse_volume("300k"))
+    assert stats.vwap == pytest.approx(90.0)
+    assert stats.depth_levels() == [(90.0, 100_000)]
+
+
+def test_liquidity_stats_ignore_upper_bound_only_volume():
+    stats = LiquidityStats()
+    stats.add(90.0, parse_volume("до 1 млн"))
+    assert stats.count == 1
+    assert stats.vwap is None
+    assert stats.volume_sum == 0
+    assert stats.depth_levels() == []
+    stats.remove(90.0, parse_volume("до 1 млн"))
+    assert stats.count == 0